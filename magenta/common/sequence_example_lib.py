@@ -14,32 +14,67 @@
 """Utility functions for working with tf.train.SequenceExamples."""
 
 import math
+
+# internal imports
+import numpy as np
 import tensorflow as tf
 
 QUEUE_CAPACITY = 500
 SHUFFLE_MIN_AFTER_DEQUEUE = QUEUE_CAPACITY // 5
 
 
-def make_sequence_example(inputs, labels):
+def make_sequence_example(inputs, labels, sparse_inputs=False):
   """Returns a SequenceExample for the given inputs and labels.
 
+  By default each input vector is stored as a dense list of floats. If
+  `sparse_inputs` is True, each input vector is instead stored as three lists:
+  'input_indices' holds the indices of all values equal to 1.0,
+  'input_value_indices' holds the indices of all other nonzero values, and
+  'input_values' holds those other nonzero values. This is much more compact
+  for the mostly one-hot input vectors produced by the encoder/decoders. Use
+  `get_padded_batch` with `sparse_inputs=True` to read these back as dense
+  input vectors.
+
   Args:
     inputs: A list of input vectors. Each input vector is a list of floats.
     labels: A list of ints.
+    sparse_inputs: If True, store the input vectors sparsely as described
+        above.
 
   Returns:
     A tf.train.SequenceExample containing inputs and labels.
   """
-  input_features = [
-      tf.train.Feature(float_list=tf.train.FloatList(value=input_))
-      for input_ in inputs]
   label_features = [
       tf.train.Feature(int64_list=tf.train.Int64List(value=[label]))
       for label in labels]
   feature_list = {
-      'inputs': tf.train.FeatureList(feature=input_features),
       'labels': tf.train.FeatureList(feature=label_features)
   }
+  if sparse_inputs:
+    index_features = []
+    value_index_features = []
+    value_features = []
+    for input_ in inputs:
+      input_ = np.asarray(input_, dtype=np.float32)
+      is_one = input_ == 1.0
+      value_indices = np.flatnonzero(np.logical_and(input_, ~is_one))
+      index_features.append(tf.train.Feature(int64_list=tf.train.Int64List(
+          value=np.flatnonzero(is_one).tolist())))
+      value_index_features.append(tf.train.Feature(
+          int64_list=tf.train.Int64List(value=value_indices.tolist())))
+      value_features.append(tf.train.Feature(float_list=tf.train.FloatList(
+          value=input_[value_indices].tolist())))
+    feature_list['input_indices'] = tf.train.FeatureList(
+        feature=index_features)
+    feature_list['input_value_indices'] = tf.train.FeatureList(
+        feature=value_index_features)
+    feature_list['input_values'] = tf.train.FeatureList(
+        feature=value_features)
+  else:
+    input_features = [
+        tf.train.Feature(float_list=tf.train.FloatList(value=input_))
+        for input_ in inputs]
+    feature_list['inputs'] = tf.train.FeatureList(feature=input_features)
   feature_lists = tf.train.FeatureLists(feature_list=feature_list)
   return tf.train.SequenceExample(feature_lists=feature_lists)
 
@@ -60,8 +95,39 @@ def _shuffle_inputs(input_tensors, capacity, min_after_dequeue, num_threads):
   return output_tensors
 
 
+def _sparse_inputs_to_dense(indices, value_indices, values, length,
+                            input_size):
+  """Rebuilds dense input vectors from their sparse SequenceExample encoding.
+
+  Args:
+    indices: A SparseTensor of int64 indices of values equal to 1.0, as parsed
+        from the 'input_indices' feature list.
+    value_indices: A SparseTensor of int64 indices of other nonzero values, as
+        parsed from the 'input_value_indices' feature list.
+    values: A SparseTensor of the float32 values at `value_indices`, as parsed
+        from the 'input_values' feature list.
+    length: A scalar int32 tensor, the number of steps in the sequence.
+    input_size: The size of each input vector.
+
+  Returns:
+    A tensor of shape [length, input_size] of float32s.
+  """
+  positions = tf.concat([
+      tf.stack([indices.indices[:, 0], indices.values], axis=1),
+      tf.stack([value_indices.indices[:, 0], value_indices.values], axis=1)
+  ], axis=0)
+  updates = tf.concat(
+      [tf.ones_like(indices.values, dtype=tf.float32), values.values], axis=0)
+  inputs = tf.scatter_nd(
+      positions, updates,
+      tf.stack([tf.to_int64(length), tf.constant(input_size, tf.int64)]))
+  inputs.set_shape([None, input_size])
+  return inputs
+
+
 def get_padded_batch(file_list, batch_size, input_size,
-                     num_enqueuing_threads=4, shuffle=False):
+                     num_enqueuing_threads=4, shuffle=False,
+                     sparse_inputs=False):
   """Reads batches of SequenceExamples from TFRecords and pads them.
 
   Can deal with variable length SequenceExamples by padding each batch to the
@@ -75,6 +141,9 @@ def get_padded_batch(file_list, batch_size, input_size,
     num_enqueuing_threads: The number of threads to use for enqueuing
         SequenceExamples.
     shuffle: Whether to shuffle the batches.
+    sparse_inputs: Whether the input vectors were stored sparsely, i.e. the
+        SequenceExamples were created by `make_sequence_example` with
+        `sparse_inputs=True`. The dense input vectors are rebuilt in the graph.
 
   Returns:
     inputs: A tensor of shape [batch_size, num_steps, input_size] of floats32s.
@@ -89,16 +158,29 @@ def get_padded_batch(file_list, batch_size, input_size,
   _, serialized_example = reader.read(file_queue)
 
   sequence_features = {
-      'inputs': tf.FixedLenSequenceFeature(shape=[input_size],
-                                           dtype=tf.float32),
       'labels': tf.FixedLenSequenceFeature(shape=[],
                                            dtype=tf.int64)}
+  if sparse_inputs:
+    sequence_features['input_indices'] = tf.VarLenFeature(dtype=tf.int64)
+    sequence_features['input_value_indices'] = tf.VarLenFeature(
+        dtype=tf.int64)
+    sequence_features['input_values'] = tf.VarLenFeature(dtype=tf.float32)
+  else:
+    sequence_features['inputs'] = tf.FixedLenSequenceFeature(
+        shape=[input_size], dtype=tf.float32)
 
   _, sequence = tf.parse_single_sequence_example(
       serialized_example, sequence_features=sequence_features)
 
-  length = tf.shape(sequence['inputs'])[0]
-  input_tensors = [sequence['inputs'], sequence['labels'], length]
+  if sparse_inputs:
+    inputs = _sparse_inputs_to_dense(
+        sequence['input_indices'], sequence['input_value_indices'],
+        sequence['input_values'], tf.shape(sequence['labels'])[0], input_size)
+  else:
+    inputs = sequence['inputs']
+
+  length = tf.shape(inputs)[0]
+  input_tensors = [inputs, sequence['labels'], length]
 
   if shuffle:
     if num_enqueuing_threads < 2:
@@ -0,0 +1,93 @@
+# Copyright 2016 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for sequence_example_lib."""
+
+import os
+
+# internal imports
+
+import numpy as np
+import tensorflow as tf
+
+from magenta.common import sequence_example_lib
+
+
+class SequenceExampleLibTest(tf.test.TestCase):
+
+  def setUp(self):
+    # Input vectors with one-hot parts, negative and fractional values, and an
+    # all-zero vector, in sequences of different lengths.
+    self.input_size = 6
+    self.sequences = [
+        ([[1.0, 0.0, 0.0, 0.0, 0.0, -1.0],
+          [0.0, 1.0, 0.0, 0.0, 1.0, 1.0],
+          [0.0, 0.0, 0.5, 0.0, 0.0, 0.0]],
+         [0, 1, 2]),
+        ([[0.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+          [0.0, 0.0, 0.0, 1.0, 0.25, -1.0]],
+         [3, 4]),
+        ([[1.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+          [0.0, 0.0, 0.0, 0.0, 0.0, 1.0],
+          [0.0, -0.75, 0.0, 1.0, 0.0, 0.0],
+          [0.0, 0.0, 1.0, 0.0, 0.0, 0.0]],
+         [5, 0, 1, 2]),
+    ]
+
+  def _write_sequence_examples(self, sparse_inputs):
+    path = os.path.join(
+        self.get_temp_dir(),
+        'sparse.tfrecord' if sparse_inputs else 'dense.tfrecord')
+    with tf.python_io.TFRecordWriter(path) as writer:
+      for inputs, labels in self.sequences:
+        sequence_example = sequence_example_lib.make_sequence_example(
+            inputs, labels, sparse_inputs=sparse_inputs)
+        writer.write(sequence_example.SerializeToString())
+    return path
+
+  def _read_padded_batch(self, path, sparse_inputs):
+    with tf.Graph().as_default() as graph:
+      batch = sequence_example_lib.get_padded_batch(
+          [path], len(self.sequences), self.input_size,
+          num_enqueuing_threads=1, sparse_inputs=sparse_inputs)
+      with self.test_session(graph=graph) as sess:
+        coord = tf.train.Coordinator()
+        threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+        inputs, labels, lengths = sess.run(batch)
+        coord.request_stop()
+        coord.join(threads)
+    return inputs, labels, lengths
+
+  def testGetPaddedBatchSparseInputs(self):
+    dense_batch = self._read_padded_batch(
+        self._write_sequence_examples(sparse_inputs=False),
+        sparse_inputs=False)
+    sparse_batch = self._read_padded_batch(
+        self._write_sequence_examples(sparse_inputs=True),
+        sparse_inputs=True)
+
+    for dense, sparse in zip(dense_batch, sparse_batch):
+      self.assertAllEqual(dense, sparse)
+
+    # Both match the original inputs, padded with zeros.
+    inputs, labels, lengths = sparse_batch
+    self.assertAllEqual([3, 2, 4], lengths)
+    for i, (expected_inputs, expected_labels) in enumerate(self.sequences):
+      num_steps = len(expected_inputs)
+      self.assertAllEqual(expected_inputs, inputs[i, :num_steps])
+      self.assertAllEqual(expected_labels, labels[i, :num_steps])
+      self.assertFalse(np.any(inputs[i, num_steps:]))
+
+
+if __name__ == '__main__':
+  tf.test.main()
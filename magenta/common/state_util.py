@@ -50,6 +50,38 @@ def extract_state(batched_states, i):
   return tf_nest.map_structure(lambda x: x[i], batched_states)
 
 
+def gather(batched_states, indices):
+  """Selects states from a batch of states by index.
+
+  Args:
+    batched_states: A nested structure with entries whose first dimensions all
+      equal N.
+    indices: A list or 1-D numpy array of integer indices in the range [0, N).
+      Indices may repeat.
+
+  Returns:
+    A nested structure of the same form as `batched_states` whose entries have
+    first dimension `len(indices)`, containing the selected states in order.
+  """
+  indices = np.asarray(indices, dtype=np.int64)
+  return tf_nest.map_structure(lambda x: x[indices], batched_states)
+
+
+def concatenate(batched_states_list):
+  """Concatenates a list of batches of states into a single batch.
+
+  Args:
+    batched_states_list: A list of nested structures of the same form, with
+      entries whose first dimensions are the respective batch sizes.
+
+  Returns:
+    A single nested structure whose entries are the concatenation of the
+    corresponding entries of each structure along the first dimension.
+  """
+  return tf_nest.map_structure(
+      lambda *x: np.concatenate(x, axis=0), *batched_states_list)
+
+
 def batch(states, batch_size=None):
   """Combines a collection of state structures into a batch, padding if needed.
 
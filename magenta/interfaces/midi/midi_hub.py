@@ -4,7 +4,6 @@ import abc
 from collections import defaultdict
 from collections import deque
 import Queue
-import re
 import threading
 import time
 
@@ -26,6 +25,13 @@ _DEFAULT_METRONOME_MESSAGES = [
 ]
 _DEFAULT_METRONOME_CHANNEL = 1
 
+# The message attribute used to index MidiSignals for each supported type.
+_SIGNAL_INDEX_NAMES = {
+    'note_on': 'note',
+    'note_off': 'note',
+    'control_change': 'control',
+}
+
 # 0-indexed.
 _DRUM_CHANNEL = 9
 
@@ -56,9 +62,11 @@ def get_available_output_ports():
 class MidiSignal(object):
   """A class for representing a MIDI-based event signal.
 
-  Provides a `__str__` method to return a regular expression pattern for
-  matching against the string representation of a mido.Message with wildcards
-  for unspecified values.
+  Provides a `matches` method to test whether a mido.Message matches the
+  signal, with wildcards for unspecified values. Signals with the same
+  matching criteria compare equal. The `__str__` method returns an equivalent
+  regular expression pattern for matching against the string representation of
+  a mido.Message.
 
   Supports matching for message types 'note_on', 'note_off', and
   'control_change'. If a mido.Message is given as the `msg` argument, matches
@@ -138,6 +146,43 @@ class MidiSignal(object):
     self._type = type_
     self._inferred_types = inferred_types
 
+    # Compile the signal into the set of matching message types and the
+    # required attribute values, so that messages can be matched without
+    # formatting them as strings.
+    value_names = mido.messages.SPEC_BY_TYPE[inferred_types[0]]['value_names']
+    if msg is not None:
+      self._match_values = dict(
+          (name, getattr(msg, name)) for name in value_names)
+    else:
+      self._match_values = dict(
+          (name, kwargs[name]) for name in value_names if name in kwargs)
+    self._match_types = frozenset(inferred_types)
+    index_name = _SIGNAL_INDEX_NAMES[inferred_types[0]]
+    self._index_keys = [(t, self._match_values.get(index_name))
+                        for t in self._match_types]
+
+  def matches(self, msg):
+    """Returns True if the mido.Message matches the signal, ignoring time."""
+    if msg.type not in self._match_types:
+      return False
+    for name, value in self._match_values.items():
+      if getattr(msg, name) != value:
+        return False
+    return True
+
+  def __eq__(self, other):
+    if not isinstance(other, MidiSignal):
+      return NotImplemented
+    return (self._match_types == other._match_types and
+            self._match_values == other._match_values)
+
+  def __ne__(self, other):
+    result = self.__eq__(other)
+    return result if result is NotImplemented else not result
+
+  def __hash__(self):
+    return hash((self._match_types, frozenset(self._match_values.items())))
+
   def to_message(self):
     """Returns a message using the signal's specifications, if possible."""
     if self._msg:
@@ -164,6 +209,64 @@ class MidiSignal(object):
     return regex_pattern
 
 
+class _MidiSignalTable(object):
+  """A dictionary keyed by MidiSignal that finds the signals matching a message.
+
+  Signals are bucketed by message type and by note or control number, with
+  signals that match any number in a separate bucket. Only the signals in the
+  two buckets for a message need to be checked against it, so the lookup cost
+  does not grow with the number of signals for other notes or controls.
+  """
+
+  def __init__(self):
+    self._values = {}
+    # A dictionary mapping (type, note or control number) tuples to the set of
+    # signals that may match messages with that type and number. The number is
+    # None for signals with a wildcard number.
+    self._buckets = defaultdict(set)
+
+  def __len__(self):
+    return len(self._values)
+
+  def __iter__(self):
+    return iter(list(self._values))
+
+  def __contains__(self, signal):
+    return signal in self._values
+
+  def __getitem__(self, signal):
+    return self._values[signal]
+
+  def __setitem__(self, signal, value):
+    if signal not in self._values:
+      for key in signal._index_keys:  # pylint: disable=protected-access
+        self._buckets[key].add(signal)
+    self._values[signal] = value
+
+  def __delitem__(self, signal):
+    del self._values[signal]
+    for key in signal._index_keys:  # pylint: disable=protected-access
+      self._buckets[key].discard(signal)
+      if not self._buckets[key]:
+        del self._buckets[key]
+
+  def get(self, signal, default=None):
+    return self._values.get(signal, default)
+
+  def values(self):
+    return list(self._values.values())
+
+  def matching(self, msg):
+    """Returns a list of the signals that match the mido.Message."""
+    index_name = _SIGNAL_INDEX_NAMES.get(msg.type)
+    if index_name is None:
+      return []
+    signals = []
+    for key in ((msg.type, None), (msg.type, getattr(msg, index_name))):
+      signals.extend(s for s in self._buckets.get(key, ()) if s.matches(msg))
+    return signals
+
+
 class Metronome(threading.Thread):
   """A thread implementing a MIDI metronome.
 
@@ -442,9 +545,10 @@ class MidiCaptor(threading.Thread):
     self._captured_sequence.tempos.add(qpm=qpm)
     self._start_time = start_time
     self._stop_time = stop_time
-    self._stop_regex = re.compile(str(stop_signal))
-    # A set of active MidiSignals being used by iterators.
-    self._iter_signals = []
+    self._stop_midi_signal = stop_signal
+    # A table mapping the MidiSignals being used by iterators to lists of the
+    # iterator queues.
+    self._iter_signals = _MidiSignalTable()
     # An event that is set when `stop` has been called.
     self._stop_signal = threading.Event()
     # Active callback threads keyed by unique thread name.
@@ -535,13 +639,13 @@ class MidiCaptor(threading.Thread):
       if msg.time <= self._start_time:
         continue
 
-      if self._stop_regex.match(str(msg)) is not None:
+      if (self._stop_midi_signal is not None and
+          self._stop_midi_signal.matches(msg)):
         break
 
       with self._lock:
-        msg_str = str(msg)
-        for regex, queue in self._iter_signals:
-          if regex.match(msg_str) is not None:
+        for signal in self._iter_signals.matching(msg):
+          for queue in self._iter_signals[signal]:
             queue.put(msg.copy())
 
       self._capture_message(msg)
@@ -554,8 +658,9 @@ class MidiCaptor(threading.Thread):
       # Set final captured sequence.
       self._captured_sequence = self.captured_sequence(end_time)
       # Wake up all generators.
-      for regex, queue in self._iter_signals:
-        queue.put(MidiCaptor._WAKE_MESSAGE)
+      for queues in self._iter_signals.values():
+        for queue in queues:
+          queue.put(MidiCaptor._WAKE_MESSAGE)
 
   def stop(self, stop_time=None, block=True):
     """Ends capture and truncates the captured sequence at `stop_time`.
@@ -654,10 +759,11 @@ class MidiCaptor(threading.Thread):
       sleeper = concurrency.Sleeper()
       next_yield_time = time.time() + period
     else:
-      regex = re.compile(str(signal))
       queue = Queue.Queue()
       with self._lock:
-        self._iter_signals.append((regex, queue))
+        if signal not in self._iter_signals:
+          self._iter_signals[signal] = []
+        self._iter_signals[signal].append(queue)
 
     while self.is_alive():
       if signal is None:
@@ -869,13 +975,13 @@ class MidiHub(object):
     self._open_notes = set()
     # This lock is used by the serialized decorator.
     self._lock = threading.RLock()
-    # A dictionary mapping a compiled MidiSignal regex to a condition variable
-    # that will be notified when a matching messsage is received.
-    self._signals = {}
-    # A dictionary mapping a compiled MidiSignal regex to a list of functions
-    # that will be called with the triggering message in individual threads when
-    # a matching message is received.
-    self._callbacks = defaultdict(list)
+    # A table mapping a MidiSignal to a condition variable that will be
+    # notified when a matching messsage is received.
+    self._signals = _MidiSignalTable()
+    # A table mapping a MidiSignal to a list of functions that will be called
+    # with the triggering message in individual threads when a matching message
+    # is received.
+    self._callbacks = _MidiSignalTable()
     # A dictionary mapping integer control numbers to most recently-received
     # integer value.
     self._control_values = {}
@@ -964,19 +1070,16 @@ class MidiHub(object):
       msg: The mido.Message MIDI message to handle.
     """
     # Notify any threads waiting for this message.
-    msg_str = str(msg)
-    for regex in list(self._signals):
-      if regex.match(msg_str) is not None:
-        self._signals[regex].notify_all()
-        del self._signals[regex]
+    for signal in self._signals.matching(msg):
+      self._signals[signal].notify_all()
+      del self._signals[signal]
 
     # Call any callbacks waiting for this message.
-    for regex in list(self._callbacks):
-      if regex.match(msg_str) is not None:
-        for fn in self._callbacks[regex]:
-          threading.Thread(target=fn, args=(msg,)).start()
+    for signal in self._callbacks.matching(msg):
+      for fn in self._callbacks[signal]:
+        threading.Thread(target=fn, args=(msg,)).start()
 
-        del self._callbacks[regex]
+      del self._callbacks[signal]
 
     # Remove any captors that are no longer alive.
     self._captors[:] = [t for t in self._captors if t.is_alive()]
@@ -1095,14 +1198,10 @@ class MidiHub(object):
       concurrency.Sleeper().sleep(timeout)
       return
 
-    signal_pattern = str(signal)
-    cond_var = None
-    for regex, cond_var in self._signals:
-      if regex.pattern == signal_pattern:
-        break
+    cond_var = self._signals.get(signal)
     if cond_var is None:
       cond_var = threading.Condition(self._lock)
-      self._signals[re.compile(signal_pattern)] = cond_var
+      self._signals[signal] = cond_var
 
     cond_var.wait()
 
@@ -1113,10 +1212,10 @@ class MidiHub(object):
     Args:
       signal: The MidiSignal to wake threads waiting on, or None to wake all.
     """
-    for regex in list(self._signals):
-      if signal is None or regex.pattern == str(signal):
-        self._signals[regex].notify_all()
-        del self._signals[regex]
+    for waited_signal in self._signals:
+      if signal is None or waited_signal == signal:
+        self._signals[waited_signal].notify_all()
+        del self._signals[waited_signal]
     for captor in self._captors:
       captor.wake_signal_waiters(signal)
 
@@ -1214,4 +1313,6 @@ class MidiHub(object):
       signal: A MidiSignal to use as a signal to call `fn` on the triggering
           message.
     """
-    self._callbacks[re.compile(str(signal))].append(fn)
+    if signal not in self._callbacks:
+      self._callbacks[signal] = []
+    self._callbacks[signal].append(fn)
@@ -131,6 +131,38 @@ class MidiHubTest(tf.test.TestCase):
         r'^control_change channel=\d+ control=\d+ value=2 time=\d+.\d+$',
         str(sig))
 
+  def testMidiSignal_Matches(self):
+    sig = midi_hub.MidiSignal(msg=mido.Message(type='note_on', note=1))
+    self.assertTrue(sig.matches(mido.Message(type='note_on', note=1, time=1.5)))
+    self.assertFalse(
+        sig.matches(mido.Message(type='note_on', note=1, channel=1)))
+    self.assertFalse(sig.matches(mido.Message(type='note_off', note=1)))
+
+    sig = midi_hub.MidiSignal(note=1)
+    self.assertTrue(sig.matches(mido.Message(type='note_on', note=1)))
+    self.assertTrue(
+        sig.matches(mido.Message(type='note_off', note=1, velocity=0)))
+    self.assertFalse(sig.matches(mido.Message(type='note_on', note=2)))
+    self.assertFalse(
+        sig.matches(mido.Message(type='control_change', control=1)))
+
+    sig = midi_hub.MidiSignal(type='control_change', value=2)
+    self.assertTrue(
+        sig.matches(mido.Message(type='control_change', control=3, value=2)))
+    self.assertFalse(
+        sig.matches(mido.Message(type='control_change', control=3, value=1)))
+
+  def testMidiSignal_Equality(self):
+    self.assertEquals(
+        midi_hub.MidiSignal(type='control_change', control=1),
+        midi_hub.MidiSignal(control=1))
+    self.assertEquals(
+        hash(midi_hub.MidiSignal(type='control_change', control=1)),
+        hash(midi_hub.MidiSignal(control=1)))
+    self.assertNotEqual(
+        midi_hub.MidiSignal(note=1),
+        midi_hub.MidiSignal(type='note_on', note=1))
+
   def testMetronome(self):
     start_time = time.time() + 0.1
     qpm = 180
@@ -1,6 +1,7 @@
 """A module for implementing interaction between MIDI and SequenceGenerators."""
 
 import abc
+import functools
 import threading
 import time
 
@@ -8,6 +9,7 @@ import time
 import tensorflow as tf
 
 import magenta
+from magenta.common import concurrency
 from magenta.protobuf import generator_pb2
 from magenta.protobuf import music_pb2
 
@@ -29,6 +31,133 @@ def adjust_sequence_times(sequence, delta_time):
   return retimed_sequence
 
 
+class _GenerationWorker(threading.Thread):
+  """A thread that generates responses ahead of when they are needed.
+
+  Jobs are identified by a hashable key and run by calling a function with no
+  arguments, in the order they are requested. Speculative jobs are dropped when
+  a new one is requested: a new speculative job replaces any job and discards
+  any result that no call to `generate` is waiting for. A running job cannot
+  be interrupted, but each result is handed over to at most one call to
+  `generate` with the same key.
+  """
+  daemon = True
+
+  def __init__(self):
+    # Lock for serialization.
+    self._lock = threading.RLock()
+    # A control variable to signal when a job is requested or finished.
+    self._cv = threading.Condition(self._lock)
+    # The (key, fn) tuples of the jobs waiting to be run, in order.
+    self._pending_jobs = []
+    # The key of the job being run, or None.
+    self._running_key = None
+    # A dictionary mapping keys of finished jobs to (response, exception)
+    # tuples, until they are handed over or dropped.
+    self._results = {}
+    # The keys that calls to `generate` are waiting for.
+    self._waiting_keys = []
+    # An event that is set when `stop` has been called.
+    self._stop_signal = threading.Event()
+    super(_GenerationWorker, self).__init__()
+
+  def _request(self, key, fn):
+    """Schedules a job unless one with the same key is already known."""
+    if (key in self._results or key == self._running_key or
+        any(pending_key == key for pending_key, _ in self._pending_jobs)):
+      return
+    self._pending_jobs.append((key, fn))
+    self._cv.notify_all()
+
+  @concurrency.serialized
+  def speculate(self, key, fn):
+    """Starts generating a response that may be needed later.
+
+    Pending jobs and results with other keys that no call to `generate` is
+    waiting for are dropped.
+
+    Args:
+      key: A hashable key identifying the job.
+      fn: A function with no arguments that returns the response.
+    """
+    needed_keys = self._waiting_keys + [key]
+    self._pending_jobs = [(pending_key, pending_fn)
+                          for pending_key, pending_fn in self._pending_jobs
+                          if pending_key in needed_keys]
+    for result_key in list(self._results):
+      if result_key not in needed_keys:
+        del self._results[result_key]
+    self._request(key, fn)
+
+  @concurrency.serialized
+  def generate(self, key, fn):
+    """Returns the response for a job, reusing a speculative result if possible.
+
+    Blocks until a job with the same key has finished, running `fn` in the
+    worker thread if no such job has been requested yet.
+
+    Args:
+      key: A hashable key identifying the job.
+      fn: A function with no arguments that returns the response.
+
+    Returns:
+      The value returned by the function of the job with key `key`.
+
+    Raises:
+      MidiInteractionException: If the worker is stopped before the job is run.
+    """
+    self._waiting_keys.append(key)
+    try:
+      while key not in self._results:
+        if self._stop_signal.is_set() and key != self._running_key:
+          raise MidiInteractionException(
+              'Generation worker stopped before generating a response.')
+        # Another call to `generate` may have taken the result of the job for
+        # this key, in which case it is run again.
+        self._request(key, fn)
+        self._cv.wait()
+    finally:
+      self._waiting_keys.remove(key)
+    # Each result is only handed over once.
+    response, exception = self._results.pop(key)
+    if exception is not None:
+      raise exception
+    return response
+
+  def run(self):
+    """Runs requested jobs until the stop signal is received."""
+    while True:
+      with self._lock:
+        while not self._pending_jobs and not self._stop_signal.is_set():
+          self._cv.wait()
+        if self._stop_signal.is_set():
+          break
+        key, fn = self._pending_jobs.pop(0)
+        self._running_key = key
+
+      try:
+        result = (fn(), None)
+      except Exception as e:  # pylint: disable=broad-except
+        result = (None, e)
+
+      with self._lock:
+        self._running_key = None
+        self._results[key] = result
+        self._cv.notify_all()
+
+  def stop(self, block=True):
+    """Signals for the worker to stop after any running job finishes.
+
+    Args:
+      block: If true, blocks until thread terminates.
+    """
+    with self._lock:
+      self._stop_signal.set()
+      self._cv.notify_all()
+    if block:
+      self.join()
+
+
 class MidiInteraction(threading.Thread):
   """Base class for handling interaction between MIDI and SequenceGenerator.
 
@@ -147,6 +276,12 @@ class CallAndResponseMidiInteraction(MidiInteraction):
   optionally determined by a control value set for
   `response_ticks_control_number` or by the length of the call.
 
+  While listening, a response to the call captured so far is generated in a
+  background thread on each tick. If the call then ends without further input,
+  as it does after a silent tick, this speculative response is handed over
+  instead of generating a new one, so a response is only late if generation
+  takes longer than a tick.
+
   Args:
     midi_hub: The MidiHub to use for MIDI I/O.
     sequence_generators: A collection of SequenceGenerator objects.
@@ -297,9 +432,18 @@ class CallAndResponseMidiInteraction(MidiInteraction):
     return (self._loop_control_number and
             self._midi_hub.control_value(self._loop_control_number) == 127)
 
-  def _generate(self, input_sequence, zero_time, response_start_time,
-                response_end_time):
-    """Generates a response sequence with the currently-selected generator.
+  def _response_duration(self, tick_duration, capture_duration):
+    """Returns the response duration based on the current control value."""
+    num_ticks = self._midi_hub.control_value(
+        self._response_ticks_control_number)
+    return num_ticks * tick_duration if num_ticks else capture_duration
+
+  def _generation_job(self, input_sequence, zero_time, response_start_time,
+                      response_end_time):
+    """Returns a key and function for generating a response.
+
+    The job is relative to `zero_time`, so it has the same key as another job
+    with the same input and response window relative to its own start.
 
     Args:
       input_sequence: The NoteSequence to use as a generation seed.
@@ -309,11 +453,14 @@ class CallAndResponseMidiInteraction(MidiInteraction):
       response_end_time: The float time in seconds for the end of generation.
 
     Returns:
-      The generated NoteSequence.
+      key: A hashable key identifying the job.
+      fn: A function with no arguments that returns the generated NoteSequence,
+          with times relative to `zero_time`.
     """
     # Generation is simplified if we always start at 0 time.
     response_start_time -= zero_time
     response_end_time -= zero_time
+    input_sequence = adjust_sequence_times(input_sequence, -zero_time)
 
     generator_options = generator_pb2.GeneratorOptions()
     generator_options.input_sections.add(
@@ -326,25 +473,95 @@ class CallAndResponseMidiInteraction(MidiInteraction):
     # Get current temperature setting.
     generator_options.args['temperature'].float_value = self._temperature
 
-    # Generate response.
+    sequence_generator = self._sequence_generator
+    # Times are rounded so that jobs computed from differently offset captures
+    # of the same input share a key.
+    key = (sequence_generator,
+           generator_options.args['temperature'].float_value,
+           round(response_start_time, 6),
+           round(response_end_time, 6),
+           tuple(tempo.qpm for tempo in input_sequence.tempos),
+           tuple((note.pitch, note.velocity, round(note.start_time, 6),
+                  round(note.end_time, 6))
+                 for note in input_sequence.notes))
+    fn = functools.partial(
+        self._run_generator, sequence_generator, input_sequence,
+        generator_options)
+    return key, fn
+
+  def _run_generator(self, sequence_generator, input_sequence,
+                     generator_options):
+    """Generates a response sequence, called by the generation worker.
+
+    Args:
+      sequence_generator: The SequenceGenerator to use.
+      input_sequence: The NoteSequence to use as a generation seed.
+      generator_options: The GeneratorOptions to use, with a single generate
+          section.
+
+    Returns:
+      The generated NoteSequence, trimmed to the generate section.
+    """
     tf.logging.info(
         "Generating sequence using '%s' generator.",
-        self._sequence_generator.details.id)
-    tf.logging.debug('Generator Details: %s',
-                     self._sequence_generator.details)
-    tf.logging.debug('Bundle Details: %s',
-                     self._sequence_generator.bundle_details)
+        sequence_generator.details.id)
+    tf.logging.debug('Generator Details: %s', sequence_generator.details)
+    tf.logging.debug('Bundle Details: %s', sequence_generator.bundle_details)
     tf.logging.debug('Generator Options: %s', generator_options)
-    response_sequence = self._sequence_generator.generate(
-        adjust_sequence_times(input_sequence, -zero_time), generator_options)
-    response_sequence = magenta.music.trim_note_sequence(
-        response_sequence, response_start_time, response_end_time)
+    response_sequence = sequence_generator.generate(
+        input_sequence, generator_options)
+    generate_section = generator_options.generate_sections[0]
+    return magenta.music.trim_note_sequence(
+        response_sequence, generate_section.start_time,
+        generate_section.end_time)
+
+  def _speculate(self, input_sequence, zero_time, response_start_time,
+                 response_end_time):
+    """Starts generating a response in the background in case it is needed.
+
+    Any speculative response that has not started generating yet is dropped.
+
+    Args:
+      input_sequence: The NoteSequence to use as a generation seed.
+      zero_time: The float time in seconds to treat as the start of the input.
+      response_start_time: The float time in seconds for the start of
+          generation.
+      response_end_time: The float time in seconds for the end of generation.
+    """
+    self._generation_worker.speculate(*self._generation_job(
+        input_sequence, zero_time, response_start_time, response_end_time))
+
+  def _generate(self, input_sequence, zero_time, response_start_time,
+                response_end_time):
+    """Generates a response sequence with the currently-selected generator.
+
+    Hands over the speculative response for the same input and response window
+    relative to `zero_time` if there is one, waiting for it to finish if
+    necessary.
+
+    Args:
+      input_sequence: The NoteSequence to use as a generation seed.
+      zero_time: The float time in seconds to treat as the start of the input.
+      response_start_time: The float time in seconds for the start of
+          generation.
+      response_end_time: The float time in seconds for the end of generation.
+
+    Returns:
+      The generated NoteSequence.
+    """
+    response_sequence = self._generation_worker.generate(*self._generation_job(
+        input_sequence, zero_time, response_start_time, response_end_time))
     return adjust_sequence_times(response_sequence, zero_time)
 
   def run(self):
     """The main loop for a real-time call and response interaction."""
     start_time = time.time()
     self._captor = self._midi_hub.start_capture(self._qpm, start_time)
+    self._generation_worker = _GenerationWorker()
+    self._generation_worker.start()
+    # Successive calls to the generators mostly extend the same input.
+    for sequence_generator in self._sequence_generators:
+      sequence_generator.start_generation_session()
 
     if not self._clock_signal and self._metronome_channel is not None:
       self._midi_hub.start_metronome(
@@ -432,16 +649,8 @@ class CallAndResponseMidiInteraction(MidiInteraction):
             captured_sequence.total_time = tick_time
             capture_start_time += tick_duration
 
-          # Compute duration of response.
-          num_ticks = self._midi_hub.control_value(
-              self._response_ticks_control_number)
-
-          if num_ticks:
-            response_duration = num_ticks * tick_duration
-          else:
-            # Use capture duration.
-            response_duration = tick_time - capture_start_time
-
+          response_duration = self._response_duration(
+              tick_duration, tick_time - capture_start_time)
           response_start_time = tick_time
           response_sequence = self._generate(
               captured_sequence,
@@ -477,6 +686,16 @@ class CallAndResponseMidiInteraction(MidiInteraction):
         # Continue listening.
         self._update_state(self.State.LISTENING)
 
+        # Speculatively generate the response in case the call ends now. If the
+        # next tick is silent, that response will have the same key.
+        capture_start_time = self._captor.start_time
+        self._speculate(
+            captured_sequence,
+            capture_start_time,
+            tick_time,
+            tick_time + self._response_duration(
+                tick_duration, tick_time - capture_start_time))
+
       # Potentially loop or mutate previous response.
       if self._mutate.is_set() and not response_sequence.notes:
         self._mutate.clear()
@@ -504,6 +723,9 @@ class CallAndResponseMidiInteraction(MidiInteraction):
       last_tick_time = tick_time
 
     player.stop()
+    self._generation_worker.stop(block=False)
+    for sequence_generator in self._sequence_generators:
+      sequence_generator.end_generation_session()
 
   def stop(self):
     self._stop_signal.set()
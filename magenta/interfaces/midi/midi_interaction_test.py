@@ -0,0 +1,158 @@
+# Copyright 2016 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for midi_interaction."""
+
+import threading
+import time
+
+# internal imports
+import tensorflow as tf
+
+from magenta.interfaces.midi import midi_interaction
+
+
+class GenerationWorkerTest(tf.test.TestCase):
+
+  def setUp(self):
+    self.worker = midi_interaction._GenerationWorker()
+    self.worker.start()
+    self.addCleanup(self.worker.stop)
+    self.calls = []
+
+  def _job(self, response, release=None):
+    """Returns a job function that records its call and returns `response`.
+
+    Args:
+      response: The value for the job to return.
+      release: An optional threading.Event to wait for before returning.
+
+    Returns:
+      A function with no arguments.
+    """
+    def fn():
+      self.calls.append(response)
+      if release is not None:
+        release.wait()
+      return response
+    return fn
+
+  def _wait_until(self, condition):
+    """Waits for up to 5 seconds for `condition()` to be true."""
+    deadline = time.time() + 5.0
+    while not condition():
+      self.assertLess(time.time(), deadline)
+      time.sleep(0.001)
+
+  def _generate_in_thread(self, key, fn):
+    """Calls `generate` in a new thread and returns the thread and results."""
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(self.worker.generate(key, fn)))
+    thread.daemon = True
+    thread.start()
+    return thread, results
+
+  def testGenerate(self):
+    self.assertEquals('a', self.worker.generate('a', self._job('a')))
+    self.assertEquals('b', self.worker.generate('b', self._job('b')))
+    self.assertEquals(['a', 'b'], self.calls)
+
+  def testGenerateReusesSpeculativeResult(self):
+    self.worker.speculate('a', self._job('a'))
+    self._wait_until(lambda: self.calls)
+    self.assertEquals('a', self.worker.generate('a', self._job('other')))
+    self.assertEquals(['a'], self.calls)
+
+  def testGenerateWaitsForRunningSpeculativeJob(self):
+    release = threading.Event()
+    self.worker.speculate('a', self._job('a', release))
+    self._wait_until(lambda: self.calls)
+    thread, results = self._generate_in_thread('a', self._job('other'))
+    release.set()
+    thread.join(5.0)
+    self.assertEquals(['a'], results)
+    self.assertEquals(['a'], self.calls)
+
+  def testResultHandedOverOnce(self):
+    self.worker.speculate('a', self._job(1))
+    self.assertEquals(1, self.worker.generate('a', self._job(2)))
+    # The result was handed over, so the job is run again.
+    self.assertEquals(3, self.worker.generate('a', self._job(3)))
+    self.assertEquals([1, 3], self.calls)
+
+  def testSpeculateReplacesPendingJob(self):
+    release = threading.Event()
+    self.worker.speculate('running', self._job('running', release))
+    self._wait_until(lambda: self.calls)
+    self.worker.speculate('a', self._job('a'))
+    self.worker.speculate('b', self._job('b'))
+    release.set()
+    self.assertEquals('b', self.worker.generate('b', self._job('other')))
+    self.assertEquals(['running', 'b'], self.calls)
+
+  def testSpeculateDropsUnneededResult(self):
+    self.worker.speculate('a', self._job('a1'))
+    self._wait_until(lambda: self.calls)
+    self.worker.speculate('b', self._job('b'))
+    self.assertEquals('a2', self.worker.generate('a', self._job('a2')))
+    self.assertEquals('b', self.worker.generate('b', self._job('other')))
+    self.assertEquals(['a1', 'b', 'a2'], self.calls)
+
+  def testSpeculateKeepsJobBeingWaitedFor(self):
+    release = threading.Event()
+    self.worker.speculate('running', self._job('running', release))
+    self._wait_until(lambda: self.calls)
+
+    # A job that `generate` is waiting for is not replaced by a later
+    # speculative job, and a stale result does not block the waiting call.
+    thread, results = self._generate_in_thread('a', self._job('a'))
+    self._wait_until(lambda: 'a' in self.worker._waiting_keys)
+    self.worker.speculate('b', self._job('b'))
+    release.set()
+    thread.join(5.0)
+    self.assertEquals(['a'], results)
+    self.assertEquals('b', self.worker.generate('b', self._job('other')))
+    self.assertEquals(['running', 'a', 'b'], self.calls)
+
+  def testGenerateRaisesJobException(self):
+    def fn():
+      raise ValueError('Generation failed.')
+
+    self.worker.speculate('a', fn)
+    with self.assertRaisesRegexp(ValueError, 'Generation failed.'):
+      self.worker.generate('a', self._job('other'))
+    with self.assertRaisesRegexp(ValueError, 'Generation failed.'):
+      self.worker.generate('b', fn)
+    # Exceptions are handed over once, like responses.
+    self.assertEquals('a', self.worker.generate('a', self._job('a')))
+
+  def testGenerateRaisesWhenStopped(self):
+    release = threading.Event()
+    self.worker.speculate('running', self._job('running', release))
+    self._wait_until(lambda: self.calls)
+    thread, results = self._generate_in_thread('running', self._job('other'))
+    self._wait_until(lambda: self.worker._waiting_keys)
+    self.worker.stop(block=False)
+
+    # A job that is already running still hands over its result.
+    release.set()
+    thread.join(5.0)
+    self.assertEquals(['running'], results)
+    with self.assertRaises(midi_interaction.MidiInteractionException):
+      self.worker.generate('a', self._job('a'))
+    self.assertEquals(['running'], self.calls)
+
+
+if __name__ == '__main__':
+  tf.test.main()
@@ -36,6 +36,12 @@ tf.app.flags.DEFINE_string(
     'Comma-separated list of `name=value` pairs. For each pair, the value of '
     'the hyperparameter named `name` is set to `value`. This mapping is merged '
     'with the default hyperparameters.')
+tf.app.flags.DEFINE_boolean(
+    'sparse_inputs',
+    False,
+    'Whether SequenceExample input vectors are stored sparsely, as active '
+    'indices plus any other nonzero values, instead of as dense float lists. '
+    'Must match between dataset creation and training/evaluation.')
 
 
 class DrumsRnnConfigFlagsException(Exception):
@@ -61,4 +67,5 @@ def config_from_flags():
     config.details.id = FLAGS.generator_id
   if FLAGS.generator_description is not None:
     config.details.description = FLAGS.generator_description
+  config.sparse_inputs = FLAGS.sparse_inputs
   return config
@@ -43,6 +43,14 @@ tf.app.flags.DEFINE_string('output_dir', None,
 tf.app.flags.DEFINE_float('eval_ratio', 0.1,
                           'Fraction of input to set aside for eval set. '
                           'Partition is randomly selected.')
+tf.app.flags.DEFINE_integer('num_workers', 1,
+                            'The number of worker processes used to build the '
+                            'dataset. If greater than 1, inputs are processed '
+                            'in parallel and the partition is seeded with '
+                            '--seed.')
+tf.app.flags.DEFINE_integer('seed', 0,
+                            'Random seed used for partitioning inputs when '
+                            'num_workers is greater than 1.')
 tf.app.flags.DEFINE_string('log', 'INFO',
                            'The threshold for what messages will be logged '
                            'DEBUG, INFO, WARN, ERROR, or FATAL.')
@@ -73,7 +81,7 @@ def get_pipeline(config, eval_ratio):
         min_bars=7, max_steps=512, gap_bars=1.0, name='DrumsExtractor_' + mode)
     encoder_pipeline = encoder_decoder.EncoderPipeline(
         magenta.music.DrumTrack, config.encoder_decoder,
-        name='EncoderPipeline_' + mode)
+        name='EncoderPipeline_' + mode, sparse_inputs=config.sparse_inputs)
 
     dag[time_change_splitter] = partitioner[mode + '_drum_tracks']
     dag[quantizer] = time_change_splitter
@@ -93,10 +101,20 @@ def main(unused_argv):
 
   FLAGS.input = os.path.expanduser(FLAGS.input)
   FLAGS.output_dir = os.path.expanduser(FLAGS.output_dir)
-  pipeline.run_pipeline_serial(
-      pipeline_instance,
-      pipeline.tf_record_iterator(FLAGS.input, pipeline_instance.input_type),
-      FLAGS.output_dir)
+  input_iterator = pipeline.tf_record_iterator(
+      FLAGS.input, pipeline_instance.input_type)
+  if FLAGS.num_workers > 1:
+    pipeline.run_pipeline_parallel(
+        pipeline_instance,
+        input_iterator,
+        FLAGS.output_dir,
+        num_workers=FLAGS.num_workers,
+        seed=FLAGS.seed)
+  else:
+    pipeline.run_pipeline_serial(
+        pipeline_instance,
+        input_iterator,
+        FLAGS.output_dir)
 
 
 def console_entry_point():
@@ -25,7 +25,8 @@ class DrumsRnnModel(events_rnn_model.EventSequenceRnnModel):
   """Class for RNN drum track generation models."""
 
   def generate_drum_track(self, num_steps, primer_drums, temperature=1.0,
-                          beam_size=1, branch_factor=1, steps_per_iteration=1):
+                          beam_size=1, branch_factor=1, steps_per_iteration=1,
+                          random_state=None):
     """Generate a drum track from a primer drum track.
 
     Args:
@@ -40,13 +41,45 @@ class DrumsRnnModel(events_rnn_model.EventSequenceRnnModel):
       branch_factor: An integer, beam search branch factor to use.
       steps_per_iteration: An integer, number of steps to take per beam search
           iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          drum track. If None, the global numpy random state is used.
 
     Returns:
       The generated DrumTrack object (which begins with the provided primer drum
           track).
     """
     return self._generate_events(num_steps, primer_drums, temperature,
-                                 beam_size, branch_factor, steps_per_iteration)
+                                 beam_size, branch_factor, steps_per_iteration,
+                                 random_state=random_state)
+
+  def generate_drum_tracks(self, num_steps, primer_drums, num_outputs,
+                           temperature=1.0, beam_size=1, branch_factor=1,
+                           steps_per_iteration=1, random_state=None):
+    """Generate multiple independent drum tracks from a primer drum track.
+
+    Args:
+      num_steps: The integer length in steps of the final drum tracks, after
+          generation. Includes the primer.
+      primer_drums: The primer drum track, a DrumTrack object.
+      num_outputs: The integer number of drum tracks to generate.
+      temperature: A float specifying how much to divide the logits by
+         before computing the softmax. Greater than 1.0 makes drum tracks more
+         random, less than 1.0 makes drum tracks less random.
+      beam_size: An integer, beam size to use when generating drum tracks via
+          beam search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of steps to take per beam search
+          iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          drum tracks. If None, the global numpy random state is used.
+
+    Returns:
+      A list of `num_outputs` generated DrumTrack objects (each of which begins
+          with the provided primer drum track).
+    """
+    return self._generate_events_batch(
+        num_steps, primer_drums, num_outputs, temperature, beam_size,
+        branch_factor, steps_per_iteration, random_state=random_state)
 
   def drum_track_log_likelihood(self, drums):
     """Evaluate the log likelihood of a drum track under the model.
@@ -43,6 +43,9 @@ class DrumsRnnSequenceGenerator(mm.BaseSequenceGenerator):
     self.steps_per_quarter = steps_per_quarter
 
   def _generate(self, input_sequence, generator_options):
+    return self._generate_batch(input_sequence, generator_options, 1)[0]
+
+  def _generate_batch(self, input_sequence, generator_options, num_outputs):
     if len(generator_options.input_sections) > 1:
       raise mm.SequenceGeneratorException(
           'This model supports at most one input_sections message, but got %s' %
@@ -123,11 +126,14 @@ class DrumsRnnSequenceGenerator(mm.BaseSequenceGenerator):
                 for name, value_fn in arg_types.items()
                 if name in generator_options.args)
 
-    generated_drums = self._model.generate_drum_track(
-        end_step - drums.start_step, drums, **args)
-    generated_sequence = generated_drums.to_sequence(qpm=qpm)
-    assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
-    return generated_sequence
+    generated_drum_tracks = self._model.generate_drum_tracks(
+        end_step - drums.start_step, drums, num_outputs, **args)
+    generated_sequences = []
+    for generated_drums in generated_drum_tracks:
+      generated_sequence = generated_drums.to_sequence(qpm=qpm)
+      assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
+      generated_sequences.append(generated_sequence)
+    return generated_sequences
 
 
 def get_generator_map():
@@ -31,7 +31,8 @@ class ImprovRnnModel(events_rnn_model.EventSequenceRnnModel):
   """Class for RNN melody-given-chords generation models."""
 
   def generate_melody(self, primer_melody, backing_chords, temperature=1.0,
-                      beam_size=1, branch_factor=1, steps_per_iteration=1):
+                      beam_size=1, branch_factor=1, steps_per_iteration=1,
+                      random_state=None):
     """Generate a melody from a primer melody and backing chords.
 
     Args:
@@ -48,6 +49,8 @@ class ImprovRnnModel(events_rnn_model.EventSequenceRnnModel):
       branch_factor: An integer, beam search branch factor to use.
       steps_per_iteration: An integer, number of melody steps to take per beam
           search iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          melody. If None, the global numpy random state is used.
 
     Returns:
       The generated Melody object (which begins with the provided primer
@@ -65,12 +68,59 @@ class ImprovRnnModel(events_rnn_model.EventSequenceRnnModel):
     num_steps = len(chords)
     melody = self._generate_events(num_steps, melody, temperature, beam_size,
                                    branch_factor, steps_per_iteration,
-                                   control_events=chords)
+                                   control_events=chords,
+                                   random_state=random_state)
 
     melody.transpose(-transpose_amount)
 
     return melody
 
+  def generate_melodies(self, primer_melody, backing_chords, num_outputs,
+                        temperature=1.0, beam_size=1, branch_factor=1,
+                        steps_per_iteration=1, random_state=None):
+    """Generate multiple independent melodies over the same backing chords.
+
+    Args:
+      primer_melody: The primer melody, a Melody object. Should be the same
+          length as the primer chords.
+      backing_chords: The backing chords, a ChordProgression object. Must be at
+          least as long as the primer melody. The melodies will be extended to
+          match the length of the backing chords.
+      num_outputs: The integer number of melodies to generate.
+      temperature: A float specifying how much to divide the logits by
+          before computing the softmax. Greater than 1.0 makes melodies more
+          random, less than 1.0 makes melodies less random.
+      beam_size: An integer, beam size to use when generating melodies via beam
+          search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of melody steps to take per beam
+          search iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          melodies. If None, the global numpy random state is used.
+
+    Returns:
+      A list of `num_outputs` generated Melody objects (each of which begins
+          with the provided primer melody).
+    """
+    melody = copy.deepcopy(primer_melody)
+    chords = copy.deepcopy(backing_chords)
+
+    transpose_amount = melody.squash(
+        self._config.min_note,
+        self._config.max_note,
+        self._config.transpose_to_key)
+    chords.transpose(transpose_amount)
+
+    num_steps = len(chords)
+    melodies = self._generate_events_batch(
+        num_steps, melody, num_outputs, temperature, beam_size, branch_factor,
+        steps_per_iteration, control_events=chords, random_state=random_state)
+
+    for melody in melodies:
+      melody.transpose(-transpose_amount)
+
+    return melodies
+
   def melody_log_likelihood(self, melody, backing_chords):
     """Evaluate the log likelihood of a melody conditioned on backing chords.
 
@@ -43,6 +43,9 @@ class ImprovRnnSequenceGenerator(mm.BaseSequenceGenerator):
     self.steps_per_quarter = steps_per_quarter
 
   def _generate(self, input_sequence, generator_options):
+    return self._generate_batch(input_sequence, generator_options, 1)[0]
+
+  def _generate_batch(self, input_sequence, generator_options, num_outputs):
     if len(generator_options.input_sections) > 1:
       raise mm.SequenceGeneratorException(
           'This model supports at most one input_sections message, but got %s' %
@@ -144,11 +147,15 @@ class ImprovRnnSequenceGenerator(mm.BaseSequenceGenerator):
                 for name, value_fn in arg_types.items()
                 if name in generator_options.args)
 
-    generated_melody = self._model.generate_melody(melody, chords, **args)
-    generated_lead_sheet = mm.LeadSheet(generated_melody, chords)
-    generated_sequence = generated_lead_sheet.to_sequence(qpm=qpm)
-    assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
-    return generated_sequence
+    generated_melodies = self._model.generate_melodies(
+        melody, chords, num_outputs, **args)
+    generated_sequences = []
+    for generated_melody in generated_melodies:
+      generated_lead_sheet = mm.LeadSheet(generated_melody, chords)
+      generated_sequence = generated_lead_sheet.to_sequence(qpm=qpm)
+      assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
+      generated_sequences.append(generated_sequence)
+    return generated_sequences
 
 
 def get_generator_map():
@@ -45,6 +45,12 @@ tf.app.flags.DEFINE_string(
     'Comma-separated list of `name=value` pairs. For each pair, the value of '
     'the hyperparameter named `name` is set to `value`. This mapping is merged '
     'with the default hyperparameters.')
+tf.app.flags.DEFINE_boolean(
+    'sparse_inputs',
+    False,
+    'Whether SequenceExample input vectors are stored sparsely, as active '
+    'indices plus any other nonzero values, instead of as dense float lists. '
+    'Must match between dataset creation and training/evaluation.')
 
 
 class MelodyRnnConfigFlagsException(Exception):
@@ -127,8 +133,10 @@ def config_from_flags():
         melody_rnn_model.DEFAULT_MIN_NOTE, melody_rnn_model.DEFAULT_MAX_NOTE)
     hparams = tf.contrib.training.HParams()
     hparams.parse(FLAGS.hparams)
-    return melody_rnn_model.MelodyRnnConfig(
+    config = melody_rnn_model.MelodyRnnConfig(
         generator_details, encoder_decoder, hparams)
+    config.sparse_inputs = FLAGS.sparse_inputs
+    return config
   else:
     if FLAGS.config not in melody_rnn_model.default_configs:
       raise MelodyRnnConfigFlagsException(
@@ -140,4 +148,5 @@ def config_from_flags():
       config.details.id = FLAGS.generator_id
     if FLAGS.generator_description is not None:
       config.details.description = FLAGS.generator_description
+    config.sparse_inputs = FLAGS.sparse_inputs
     return config
@@ -42,6 +42,14 @@ tf.app.flags.DEFINE_string('output_dir', None,
 tf.app.flags.DEFINE_float('eval_ratio', 0.1,
                           'Fraction of input to set aside for eval set. '
                           'Partition is randomly selected.')
+tf.app.flags.DEFINE_integer('num_workers', 1,
+                            'The number of worker processes used to build the '
+                            'dataset. If greater than 1, inputs are processed '
+                            'in parallel and the partition is seeded with '
+                            '--seed.')
+tf.app.flags.DEFINE_integer('seed', 0,
+                            'Random seed used for partitioning inputs when '
+                            'num_workers is greater than 1.')
 tf.app.flags.DEFINE_string('log', 'INFO',
                            'The threshold for what messages will be logged '
                            'DEBUG, INFO, WARN, ERROR, or FATAL.')
@@ -66,13 +74,15 @@ class EncoderPipeline(pipeline.Pipeline):
     self._min_note = config.min_note
     self._max_note = config.max_note
     self._transpose_to_key = config.transpose_to_key
+    self._sparse_inputs = config.sparse_inputs
 
   def transform(self, melody):
     melody.squash(
         self._min_note,
         self._max_note,
         self._transpose_to_key)
-    encoded = self._melody_encoder_decoder.encode(melody)
+    encoded = self._melody_encoder_decoder.encode(
+        melody, sparse_inputs=self._sparse_inputs)
     return [encoded]
 
 
@@ -121,10 +131,20 @@ def main(unused_argv):
 
   FLAGS.input = os.path.expanduser(FLAGS.input)
   FLAGS.output_dir = os.path.expanduser(FLAGS.output_dir)
-  pipeline.run_pipeline_serial(
-      pipeline_instance,
-      pipeline.tf_record_iterator(FLAGS.input, pipeline_instance.input_type),
-      FLAGS.output_dir)
+  input_iterator = pipeline.tf_record_iterator(
+      FLAGS.input, pipeline_instance.input_type)
+  if FLAGS.num_workers > 1:
+    pipeline.run_pipeline_parallel(
+        pipeline_instance,
+        input_iterator,
+        FLAGS.output_dir,
+        num_workers=FLAGS.num_workers,
+        seed=FLAGS.seed)
+  else:
+    pipeline.run_pipeline_serial(
+        pipeline_instance,
+        input_iterator,
+        FLAGS.output_dir)
 
 
 def console_entry_point():
@@ -56,6 +56,11 @@ tf.app.flags.DEFINE_integer(
     'num_outputs', 10,
     'The number of melodies to generate. One MIDI file will be created for '
     'each.')
+tf.app.flags.DEFINE_boolean(
+    'batch_outputs', False,
+    'If true, all num_outputs melodies are generated together in batched '
+    'passes through the model rather than one at a time. Has no effect '
+    'when using beam search.')
 tf.app.flags.DEFINE_integer(
     'num_steps', 128,
     'The total number of steps the generated melodies should be, priming '
@@ -201,13 +206,18 @@ def run_with_flags(generator):
   tf.logging.debug('input_sequence: %s', input_sequence)
   tf.logging.debug('generator_options: %s', generator_options)
 
-  # Make the generate request num_outputs times and save the output as midi
-  # files.
+  # Make the generate request num_outputs times, or once for a batch of
+  # num_outputs sequences, and save the output as midi files.
+  if FLAGS.batch_outputs:
+    generated_sequences = generator.generate_batch(
+        input_sequence, generator_options, FLAGS.num_outputs)
+  else:
+    generated_sequences = (
+        generator.generate(input_sequence, generator_options)
+        for _ in range(FLAGS.num_outputs))
   date_and_time = time.strftime('%Y-%m-%d_%H%M%S')
   digits = len(str(FLAGS.num_outputs))
-  for i in range(FLAGS.num_outputs):
-    generated_sequence = generator.generate(input_sequence, generator_options)
-
+  for i, generated_sequence in enumerate(generated_sequences):
     midi_filename = '%s_%s.mid' % (date_and_time, str(i + 1).zfill(digits))
     midi_path = os.path.join(FLAGS.output_dir, midi_filename)
     magenta.music.sequence_proto_to_midi_file(generated_sequence, midi_path)
@@ -31,7 +31,8 @@ class MelodyRnnModel(events_rnn_model.EventSequenceRnnModel):
   """Class for RNN melody generation models."""
 
   def generate_melody(self, num_steps, primer_melody, temperature=1.0,
-                      beam_size=1, branch_factor=1, steps_per_iteration=1):
+                      beam_size=1, branch_factor=1, steps_per_iteration=1,
+                      random_state=None):
     """Generate a melody from a primer melody.
 
     Args:
@@ -46,6 +47,8 @@ class MelodyRnnModel(events_rnn_model.EventSequenceRnnModel):
       branch_factor: An integer, beam search branch factor to use.
       steps_per_iteration: An integer, number of melody steps to take per beam
           search iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          melody. If None, the global numpy random state is used.
 
     Returns:
       The generated Melody object (which begins with the provided primer
@@ -59,12 +62,54 @@ class MelodyRnnModel(events_rnn_model.EventSequenceRnnModel):
         self._config.transpose_to_key)
 
     melody = self._generate_events(num_steps, melody, temperature, beam_size,
-                                   branch_factor, steps_per_iteration)
+                                   branch_factor, steps_per_iteration,
+                                   random_state=random_state)
 
     melody.transpose(-transpose_amount)
 
     return melody
 
+  def generate_melodies(self, num_steps, primer_melody, num_outputs,
+                        temperature=1.0, beam_size=1, branch_factor=1,
+                        steps_per_iteration=1, random_state=None):
+    """Generate multiple independent melodies from a primer melody.
+
+    Args:
+      num_steps: The integer length in steps of the final melodies, after
+          generation. Includes the primer.
+      primer_melody: The primer melody, a Melody object.
+      num_outputs: The integer number of melodies to generate.
+      temperature: A float specifying how much to divide the logits by
+         before computing the softmax. Greater than 1.0 makes melodies more
+         random, less than 1.0 makes melodies less random.
+      beam_size: An integer, beam size to use when generating melodies via beam
+          search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of melody steps to take per beam
+          search iteration.
+      random_state: An optional np.random.RandomState used to sample the
+          melodies. If None, the global numpy random state is used.
+
+    Returns:
+      A list of `num_outputs` generated Melody objects (each of which begins
+          with the provided primer melody).
+    """
+    melody = copy.deepcopy(primer_melody)
+
+    transpose_amount = melody.squash(
+        self._config.min_note,
+        self._config.max_note,
+        self._config.transpose_to_key)
+
+    melodies = self._generate_events_batch(
+        num_steps, melody, num_outputs, temperature, beam_size, branch_factor,
+        steps_per_iteration, random_state=random_state)
+
+    for melody in melodies:
+      melody.transpose(-transpose_amount)
+
+    return melodies
+
   def melody_log_likelihood(self, melody):
     """Evaluate the log likelihood of a melody under the model.
 
@@ -101,6 +101,22 @@ def inv_mu_law(x, mu=255):
   return out
 
 
+def mu_law_numpy(x, mu=255.0):
+  """A numpy implementation of Mu-Law encoding.
+
+  Args:
+    x: The audio samples to encode.
+    mu: The Mu to use in our Mu-Law.
+
+  Returns:
+    out: The Mu-Law encoded data, as float32 values in [-128, 127].
+  """
+  x = np.array(x).astype(np.float32)
+  out = np.sign(x) * np.log(1 + mu * np.abs(x)) / np.log(1 + mu)
+  out = np.floor(out * 128).astype(np.float32)
+  return out
+
+
 def inv_mu_law_numpy(x, mu=255.0):
   """A numpy implementation of inverse Mu-Law.
 
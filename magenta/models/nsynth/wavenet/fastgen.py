@@ -20,11 +20,13 @@ Chang, S., Zhang, Y., ... Huang, T. (2017).
 Fast Generation For Convolutional Autoregressive Models, 1-5.
 """
 import os
+import struct
 import numpy as np
 from scipy.io import wavfile
 import tensorflow as tf
 
 from magenta.models.nsynth import utils
+from magenta.models.nsynth.wavenet import numpy_fastgen
 from magenta.models.nsynth.wavenet.h512_bo16 import Config
 from magenta.models.nsynth.wavenet.h512_bo16 import FastGenerationConfig
 
@@ -112,6 +114,101 @@ def encode(wav_data, checkpoint_path, sample_length=64000):
   return encodings
 
 
+class NSynthEncoder(object):
+  """Encodes batches of audio with a persistent NSynth autoencoder session.
+
+  Unlike `encode`, which builds a new graph and restores the checkpoint on every
+  call, the checkpoint is restored once into a single session, and the network
+  for each distinct (trimmed) clip length is built once and then reused.
+
+  Clips are trimmed as in `encode`, so the encodings are the same as those of
+  `encode`. Batches with fewer than `batch_size` clips are padded with silent
+  clips, whose encodings are discarded.
+  """
+
+  def __init__(self, checkpoint_path, batch_size=1, sample_length=64000):
+    """Creates an NSynthEncoder.
+
+    Args:
+      checkpoint_path: Location of the pretrained model.
+      batch_size: Maximum number of audio clips to encode per batch. [1]
+      sample_length: Maximum number of samples of audio to encode. [64000]
+    """
+    self._checkpoint_path = checkpoint_path
+    self._batch_size = batch_size
+    self._sample_length = sample_length
+    self._hop_length = Config().ae_hop_length
+    self._session = None
+    self._nets = {}
+
+  def _load(self, sample_length):
+    """Builds the network for `sample_length` samples.
+
+    The networks for all sample lengths share the variables of the first one,
+    into which the checkpoint is restored.
+
+    Args:
+      sample_length: Number of samples in the input audio.
+    """
+    tf.logging.info("Building NSynth encoder for %d samples.", sample_length)
+    if self._session is None:
+      session_config = tf.ConfigProto(allow_soft_placement=True)
+      self._session = tf.Session(graph=tf.Graph(), config=session_config)
+    restore = not self._nets
+    with self._session.graph.as_default():
+      with tf.variable_scope(tf.get_variable_scope(), reuse=not restore):
+        self._nets[sample_length] = load_nsynth(batch_size=self._batch_size,
+                                                sample_length=sample_length)
+      if restore:
+        saver = tf.train.Saver()
+        saver.restore(self._session, self._checkpoint_path)
+
+  def encode(self, wav_data):
+    """Generate an array of embeddings from an array of audio.
+
+    Args:
+      wav_data: Numpy array [num_clips, sample_length], where num_clips is at
+        most `batch_size`, or a single 1-D clip.
+    Returns:
+      encoding: a [num_clips, 125, 16] encoding (for 64000 sample audio files).
+    Raises:
+      ValueError: If `wav_data` contains more than `batch_size` clips.
+    """
+    if wav_data.ndim == 1:
+      wav_data = np.expand_dims(wav_data, 0)
+    num_clips = wav_data.shape[0]
+    if num_clips > self._batch_size:
+      raise ValueError("Got %d audio clips but batch size is %d." %
+                       (num_clips, self._batch_size))
+
+    wav_data, sample_length = utils.trim_for_encoding(
+        wav_data, self._sample_length, self._hop_length)
+    if sample_length not in self._nets:
+      self._load(sample_length)
+    net = self._nets[sample_length]
+
+    padded_wav_data = np.zeros([self._batch_size, sample_length],
+                               dtype=wav_data.dtype)
+    padded_wav_data[:num_clips] = wav_data
+
+    encodings = self._session.run(net["encoding"],
+                                  feed_dict={net["X"]: padded_wav_data})
+    return encodings[:num_clips]
+
+  def close(self):
+    """Closes the TF session, if open."""
+    if self._session is not None:
+      self._session.close()
+      self._session = None
+      self._nets = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
 def load_batch(files, sample_length=64000):
   """Load a batch of data from either .wav or .npy files.
 
@@ -156,48 +253,155 @@ def save_batch(batch_audio, batch_save_paths):
     wavfile.write(name, 16000, audio)
 
 
+class StreamingWavWriter(object):
+  """Writes a mono 32-bit float WAV file incrementally.
+
+  The header is written with placeholder sizes when the file is opened and
+  patched when it is closed, so each call to `write` only appends new samples.
+  """
+
+  def __init__(self, path, sample_rate=16000):
+    """Opens `path` for writing.
+
+    Args:
+      path: Location of the WAV file to write.
+      sample_rate: Samples per a second. [16000]
+    """
+    self._file = open(path, "wb")
+    self._sample_rate = sample_rate
+    self._num_samples = 0
+    self._write_header()
+
+  def _write_header(self):
+    data_size = 4 * self._num_samples
+    self._file.write(struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"))
+    # Format 3 is IEEE float; one channel of 4-byte samples.
+    self._file.write(struct.pack("<4sIHHIIHH", b"fmt ", 16, 3, 1,
+                                 self._sample_rate, 4 * self._sample_rate, 4,
+                                 32))
+    self._file.write(struct.pack("<4sI", b"data", data_size))
+
+  def write(self, audio):
+    """Appends samples to the file.
+
+    Args:
+      audio: 1-D array of samples from -1.0 to 1.0.
+    """
+    audio = np.asarray(audio, dtype="<f4")
+    self._file.write(audio.tobytes())
+    self._num_samples += audio.size
+
+  def close(self):
+    """Patches the header with the final sizes and closes the file."""
+    if self._file is None:
+      return
+    self._file.seek(0)
+    self._write_header()
+    self._file.close()
+    self._file = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+
+def _generate_audio(predict, encodings, hop_length, samples_per_save,
+                    save_chunk):
+  """Regenerates a batch of audio sample by sample.
+
+  Args:
+    predict: Function of (audio [batch_size, 1], encoding [batch_size, dim])
+      returning the pmf over the next sample, [batch_size, 256].
+    encodings: Numpy array with shape [batch_size, time, dim].
+    hop_length: Number of samples per encoding frame.
+    samples_per_save: Save files after every amount of generated samples.
+    save_chunk: Function called with each newly generated chunk of audio.
+  """
+  batch_size = encodings.shape[0]
+  total_length = encodings.shape[1] * hop_length
+
+  audio_batch = np.zeros((batch_size, total_length,), dtype=np.float32)
+  audio = np.zeros([batch_size, 1])
+  num_saved = 0
+
+  for sample_i in range(total_length):
+    enc_i = sample_i // hop_length
+    pmf = predict(audio, encodings[:, enc_i, :])
+    sample_bin = sample_categorical(pmf)
+    audio = utils.inv_mu_law_numpy(sample_bin - 128)
+    audio_batch[:, sample_i] = audio[:, 0]
+    if sample_i % 100 == 0:
+      tf.logging.info("Sample: %d" % sample_i)
+    if sample_i % samples_per_save == 0:
+      save_chunk(audio_batch[:, num_saved:sample_i + 1])
+      num_saved = sample_i + 1
+  save_chunk(audio_batch[:, num_saved:])
+
+
 def synthesize(encodings,
                save_paths,
                checkpoint_path="model.ckpt-200000",
-               samples_per_save=1000):
+               samples_per_save=1000,
+               audio_callback=None,
+               use_numpy=False):
   """Synthesize audio from an array of embeddings.
 
+  Audio is appended to the output files as it is generated, so each sample is
+  only written once.
+
   Args:
     encodings: Numpy array with shape [batch_size, time, dim].
     save_paths: Iterable of output file names.
     checkpoint_path: Location of the pretrained model. [model.ckpt-200000]
     samples_per_save: Save files after every amount of generated samples.
+    audio_callback: Optional function called with each newly generated chunk
+      of audio, a [batch_size, chunk_length] array, whenever the files are
+      saved. For example, `queue.put` can be used to stream audio for live
+      playback.
+    use_numpy: If True, generate with `numpy_fastgen.NumpyFastGenerator`
+      instead of a TF session. This avoids a `Session.run` call per sample and
+      is usually faster on CPU.
   """
   hop_length = Config().ae_hop_length
-  # Get lengths
   batch_size = encodings.shape[0]
-  encoding_length = encodings.shape[1]
-  total_length = encoding_length * hop_length
 
-  session_config = tf.ConfigProto(allow_soft_placement=True)
-  with tf.Graph().as_default(), tf.Session(config=session_config) as sess:
-    net = load_fastgen_nsynth(batch_size=batch_size)
-    saver = tf.train.Saver()
-    saver.restore(sess, checkpoint_path)
+  writers = []
+  try:
+    for name in save_paths:
+      tf.logging.info("Saving: %s" % name)
+      writers.append(StreamingWavWriter(name))
+
+    def save_chunk(chunk):
+      for writer, audio in zip(writers, chunk):
+        writer.write(audio)
+      if audio_callback is not None:
+        audio_callback(chunk)
+
+    if use_numpy:
+      generator = numpy_fastgen.NumpyFastGenerator(
+          numpy_fastgen.load_weights(checkpoint_path), batch_size=batch_size)
+      _generate_audio(generator.step, encodings, hop_length, samples_per_save,
+                      save_chunk)
+      return
+
+    session_config = tf.ConfigProto(allow_soft_placement=True)
+    with tf.Graph().as_default(), tf.Session(config=session_config) as sess:
+      net = load_fastgen_nsynth(batch_size=batch_size)
+      saver = tf.train.Saver()
+      saver.restore(sess, checkpoint_path)
+
+      # initialize queues w/ 0s
+      sess.run(net["init_ops"])
+
+      def predict(audio, encoding):
+        return sess.run(
+            [net["predictions"], net["push_ops"]],
+            feed_dict={net["X"]: audio, net["encoding"]: encoding})[0]
 
-    # initialize queues w/ 0s
-    sess.run(net["init_ops"])
-
-    # Regenerate the audio file sample by sample
-    audio_batch = np.zeros((batch_size, total_length,), dtype=np.float32)
-    audio = np.zeros([batch_size, 1])
-
-    for sample_i in range(total_length):
-      enc_i = sample_i // hop_length
-      pmf = sess.run(
-          [net["predictions"], net["push_ops"]],
-          feed_dict={net["X"]: audio,
-                     net["encoding"]: encodings[:, enc_i, :]})[0]
-      sample_bin = sample_categorical(pmf)
-      audio = utils.inv_mu_law_numpy(sample_bin - 128)
-      audio_batch[:, sample_i] = audio[:, 0]
-      if sample_i % 100 == 0:
-        tf.logging.info("Sample: %d" % sample_i)
-      if sample_i % samples_per_save == 0:
-        save_batch(audio_batch, save_paths)
-  save_batch(audio_batch, save_paths)
+      _generate_audio(predict, encodings, hop_length, samples_per_save,
+                      save_chunk)
+  finally:
+    for writer in writers:
+      writer.close()
@@ -0,0 +1,130 @@
+# Copyright 2017 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for fastgen."""
+
+import os
+
+# internal imports
+import numpy as np
+from scipy.io import wavfile
+import tensorflow as tf
+
+from magenta.models.nsynth.wavenet import fastgen
+
+
+def _load_frame_mean_net(batch_size=1, sample_length=64000):
+  """A stand-in for `fastgen.load_nsynth` that is quick to build and run.
+
+  Each encoding frame is the mean of its hop of audio, times a variable.
+
+  Args:
+    batch_size: Batch size number of observations to process.
+    sample_length: Number of samples in the input audio.
+
+  Returns:
+    graph: The network as a dict with input placeholder in {"X"}.
+  """
+  hop_length = fastgen.Config().ae_hop_length
+  x = tf.placeholder(tf.float32, shape=[batch_size, sample_length])
+  scale = tf.get_variable("scale", shape=[], initializer=tf.ones_initializer())
+  frames = tf.reshape(x, [batch_size, sample_length // hop_length, hop_length])
+  encoding = tf.reduce_mean(frames, axis=2, keep_dims=True) * scale
+  return {"X": x, "encoding": encoding}
+
+
+class FastgenTest(tf.test.TestCase):
+
+  def testNSynthEncoderBuildsOncePerLength(self):
+    hop_length = fastgen.Config().ae_hop_length
+    built_lengths = []
+
+    def counting_load_nsynth(batch_size=1, sample_length=64000):
+      built_lengths.append(sample_length)
+      return _load_frame_mean_net(batch_size, sample_length)
+
+    load_nsynth = fastgen.load_nsynth
+    fastgen.load_nsynth = counting_load_nsynth
+    self.addCleanup(setattr, fastgen, "load_nsynth", load_nsynth)
+
+    with tf.Graph().as_default():
+      _load_frame_mean_net()
+      saver = tf.train.Saver()
+      with self.test_session() as sess:
+        sess.run(tf.global_variables_initializer())
+        checkpoint_path = saver.save(
+            sess, os.path.join(self.get_temp_dir(), "model.ckpt"))
+
+    # Batches of clips with different lengths, including clips longer than the
+    # sample length and batches smaller than the batch size.
+    rs = np.random.RandomState(0)
+    with fastgen.NSynthEncoder(checkpoint_path, batch_size=3,
+                               sample_length=4 * hop_length + 10) as encoder:
+      for num_clips, num_samples in [(3, 5 * hop_length), (2, 2 * hop_length),
+                                     (3, 3 * hop_length + 100), (1, hop_length),
+                                     (2, 4 * hop_length), (3, 2 * hop_length)]:
+        wav_data = rs.uniform(-1.0, 1.0, [num_clips, num_samples]).astype(
+            np.float32)
+        encoding = encoder.encode(wav_data)
+
+        num_frames = min(num_samples // hop_length, 4)
+        expected = wav_data[:, :num_frames * hop_length].reshape(
+            [num_clips, num_frames, hop_length]).mean(axis=2, keepdims=True)
+        self.assertAllClose(expected, encoding)
+
+    self.assertEquals([h * hop_length for h in [4, 2, 3, 1]], built_lengths)
+
+  def testNSynthEncoderMatchesEncode(self):
+    hop_length = fastgen.Config().ae_hop_length
+    with tf.Graph().as_default():
+      tf.set_random_seed(0)
+      fastgen.load_nsynth(batch_size=1, sample_length=hop_length)
+      saver = tf.train.Saver()
+      config = tf.ConfigProto(allow_soft_placement=True)
+      with self.test_session(config=config) as sess:
+        sess.run(tf.global_variables_initializer())
+        checkpoint_path = saver.save(
+            sess, os.path.join(self.get_temp_dir(), "model.ckpt"))
+
+    # The encoder is not causal, so padding clips shorter than the sample length
+    # with silence would change their encodings.
+    rs = np.random.RandomState(0)
+    sample_length = 4 * hop_length
+    with fastgen.NSynthEncoder(checkpoint_path, batch_size=3,
+                               sample_length=sample_length) as encoder:
+      for num_clips, num_samples in [(2, 2 * hop_length + 100),
+                                     (3, sample_length)]:
+        wav_data = rs.uniform(-1.0, 1.0, [num_clips, num_samples]).astype(
+            np.float32)
+        expected = fastgen.encode(wav_data, checkpoint_path, sample_length)
+        self.assertAllClose(expected, encoder.encode(wav_data), rtol=1e-4)
+
+  def testStreamingWavWriter(self):
+    path = os.path.join(self.get_temp_dir(), "streamed.wav")
+    rs = np.random.RandomState(0)
+    chunks = [rs.uniform(-1.0, 1.0, size).astype(np.float32)
+              for size in [1, 1000, 0, 257]]
+    with fastgen.StreamingWavWriter(path, sample_rate=8000) as writer:
+      for chunk in chunks:
+        writer.write(chunk)
+      # Chunks of other dtypes are written as float32.
+      writer.write(np.array([0.5, -0.25], dtype=np.float64))
+
+    sample_rate, audio = wavfile.read(path)
+    self.assertEquals(8000, sample_rate)
+    self.assertEquals(np.float32, audio.dtype)
+    self.assertAllEqual(np.concatenate(chunks + [[0.5, -0.25]]), audio)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -32,6 +32,10 @@ tf.app.flags.DEFINE_string("checkpoint_path", "model.ckpt-200000",
 tf.app.flags.DEFINE_integer("sample_length", 100000000,
                             "Max output file size in samples.")
 tf.app.flags.DEFINE_integer("batch_size", 1, "Number of samples per a batch.")
+tf.app.flags.DEFINE_boolean("use_numpy", False,
+                            "If True, synthesize with the NumPy fast "
+                            "generation engine instead of TensorFlow. Faster "
+                            "on CPU-only machines.")
 tf.app.flags.DEFINE_string("log", "INFO",
                            "The threshold for what messages will be logged."
                            "DEBUG, INFO, WARN, ERROR, or FATAL.")
@@ -82,7 +86,8 @@ def main(unused_argv=None):
     # Encode waveforms
     encodings = batch_data if postfix == ".npy" else fastgen.encode(
         batch_data, checkpoint_path, sample_length=sample_length)
-    fastgen.synthesize(encodings, save_names, checkpoint_path=checkpoint_path)
+    fastgen.synthesize(encodings, save_names, checkpoint_path=checkpoint_path,
+                       use_numpy=FLAGS.use_numpy)
 
 
 def console_entry_point():
@@ -13,6 +13,8 @@
 # limitations under the License.
 """With a trained model, compute the embeddings on a directory of WAV files."""
 
+import collections
+from multiprocessing.pool import ThreadPool
 import os
 import sys
 
@@ -21,7 +23,7 @@ import numpy as np
 import tensorflow as tf
 
 from magenta.models.nsynth import utils
-from magenta.models.nsynth.wavenet.fastgen import encode
+from magenta.models.nsynth.wavenet import fastgen
 
 FLAGS = tf.app.flags.FLAGS
 
@@ -37,6 +39,9 @@ tf.app.flags.DEFINE_string("expdir", "",
                            "`checkpoint_path` is not given.")
 tf.app.flags.DEFINE_integer("sample_length", 64000, "Sample length.")
 tf.app.flags.DEFINE_integer("batch_size", 16, "Sample length.")
+tf.app.flags.DEFINE_integer("num_load_threads", 4,
+                            "The number of threads used to load and decode "
+                            "audio ahead of the encoder.")
 tf.app.flags.DEFINE_string("log", "INFO",
                            "The threshold for what messages will be logged."
                            "DEBUG, INFO, WARN, ERROR, or FATAL.")
@@ -86,38 +91,61 @@ def main(unused_argv=None):
       for fname in tf.gfile.ListDirectory(source_path) if is_wav(fname)
   ])
 
-  for start_file in xrange(0, len(wavfiles), batch_size):
-    batch_number = (start_file / batch_size) + 1
-    tf.logging.info("On file number %s (batch %d).", start_file, batch_number)
-    end_file = start_file + batch_size
-    wavefiles_batch = wavfiles[start_file:end_file]
-
-    # Ensure that files has batch_size elements.
-    batch_filler = batch_size - len(wavefiles_batch)
-    wavefiles_batch.extend(batch_filler * [wavefiles_batch[-1]])
-    wav_data = np.array(
-        [utils.load_audio(f, sample_length) for f in wavefiles_batch])
-    try:
-      tf.reset_default_graph()
-      # Load up the model for encoding and find the encoding
-      encoding = encode(wav_data, checkpoint_path, sample_length=sample_length)
-      if encoding.ndim == 2:
-        encoding = np.expand_dims(encoding, 0)
-
-      tf.logging.info("Encoding:")
-      tf.logging.info(encoding.shape)
-      tf.logging.info("Sample length: %d" % sample_length)
-
-      for num, (wavfile, enc) in enumerate(zip(wavefiles_batch, encoding)):
-        filename = "%s_embeddings.npy" % wavfile.split("/")[-1].strip(".wav")
-        with tf.gfile.Open(os.path.join(save_path, filename), "w") as f:
-          np.save(f, enc)
-
-        if num + batch_filler + 1 == batch_size:
-          break
-    except Exception, e:
-      tf.logging.info("Unexpected error happened: %s.", e)
-      raise
+  file_batches = [wavfiles[start_file:start_file + batch_size]
+                  for start_file in xrange(0, len(wavfiles), batch_size)]
+
+  with fastgen.NSynthEncoder(checkpoint_path, batch_size=batch_size,
+                             sample_length=sample_length) as encoder:
+    for batch_number, (wavefiles_batch, wav_data) in enumerate(
+        _prefetch_batches(file_batches, sample_length,
+                          FLAGS.num_load_threads)):
+      tf.logging.info("On file number %s (batch %d).",
+                      batch_number * batch_size, batch_number + 1)
+      try:
+        # Find the encoding with the already loaded model.
+        encoding = encoder.encode(wav_data)
+
+        tf.logging.info("Encoding:")
+        tf.logging.info(encoding.shape)
+        tf.logging.info("Sample length: %d" % sample_length)
+
+        for wavfile, enc in zip(wavefiles_batch, encoding):
+          filename = "%s_embeddings.npy" % wavfile.split("/")[-1].strip(".wav")
+          with tf.gfile.Open(os.path.join(save_path, filename), "w") as f:
+            np.save(f, enc)
+      except Exception, e:
+        tf.logging.info("Unexpected error happened: %s.", e)
+        raise
+
+
+def _prefetch_batches(file_batches, sample_length, num_threads):
+  """Loads batches of audio in background threads.
+
+  Up to two batches per thread are decoded ahead of the consumer.
+
+  Args:
+    file_batches: A list of lists of WAV file paths.
+    sample_length: Maximum number of samples to load from each file.
+    num_threads: The number of loader threads.
+
+  Yields:
+    Tuples of (file paths, audio array) for each batch, in order.
+  """
+  pool = ThreadPool(num_threads)
+  pending = collections.deque()
+  try:
+    for files in file_batches:
+      pending.append((files, pool.apply_async(
+          fastgen.load_batch, (files,), {"sample_length": sample_length})))
+      if len(pending) >= 2 * num_threads:
+        files, result = pending.popleft()
+        yield files, result.get()
+    while pending:
+      files, result = pending.popleft()
+      yield files, result.get()
+  finally:
+    pool.terminate()
+    pool.join()
 
 
 def console_entry_point():
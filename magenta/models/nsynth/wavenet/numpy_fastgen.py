@@ -0,0 +1,160 @@
+# Copyright 2017 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A NumPy implementation of "fast" wavenet generation for CPUs.
+
+Computes the same network as `h512_bo16.FastGenerationConfig`, but replaces
+the TF queues with a ring buffer per layer and runs every sample with a few
+vectorized matmuls instead of a `Session.run` call.
+"""
+import numpy as np
+import tensorflow as tf
+
+from magenta.models.nsynth import utils
+
+
+def load_weights(checkpoint_path):
+  """Load the weights of a pretrained model into a dict of numpy arrays.
+
+  Args:
+    checkpoint_path: Location of the pretrained model.
+
+  Returns:
+    weights: Dict mapping variable names (e.g. "dilatedconv_1/W") to float32
+      numpy arrays.
+  """
+  reader = tf.train.NewCheckpointReader(checkpoint_path)
+  return {name: reader.get_tensor(name).astype(np.float32)
+          for name in reader.get_variable_to_shape_map()}
+
+
+def _sigmoid(x):
+  return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _softmax(x):
+  e = np.exp(x - np.max(x, axis=1, keepdims=True))
+  return e / np.sum(e, axis=1, keepdims=True)
+
+
+class NumpyFastGenerator(object):
+  """Steps the NSynth WaveNet decoder one sample at a time in NumPy.
+
+  Each dilated convolution with filter length 3 and dilation `rate` keeps a
+  ring buffer of its last `2 * rate` inputs, which plays the role of the two
+  `rate`-long queues in `utils.causal_linear`.
+  """
+
+  def __init__(self, weights, batch_size=1, num_stages=10, num_layers=30,
+               filter_length=3):
+    """Creates a NumpyFastGenerator.
+
+    Args:
+      weights: Dict of numpy arrays, as returned by `load_weights`.
+      batch_size: Batch size number of observations to process. [1]
+      num_stages: Number of layers per dilation cycle. [10]
+      num_layers: Number of residual layers. [30]
+      filter_length: The length of the dilated convolutions, assumed to be 3.
+    """
+    assert filter_length == 3
+    self.batch_size = batch_size
+    self._num_layers = num_layers
+
+    def conv(name):
+      # [1, 3, n_in, n_out] -> [3 * n_in, n_out], ordered oldest tap first to
+      # match the concatenated [x[t - 2r], x[t - r], x[t]] inputs.
+      w = weights[name + "/W"][0]
+      return w.reshape([-1, w.shape[-1]]), weights[name + "/biases"]
+
+    def dense(name):
+      return weights[name + "/W"][0][0], weights[name + "/biases"]
+
+    # Layer 0 is the start convolution; layers 1..num_layers are dilated.
+    self._rates = [1] + [2**(i % num_stages) for i in range(num_layers)]
+    self._convs = [conv("startconv")] + [
+        conv("dilatedconv_%d" % (i + 1)) for i in range(num_layers)]
+
+    self._skip_start = dense("skip_start")
+    # Fuse the residual and skip projections of each layer into one matmul.
+    self._res_skip = []
+    for i in range(num_layers):
+      res_w, res_b = dense("res_%d" % (i + 1))
+      skip_w, skip_b = dense("skip_%d" % (i + 1))
+      self._res_skip.append((np.concatenate([res_w, skip_w], axis=1),
+                             np.concatenate([res_b, skip_b])))
+    self._width = self._res_skip[0][0].shape[0]
+
+    # Fuse all conditioning projections of the encoding into one matmul.
+    cond = [dense("cond_map_%d" % (i + 1)) for i in range(num_layers)]
+    cond.append(dense("cond_map_out1"))
+    self._cond_splits = np.cumsum([b.shape[0] for _, b in cond])[:-1]
+    self._cond_w = np.concatenate([w for w, _ in cond], axis=1)
+    self._cond_b = np.concatenate([b for _, b in cond])
+
+    self._out1 = dense("out1")
+    self._logits = dense("logits")
+
+    self.reset()
+
+  def reset(self):
+    """Zeros the ring buffers, like running the `init_ops`."""
+    self._buffers = [
+        np.zeros([2 * rate, self.batch_size, w.shape[0] // 3], np.float32)
+        for rate, (w, _) in zip(self._rates, self._convs)]
+    self._sample_i = 0
+
+  def _causal_conv(self, layer, x):
+    """Applies one dilated convolution to the newest input `x`."""
+    rate = self._rates[layer]
+    buf = self._buffers[layer]
+    pos = self._sample_i % (2 * rate)
+    # buf[pos] holds x[t - 2 * rate]; buf[pos - rate] holds x[t - rate].
+    taps = np.concatenate([buf[pos], buf[pos - rate], x], axis=1)
+    buf[pos] = x
+    w, b = self._convs[layer]
+    return np.dot(taps, w) + b
+
+  def step(self, audio, encoding):
+    """Generates the distribution over the next sample.
+
+    Args:
+      audio: Array [batch_size, 1] of the previous audio sample, from -1.0 to
+        1.0.
+      encoding: Array [batch_size, num_z] of the current encoding frame.
+
+    Returns:
+      pmf: Array [batch_size, 256] of probabilities for the next sample.
+    """
+    x = utils.mu_law_numpy(audio).reshape([self.batch_size, 1]) / 128.0
+    en = np.asarray(encoding, dtype=np.float32)
+    conds = np.split(np.dot(en, self._cond_w) + self._cond_b,
+                     self._cond_splits, axis=1)
+
+    l = self._causal_conv(0, x)
+    s = np.dot(l, self._skip_start[0]) + self._skip_start[1]
+
+    for i in range(self._num_layers):
+      d = self._causal_conv(i + 1, l) + conds[i]
+      m = d.shape[1] // 2
+      d = _sigmoid(d[:, :m]) * np.tanh(d[:, m:])
+      res_skip = np.dot(d, self._res_skip[i][0]) + self._res_skip[i][1]
+      l = l + res_skip[:, :self._width]
+      s = s + res_skip[:, self._width:]
+
+    s = np.maximum(s, 0.0)
+    s = np.dot(s, self._out1[0]) + self._out1[1] + conds[-1]
+    s = np.maximum(s, 0.0)
+    logits = np.dot(s, self._logits[0]) + self._logits[1]
+
+    self._sample_i += 1
+    return _softmax(logits)
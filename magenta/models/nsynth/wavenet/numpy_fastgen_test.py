@@ -0,0 +1,62 @@
+# Copyright 2017 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for numpy_fastgen."""
+
+import os
+
+# internal imports
+import numpy as np
+import tensorflow as tf
+
+from magenta.models.nsynth.wavenet import fastgen
+from magenta.models.nsynth.wavenet import numpy_fastgen
+
+
+class NumpyFastGeneratorTest(tf.test.TestCase):
+
+  def testStepMatchesFastGenerationGraph(self):
+    batch_size = 2
+    # Long enough for the queues of the deepest layers, with dilation 512, to
+    # fill up and wrap around.
+    num_steps = 2 * 512 + 10
+    rs = np.random.RandomState(0)
+
+    with tf.Graph().as_default():
+      tf.set_random_seed(0)
+      net = fastgen.load_fastgen_nsynth(batch_size=batch_size)
+      saver = tf.train.Saver()
+      config = tf.ConfigProto(allow_soft_placement=True)
+      with self.test_session(config=config) as sess:
+        # Save the randomly initialized weights for the NumPy generator.
+        sess.run(tf.global_variables_initializer())
+        checkpoint_path = saver.save(
+            sess, os.path.join(self.get_temp_dir(), "model.ckpt"))
+        generator = numpy_fastgen.NumpyFastGenerator(
+            numpy_fastgen.load_weights(checkpoint_path),
+            batch_size=batch_size)
+
+        num_z = net["encoding"].shape[1].value
+        sess.run(net["init_ops"])
+        for _ in range(num_steps):
+          audio = rs.uniform(-1.0, 1.0, [batch_size, 1]).astype(np.float32)
+          encoding = rs.normal(size=[batch_size, num_z]).astype(np.float32)
+          expected_pmf = sess.run(
+              [net["predictions"], net["push_ops"]],
+              feed_dict={net["X"]: audio, net["encoding"]: encoding})[0]
+          pmf = generator.step(audio, encoding)
+          self.assertAllClose(expected_pmf, pmf, rtol=1e-3, atol=1e-6)
+
+
+if __name__ == "__main__":
+  tf.test.main()
@@ -15,11 +15,14 @@
 
 from __future__ import division
 
+import array
+import bisect
 import collections
-import copy
 import math
 
 # internal imports
+import numpy as np
+from six.moves import zip  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
 from magenta.music import constants
@@ -46,6 +49,8 @@ MAX_SHIFT_STEPS = 100
 class PerformanceEvent(object):
   """Class for storing events in a performance."""
 
+  __slots__ = ('event_type', 'event_value')
+
   # Start of a new note.
   NOTE_ON = 1
   # End of a note.
@@ -73,6 +78,14 @@ class PerformanceEvent(object):
     self.event_type = event_type
     self.event_value = event_value
 
+  @classmethod
+  def _from_packed(cls, event_type, event_value):
+    """Creates an event from already-validated packed values."""
+    event = cls.__new__(cls)
+    event.event_type = event_type
+    event.event_value = event_value
+    return event
+
   def __repr__(self):
     return 'PerformanceEvent(%r, %r)' % (self.event_type, self.event_value)
 
@@ -86,7 +99,9 @@ class PerformanceEvent(object):
 class Performance(events_lib.EventSequence):
   """Stores a polyphonic sequence as a stream of performance events.
 
-  Events are PerformanceEvent objects that encode event type and value.
+  Events are PerformanceEvent objects that encode event type and value. They
+  are stored packed in parallel arrays of types and values, and a new
+  PerformanceEvent is created each time an event is accessed.
   """
 
   def __init__(self, quantized_sequence=None, steps_per_second=None,
@@ -118,14 +133,22 @@ class Performance(events_lib.EventSequence):
 
     if quantized_sequence:
       sequences_lib.assert_is_absolute_quantized_sequence(quantized_sequence)
-      self._events = self._from_quantized_sequence(
+      events = self._from_quantized_sequence(
           quantized_sequence, start_step, num_velocity_bins)
       self._steps_per_second = (
           quantized_sequence.quantization_info.steps_per_second)
     else:
-      self._events = []
+      events = []
       self._steps_per_second = steps_per_second
 
+    # `_cumulative_steps[i]` is the number of steps through the end of event i,
+    # kept in sync with the events so that step lookups don't rescan them.
+    self._event_types = array.array('h')
+    self._event_values = array.array('h')
+    self._cumulative_steps = array.array('l')
+    for event in events:
+      self._push_event(event.event_type, event.event_value)
+
     self._start_step = start_step
     self._num_velocity_bins = num_velocity_bins
 
@@ -137,46 +160,54 @@ class Performance(events_lib.EventSequence):
   def steps_per_second(self):
     return self._steps_per_second
 
+  def _push_event(self, event_type, event_value):
+    """Appends an event and updates the cumulative step counts."""
+    steps = self._cumulative_steps[-1] if self._cumulative_steps else 0
+    if event_type == PerformanceEvent.TIME_SHIFT:
+      steps += event_value
+    self._event_types.append(event_type)
+    self._event_values.append(event_value)
+    self._cumulative_steps.append(steps)
+
+  def _pop_event(self):
+    """Removes the last event, returning its value."""
+    self._cumulative_steps.pop()
+    self._event_types.pop()
+    return self._event_values.pop()
+
   def _append_steps(self, num_steps):
     """Adds steps to the end of the sequence."""
-    if (self._events and
-        self._events[-1].event_type == PerformanceEvent.TIME_SHIFT and
-        self._events[-1].event_value < MAX_SHIFT_STEPS):
+    if (self._event_types and
+        self._event_types[-1] == PerformanceEvent.TIME_SHIFT and
+        self._event_values[-1] < MAX_SHIFT_STEPS):
       # Last event is already non-maximal time shift. Increase its duration.
       added_steps = min(num_steps,
-                        MAX_SHIFT_STEPS - self._events[-1].event_value)
-      self._events[-1] = PerformanceEvent(
-          PerformanceEvent.TIME_SHIFT,
-          self._events[-1].event_value + added_steps)
+                        MAX_SHIFT_STEPS - self._event_values[-1])
+      self._push_event(PerformanceEvent.TIME_SHIFT,
+                       self._pop_event() + added_steps)
       num_steps -= added_steps
 
     while num_steps >= MAX_SHIFT_STEPS:
-      self._events.append(
-          PerformanceEvent(event_type=PerformanceEvent.TIME_SHIFT,
-                           event_value=MAX_SHIFT_STEPS))
+      self._push_event(PerformanceEvent.TIME_SHIFT, MAX_SHIFT_STEPS)
       num_steps -= MAX_SHIFT_STEPS
 
     if num_steps > 0:
-      self._events.append(
-          PerformanceEvent(event_type=PerformanceEvent.TIME_SHIFT,
-                           event_value=num_steps))
+      self._push_event(PerformanceEvent.TIME_SHIFT, num_steps)
 
   def _trim_steps(self, num_steps):
     """Trims a given number of steps from the end of the sequence."""
     steps_trimmed = 0
-    while self._events and steps_trimmed < num_steps:
-      if self._events[-1].event_type == PerformanceEvent.TIME_SHIFT:
-        if steps_trimmed + self._events[-1].event_value > num_steps:
-          self._events[-1] = PerformanceEvent(
-              event_type=PerformanceEvent.TIME_SHIFT,
-              event_value=(self._events[-1].event_value -
-                           num_steps + steps_trimmed))
+    while self._event_types and steps_trimmed < num_steps:
+      if self._event_types[-1] == PerformanceEvent.TIME_SHIFT:
+        if steps_trimmed + self._event_values[-1] > num_steps:
+          self._push_event(
+              PerformanceEvent.TIME_SHIFT,
+              self._pop_event() - num_steps + steps_trimmed)
           steps_trimmed = num_steps
         else:
-          steps_trimmed += self._events[-1].event_value
-          self._events.pop()
+          steps_trimmed += self._pop_event()
       else:
-        self._events.pop()
+        self._pop_event()
 
   def set_length(self, steps, from_left=False):
     """Sets the length of the sequence to the specified number of steps.
@@ -210,7 +241,7 @@ class Performance(events_lib.EventSequence):
     """
     if not isinstance(event, PerformanceEvent):
       raise ValueError('Invalid performance event: %s' % event)
-    self._events.append(event)
+    self._push_event(event.event_type, event.event_value)
 
   def truncate(self, num_events):
     """Truncates this Performance to the specified number of events.
@@ -219,7 +250,9 @@ class Performance(events_lib.EventSequence):
       num_events: The number of events to which this performance will be
           truncated.
     """
-    self._events = self._events[:num_events]
+    del self._event_types[num_events:]
+    del self._event_values[num_events:]
+    del self._cumulative_steps[num_events:]
 
   def __len__(self):
     """How many events are in this sequence.
@@ -227,15 +260,25 @@ class Performance(events_lib.EventSequence):
     Returns:
       Number of events as an integer.
     """
-    return len(self._events)
+    return len(self._event_types)
 
   def __getitem__(self, i):
-    """Returns the event at the given index."""
-    return self._events[i]
+    """Returns the event at the given index, or a list of events for a slice."""
+    if isinstance(i, slice):
+      return [PerformanceEvent._from_packed(event_type, event_value)
+              for event_type, event_value in zip(self._event_types[i],
+                                                 self._event_values[i])]
+    return PerformanceEvent._from_packed(self._event_types[i],
+                                         self._event_values[i])
 
   def __iter__(self):
     """Return an iterator over the events in this sequence."""
-    return iter(self._events)
+    for event_type, event_value in zip(self._event_types, self._event_values):
+      yield PerformanceEvent._from_packed(event_type, event_value)
+
+  def branch(self):
+    return self._branch_event_storage(
+        '_event_types', '_event_values', '_cumulative_steps')
 
   def __str__(self):
     strs = []
@@ -263,11 +306,38 @@ class Performance(events_lib.EventSequence):
     Returns:
       Length of the sequence in quantized steps.
     """
-    steps = 0
-    for event in self:
-      if event.event_type == PerformanceEvent.TIME_SHIFT:
-        steps += event.event_value
-    return steps
+    return self._cumulative_steps[-1] if self._cumulative_steps else 0
+
+  def event_step(self, index):
+    """Returns the step at which an event occurs.
+
+    Args:
+      index: The index of the event.
+
+    Returns:
+      The number of steps, relative to `start_step`, elapsed before the event
+      at `index`.
+    """
+    if index < 0:
+      index += len(self._event_types)
+    if not 0 <= index < len(self._event_types):
+      raise IndexError('Event index out of range: %d' % index)
+    return self._cumulative_steps[index - 1] if index > 0 else 0
+
+  def event_index(self, step):
+    """Returns the index of the first event occurring at or after a step.
+
+    Args:
+      step: A step relative to `start_step`.
+
+    Returns:
+      The index of the first event for which `event_step` is at least `step`,
+      or the number of events if there is no such event.
+    """
+    if step <= 0:
+      return 0
+    return min(bisect.bisect_left(self._cumulative_steps, step) + 1,
+               len(self._event_types))
 
   @staticmethod
   def _from_quantized_sequence(quantized_sequence, start_step=0,
@@ -446,6 +516,64 @@ class Performance(events_lib.EventSequence):
     return sequence
 
 
+def _control_windows(performance, window_size_seconds):
+  """Computes the event window used for the control value at every event.
+
+  A control value is computed at the first event and at every event following
+  a time shift, from the window of events starting there and continuing until
+  `window_size_seconds` worth of time shifts have been included (or the end of
+  the performance). Every other event reuses the window of the most recent such
+  event. Windows are found with a binary search over cumulative time shift
+  steps rather than a forward scan from every event.
+
+  Args:
+    performance: A Performance object.
+    window_size_seconds: The size of the window, in seconds.
+
+  Returns:
+    event_types: A NumPy array of the type of each event.
+    event_values: A NumPy array of the value of each event.
+    window_starts: A NumPy array of the index of the first event of the window
+        used at each event.
+    window_ends: A NumPy array of the index one past the last event of the
+        window used at each event.
+    window_steps: A NumPy array of the number of steps in the window used at
+        each event, not counting any part of the window past the end of the
+        performance.
+  """
+  window_size_steps = int(round(
+      window_size_seconds * performance.steps_per_second))
+  num_events = len(performance)
+
+  event_types = np.array([event.event_type for event in performance],
+                         dtype=np.int64)
+  event_values = np.array([event.event_value for event in performance],
+                          dtype=np.int64)
+  is_time_shift = event_types == PerformanceEvent.TIME_SHIFT
+
+  # `cumulative_steps[i]` is the number of steps before event i.
+  cumulative_steps = np.zeros(num_events + 1, dtype=np.int64)
+  np.cumsum(np.where(is_time_shift, event_values, 0),
+            out=cumulative_steps[1:])
+
+  # Windows start at the first event and at events following a time shift.
+  window_starts = np.arange(num_events)
+  window_starts[1:][~is_time_shift[:-1]] = 0
+  window_starts = np.maximum.accumulate(window_starts)
+
+  # Each window ends after the first event that brings the included time shift
+  # steps to at least `window_size_steps`.
+  window_ends = np.searchsorted(
+      cumulative_steps, cumulative_steps[window_starts] + window_size_steps,
+      side='left')
+  window_ends = np.clip(window_ends, window_starts, num_events)
+  window_steps = np.minimum(
+      cumulative_steps[window_ends] - cumulative_steps[window_starts],
+      window_size_steps)
+
+  return event_types, event_values, window_starts, window_ends, window_steps
+
+
 def performance_note_density_sequence(performance, window_size_seconds):
   """Computes note density at every event in a performance.
 
@@ -460,51 +588,29 @@ def performance_note_density_sequence(performance, window_size_seconds):
     entry equal to the note density in the window starting at the corresponding
     performance event time.
   """
-  window_size_steps = int(round(
-      window_size_seconds * performance.steps_per_second))
+  if not len(performance):
+    return []
 
-  prev_event_type = None
-  prev_density = 0.0
-
-  density_sequence = []
-
-  for i, event in enumerate(performance):
-    if (prev_event_type is not None and
-        prev_event_type != PerformanceEvent.TIME_SHIFT):
-      # The previous event didn't move us forward in time, so the note density
-      # here should be the same.
-      density_sequence.append(prev_density)
-      prev_event_type = event.event_type
-      continue
-
-    j = i
-    step_offset = 0
-    note_count = 0
-
-    # Count the number of note-on events within the window.
-    while step_offset < window_size_steps and j < len(performance):
-      if performance[j].event_type == PerformanceEvent.NOTE_ON:
-        note_count += 1
-      elif performance[j].event_type == PerformanceEvent.TIME_SHIFT:
-        step_offset += performance[j].event_value
-      j += 1
-
-    # If we're near the end of the performance, part of the window will
-    # necessarily be empty; we don't include this part of the window when
-    # calculating note density.
-    actual_window_size_steps = min(step_offset, window_size_steps)
-    if actual_window_size_steps > 0:
-      density = (
-          note_count * performance.steps_per_second / actual_window_size_steps)
-    else:
-      density = 0.0
+  event_types, _, window_starts, window_ends, window_steps = _control_windows(
+      performance, window_size_seconds)
 
-    density_sequence.append(density)
+  # Count the number of note-on events within each window.
+  cumulative_note_counts = np.zeros(len(performance) + 1, dtype=np.int64)
+  np.cumsum(event_types == PerformanceEvent.NOTE_ON,
+            out=cumulative_note_counts[1:])
+  note_counts = (cumulative_note_counts[window_ends] -
+                 cumulative_note_counts[window_starts])
 
-    prev_event_type = event.event_type
-    prev_density = density
+  # If we're near the end of the performance, part of the window will
+  # necessarily be empty; we don't include this part of the window when
+  # calculating note density.
+  density_sequence = np.zeros(len(performance))
+  nonempty = window_steps > 0
+  density_sequence[nonempty] = (
+      note_counts[nonempty] * performance.steps_per_second /
+      window_steps[nonempty])
 
-  return density_sequence
+  return density_sequence.tolist()
 
 
 def performance_pitch_histogram_sequence(performance, window_size_seconds,
@@ -524,62 +630,59 @@ def performance_pitch_histogram_sequence(performance, window_size_seconds,
     each pitch class histogram is a length-12 list of float values summing to
     one.
   """
-  window_size_steps = int(round(
-      window_size_seconds * performance.steps_per_second))
-
-  prev_event_type = None
-  prev_histogram = [1.0 / NOTES_PER_OCTAVE] * NOTES_PER_OCTAVE
-
-  base_active_pitches = set()
-  histogram_sequence = []
-
-  for i, event in enumerate(performance):
-    # Maintain the base set of active pitches.
-    if event.event_type == PerformanceEvent.NOTE_ON:
-      base_active_pitches.add(event.event_value)
-    elif event.event_type == PerformanceEvent.NOTE_OFF:
-      base_active_pitches.discard(event.event_value)
-
-    if (prev_event_type is not None and
-        prev_event_type != PerformanceEvent.TIME_SHIFT):
-      # The previous event didn't move us forward in time, so the histogram here
-      # should be the same.
-      histogram_sequence.append(prev_histogram)
-      prev_event_type = event.event_type
-      continue
-
-    j = i
-    step_offset = 0
-
-    active_pitches = copy.deepcopy(base_active_pitches)
-    pitch_class_counts = [prior_count] * NOTES_PER_OCTAVE
-
-    # Count the total duration of each pitch class within the window.
-    while step_offset < window_size_steps and j < len(performance):
-      if performance[j].event_type == PerformanceEvent.NOTE_ON:
-        active_pitches.add(performance[j].event_value)
-      elif performance[j].event_type == PerformanceEvent.NOTE_OFF:
-        active_pitches.discard(performance[j].event_value)
-      elif performance[j].event_type == PerformanceEvent.TIME_SHIFT:
-        for pitch in active_pitches:
-          pitch_class_counts[pitch % NOTES_PER_OCTAVE] += (
-              performance[j].event_value / performance.steps_per_second)
-        step_offset += performance[j].event_value
-      j += 1
-
-    # Normalize by the total weight.
-    total = sum(pitch_class_counts)
-    if total > 0:
-      histogram = [count / total for count in pitch_class_counts]
-    else:
-      histogram = [1.0 / NOTES_PER_OCTAVE] * NOTES_PER_OCTAVE
-
-    histogram_sequence.append(histogram)
-
-    prev_event_type = event.event_type
-    prev_histogram = histogram
-
-  return histogram_sequence
+  if not len(performance):
+    return []
+
+  event_types, event_values, window_starts, window_ends, _ = _control_windows(
+      performance, window_size_seconds)
+
+  # Find the number of active pitches in each pitch class during each time
+  # shift.
+  active_pitches = set()
+  active_pitch_class_counts = [0] * NOTES_PER_OCTAVE
+  shift_indices = []
+  shift_pitch_class_counts = []
+  for i, (event_type, event_value) in enumerate(
+      zip(event_types.tolist(), event_values.tolist())):
+    if event_type == PerformanceEvent.NOTE_ON:
+      if event_value not in active_pitches:
+        active_pitches.add(event_value)
+        active_pitch_class_counts[event_value % NOTES_PER_OCTAVE] += 1
+    elif event_type == PerformanceEvent.NOTE_OFF:
+      if event_value in active_pitches:
+        active_pitches.remove(event_value)
+        active_pitch_class_counts[event_value % NOTES_PER_OCTAVE] -= 1
+    elif event_type == PerformanceEvent.TIME_SHIFT:
+      shift_indices.append(i)
+      shift_pitch_class_counts.append(list(active_pitch_class_counts))
+
+  # `pitch_class_steps[i]` is the number of steps each pitch class sounds
+  # before event i.
+  pitch_class_steps = np.zeros([len(performance) + 1, NOTES_PER_OCTAVE],
+                               dtype=np.int64)
+  if shift_indices:
+    shift_indices = np.array(shift_indices)
+    pitch_class_steps[shift_indices + 1] = (
+        np.array(shift_pitch_class_counts, dtype=np.int64) *
+        event_values[shift_indices, np.newaxis])
+  np.cumsum(pitch_class_steps, axis=0, out=pitch_class_steps)
+
+  # Count the total duration of each pitch class within each window.
+  pitch_class_counts = prior_count + (
+      (pitch_class_steps[window_ends] - pitch_class_steps[window_starts]) /
+      performance.steps_per_second)
+
+  # Normalize by the total weight.
+  total = np.zeros(len(performance))
+  for pitch_class in range(NOTES_PER_OCTAVE):
+    total += pitch_class_counts[:, pitch_class]
+  histogram_sequence = np.full([len(performance), NOTES_PER_OCTAVE],
+                               1.0 / NOTES_PER_OCTAVE)
+  positive = total > 0
+  histogram_sequence[positive] = (
+      pitch_class_counts[positive] / total[positive, np.newaxis])
+
+  return histogram_sequence.tolist()
 
 
 def extract_performances(
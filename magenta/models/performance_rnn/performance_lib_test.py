@@ -13,6 +13,12 @@
 # limitations under the License.
 """Tests for performance_lib."""
 
+from __future__ import division
+
+import copy
+import random
+import time
+
 # internal imports
 import tensorflow as tf
 
@@ -22,6 +28,91 @@ from magenta.music import testing_lib
 from magenta.protobuf import music_pb2
 
 
+def _random_performance(num_events, seed=0):
+  """Returns a Performance of random note, velocity, and time shift events."""
+  rng = random.Random(seed)
+  pe = performance_lib.PerformanceEvent
+  performance = performance_lib.Performance(steps_per_second=100)
+  for _ in range(num_events):
+    r = rng.random()
+    if r < 0.35:
+      performance.append(pe(pe.NOTE_ON, rng.randint(40, 80)))
+    elif r < 0.7:
+      performance.append(pe(pe.NOTE_OFF, rng.randint(40, 80)))
+    elif r < 0.8:
+      performance.append(pe(pe.VELOCITY, rng.randint(1, 32)))
+    else:
+      performance.append(pe(pe.TIME_SHIFT, rng.randint(1, 100)))
+  return performance
+
+
+def _reference_note_density_sequence(performance, window_size_seconds):
+  """Computes note density by scanning forward from every event."""
+  window_size_steps = int(round(
+      window_size_seconds * performance.steps_per_second))
+  pe = performance_lib.PerformanceEvent
+  density_sequence = []
+  for i in range(len(performance)):
+    if i > 0 and performance[i - 1].event_type != pe.TIME_SHIFT:
+      density_sequence.append(density_sequence[-1])
+      continue
+    j = i
+    step_offset = 0
+    note_count = 0
+    while step_offset < window_size_steps and j < len(performance):
+      if performance[j].event_type == pe.NOTE_ON:
+        note_count += 1
+      elif performance[j].event_type == pe.TIME_SHIFT:
+        step_offset += performance[j].event_value
+      j += 1
+    actual_window_size_steps = min(step_offset, window_size_steps)
+    if actual_window_size_steps > 0:
+      density_sequence.append(
+          note_count * performance.steps_per_second / actual_window_size_steps)
+    else:
+      density_sequence.append(0.0)
+  return density_sequence
+
+
+def _reference_pitch_histogram_sequence(performance, window_size_seconds,
+                                        prior_count=0.01):
+  """Computes pitch class histograms by scanning forward from every event."""
+  window_size_steps = int(round(
+      window_size_seconds * performance.steps_per_second))
+  pe = performance_lib.PerformanceEvent
+  base_active_pitches = set()
+  histogram_sequence = []
+  for i, event in enumerate(performance):
+    if event.event_type == pe.NOTE_ON:
+      base_active_pitches.add(event.event_value)
+    elif event.event_type == pe.NOTE_OFF:
+      base_active_pitches.discard(event.event_value)
+    if i > 0 and performance[i - 1].event_type != pe.TIME_SHIFT:
+      histogram_sequence.append(histogram_sequence[-1])
+      continue
+    j = i
+    step_offset = 0
+    active_pitches = copy.deepcopy(base_active_pitches)
+    pitch_class_counts = [prior_count] * 12
+    while step_offset < window_size_steps and j < len(performance):
+      if performance[j].event_type == pe.NOTE_ON:
+        active_pitches.add(performance[j].event_value)
+      elif performance[j].event_type == pe.NOTE_OFF:
+        active_pitches.discard(performance[j].event_value)
+      elif performance[j].event_type == pe.TIME_SHIFT:
+        for pitch in active_pitches:
+          pitch_class_counts[pitch % 12] += (
+              performance[j].event_value / performance.steps_per_second)
+        step_offset += performance[j].event_value
+      j += 1
+    total = sum(pitch_class_counts)
+    if total > 0:
+      histogram_sequence.append([count / total for count in pitch_class_counts])
+    else:
+      histogram_sequence.append([1.0 / 12] * 12)
+  return histogram_sequence
+
+
 class PerformanceLibTest(tf.test.TestCase):
 
   def setUp(self):
@@ -296,6 +387,89 @@ class PerformanceLibTest(tf.test.TestCase):
 
     self.assertEqual(100, performance.num_steps)
 
+    performance.set_length(250)
+    self.assertEqual(250, performance.num_steps)
+    performance.truncate(4)
+    self.assertEqual(100, performance.num_steps)
+    performance.set_length(30)
+    self.assertEqual(30, performance.num_steps)
+
+  def testEventStepAndIndex(self):
+    performance = performance_lib.Performance(steps_per_second=100)
+
+    pe = performance_lib.PerformanceEvent
+    perf_events = [
+        pe(pe.NOTE_ON, 60),
+        pe(pe.TIME_SHIFT, 50),
+        pe(pe.NOTE_ON, 64),
+        pe(pe.TIME_SHIFT, 25),
+        pe(pe.TIME_SHIFT, 25),
+        pe(pe.NOTE_OFF, 60),
+        pe(pe.NOTE_OFF, 64),
+    ]
+    for event in perf_events:
+      performance.append(event)
+
+    self.assertEqual([0, 0, 50, 50, 75, 100, 100],
+                     [performance.event_step(i) for i in range(7)])
+    self.assertEqual(100, performance.event_step(-1))
+    self.assertEqual(0, performance.event_index(0))
+    self.assertEqual(2, performance.event_index(1))
+    self.assertEqual(2, performance.event_index(50))
+    self.assertEqual(4, performance.event_index(60))
+    self.assertEqual(5, performance.event_index(100))
+    self.assertEqual(7, performance.event_index(101))
+
+    with self.assertRaises(IndexError):
+      performance.event_step(7)
+
+  def testGetItemAndDeepCopy(self):
+    performance = performance_lib.Performance(steps_per_second=100)
+
+    pe = performance_lib.PerformanceEvent
+    perf_events = [
+        pe(pe.NOTE_ON, 60),
+        pe(pe.TIME_SHIFT, 50),
+        pe(pe.NOTE_OFF, 60),
+    ]
+    for event in perf_events:
+      performance.append(event)
+
+    self.assertEqual(pe(pe.NOTE_ON, 60), performance[0])
+    self.assertEqual(pe(pe.NOTE_OFF, 60), performance[-1])
+    self.assertEqual(perf_events[1:], performance[1:])
+    with self.assertRaises(IndexError):
+      _ = performance[3]
+
+    performance_copy = copy.deepcopy(performance)
+    performance_copy.set_length(20)
+    self.assertEqual(perf_events, list(performance))
+    self.assertEqual(50, performance.num_steps)
+    self.assertEqual([pe(pe.NOTE_ON, 60), pe(pe.TIME_SHIFT, 20)],
+                     list(performance_copy))
+
+  def testBranch(self):
+    performance = performance_lib.Performance(steps_per_second=100)
+
+    pe = performance_lib.PerformanceEvent
+    perf_events = [
+        pe(pe.NOTE_ON, 60),
+        pe(pe.TIME_SHIFT, 50),
+    ]
+    for event in perf_events:
+      performance.append(event)
+
+    performance_branch = performance.branch()
+    performance.append(pe(pe.NOTE_OFF, 60))
+    performance_branch.set_length(80)
+    self.assertEqual(perf_events + [pe(pe.NOTE_OFF, 60)], list(performance))
+    self.assertEqual([pe(pe.NOTE_ON, 60), pe(pe.TIME_SHIFT, 80)],
+                     list(performance_branch))
+    self.assertEqual(50, performance.num_steps)
+    self.assertEqual(80, performance_branch.num_steps)
+    self.assertEqual(list(performance_branch),
+                     list(copy.deepcopy(performance_branch)))
+
   def testPerformanceNoteDensitySequence(self):
     performance = performance_lib.Performance(steps_per_second=100)
 
@@ -363,6 +537,20 @@ class PerformanceLibTest(tf.test.TestCase):
 
     self.assertEqual(expected_histogram_sequence, histogram_sequence)
 
+  def testControlSequencesMatchReference(self):
+    performance = _random_performance(2000)
+
+    for window_size_seconds in [0.0, 0.5, 3.0]:
+      self.assertEqual(
+          _reference_note_density_sequence(performance, window_size_seconds),
+          performance_lib.performance_note_density_sequence(
+              performance, window_size_seconds))
+      self.assertAllClose(
+          _reference_pitch_histogram_sequence(
+              performance, window_size_seconds),
+          performance_lib.performance_pitch_histogram_sequence(
+              performance, window_size_seconds))
+
   def testExtractPerformances(self):
     testing_lib.add_track_to_sequence(
         self.note_sequence, 0, [(60, 100, 0.0, 4.0)])
@@ -410,5 +598,31 @@ class PerformanceLibTest(tf.test.TestCase):
     self.assertEqual(1, len(perfs))
 
 
+class PerformanceLibBenchmark(tf.test.Benchmark):
+  """Compares the control sequence functions against forward scanning."""
+
+  def _report(self, name, fn, *args):
+    start_time = time.time()
+    fn(*args)
+    self.report_benchmark(name=name, iters=1,
+                          wall_time=time.time() - start_time)
+
+  def benchmarkNoteDensitySequence(self):
+    performance = _random_performance(50000)
+    self._report('note_density_sequence_reference',
+                 _reference_note_density_sequence, performance, 10.0)
+    self._report('note_density_sequence',
+                 performance_lib.performance_note_density_sequence,
+                 performance, 10.0)
+
+  def benchmarkPitchHistogramSequence(self):
+    performance = _random_performance(50000)
+    self._report('pitch_histogram_sequence_reference',
+                 _reference_pitch_histogram_sequence, performance, 10.0)
+    self._report('pitch_histogram_sequence',
+                 performance_lib.performance_pitch_histogram_sequence,
+                 performance, 10.0)
+
+
 if __name__ == '__main__':
   tf.test.main()
@@ -22,13 +22,37 @@ from magenta.models.performance_rnn import performance_encoder_decoder
 from magenta.models.shared import events_rnn_model
 
 
+def _control_events(num_steps, note_density, pitch_histogram):
+  """Returns a constant control sequence for the given conditioning values.
+
+  Args:
+    num_steps: The integer length of the control sequence.
+    note_density: Control note density, or None if not conditioning on note
+        density.
+    pitch_histogram: Control pitch class histogram, or None if not conditioning
+        on pitch class histogram.
+
+  Returns:
+    A list of `num_steps` control events, or None if neither `note_density` nor
+    `pitch_histogram` is provided.
+  """
+  if note_density is not None and pitch_histogram is not None:
+    return [(note_density, pitch_histogram)] * num_steps
+  elif note_density is not None:
+    return [note_density] * num_steps
+  elif pitch_histogram is not None:
+    return [pitch_histogram] * num_steps
+  else:
+    return None
+
+
 class PerformanceRnnModel(events_rnn_model.EventSequenceRnnModel):
   """Class for RNN performance generation models."""
 
   def generate_performance(
       self, num_steps, primer_sequence, temperature=1.0, beam_size=1,
       branch_factor=1, steps_per_iteration=1, note_density=None,
-      pitch_histogram=None):
+      pitch_histogram=None, random_state=None):
     """Generate a performance track from a primer performance track.
 
     Args:
@@ -47,6 +71,8 @@ class PerformanceRnnModel(events_rnn_model.EventSequenceRnnModel):
           don't condition on note density.
       pitch_histogram: Desired pitch class histogram of generated performance.
           If None, don't condition on pitch class histogram.
+      random_state: An optional np.random.RandomState used to sample the
+          performance. If None, the global numpy random state is used.
 
     Returns:
       The generated Performance object (which begins with the provided primer
@@ -56,18 +82,49 @@ class PerformanceRnnModel(events_rnn_model.EventSequenceRnnModel):
       ValueError: If both `note_density` and `pitch_histogram` are provided as
           conditioning variables.
     """
-    if note_density is not None and pitch_histogram is not None:
-      control_events = [(note_density, pitch_histogram)] * num_steps
-    elif note_density is not None:
-      control_events = [note_density] * num_steps
-    elif pitch_histogram is not None:
-      control_events = [pitch_histogram] * num_steps
-    else:
-      control_events = None
+    control_events = _control_events(num_steps, note_density, pitch_histogram)
 
     return self._generate_events(num_steps, primer_sequence, temperature,
                                  beam_size, branch_factor, steps_per_iteration,
-                                 control_events=control_events)
+                                 control_events=control_events,
+                                 random_state=random_state)
+
+  def generate_performances(
+      self, num_steps, primer_sequence, num_outputs, temperature=1.0,
+      beam_size=1, branch_factor=1, steps_per_iteration=1, note_density=None,
+      pitch_histogram=None, random_state=None):
+    """Generate multiple independent performance tracks from a primer track.
+
+    Args:
+      num_steps: The integer length in steps of the final tracks, after
+          generation. Includes the primer.
+      primer_sequence: The primer sequence, a Performance object.
+      num_outputs: The integer number of tracks to generate.
+      temperature: A float specifying how much to divide the logits by
+         before computing the softmax. Greater than 1.0 makes tracks more
+         random, less than 1.0 makes tracks less random.
+      beam_size: An integer, beam size to use when generating tracks via
+          beam search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of steps to take per beam search
+          iteration.
+      note_density: Desired note density of generated performances. If None,
+          don't condition on note density.
+      pitch_histogram: Desired pitch class histogram of generated performances.
+          If None, don't condition on pitch class histogram.
+      random_state: An optional np.random.RandomState used to sample the
+          performances. If None, the global numpy random state is used.
+
+    Returns:
+      A list of `num_outputs` generated Performance objects (each of which
+      begins with the provided primer track).
+    """
+    control_events = _control_events(num_steps, note_density, pitch_histogram)
+
+    return self._generate_events_batch(
+        num_steps, primer_sequence, num_outputs, temperature, beam_size,
+        branch_factor, steps_per_iteration, control_events=control_events,
+        random_state=random_state)
 
   def performance_log_likelihood(self, sequence, note_density=None,
                                  pitch_histogram=None):
@@ -87,14 +144,8 @@ class PerformanceRnnModel(events_rnn_model.EventSequenceRnnModel):
       ValueError: If both `note_density` and `pitch_histogram` are provided as
           conditioning variables.
     """
-    if note_density is not None and pitch_histogram is not None:
-      control_events = [(note_density, pitch_histogram)] * len(sequence)
-    elif note_density is not None:
-      control_events = [note_density] * len(sequence)
-    elif pitch_histogram is not None:
-      control_events = [pitch_histogram] * len(sequence)
-    else:
-      control_events = None
+    control_events = _control_events(
+        len(sequence), note_density, pitch_histogram)
 
     return self._evaluate_log_likelihood(
         [sequence], control_events=control_events)[0]
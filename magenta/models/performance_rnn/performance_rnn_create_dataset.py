@@ -45,6 +45,14 @@ tf.app.flags.DEFINE_string('config', 'performance', 'The config to use')
 tf.app.flags.DEFINE_float('eval_ratio', 0.1,
                           'Fraction of input to set aside for eval set. '
                           'Partition is randomly selected.')
+tf.app.flags.DEFINE_integer('num_workers', 1,
+                            'The number of worker processes used to build the '
+                            'dataset. If greater than 1, inputs are processed '
+                            'in parallel and the partition is seeded with '
+                            '--seed.')
+tf.app.flags.DEFINE_integer('seed', 0,
+                            'Random seed used for partitioning inputs when '
+                            'num_workers is greater than 1.')
 tf.app.flags.DEFINE_string('log', 'INFO',
                            'The threshold for what messages will be logged '
                            'DEBUG, INFO, WARN, ERROR, or FATAL.')
@@ -182,10 +190,20 @@ def main(unused_argv):
 
   input_dir = os.path.expanduser(FLAGS.input)
   output_dir = os.path.expanduser(FLAGS.output_dir)
-  pipeline.run_pipeline_serial(
-      pipeline_instance,
-      pipeline.tf_record_iterator(input_dir, pipeline_instance.input_type),
-      output_dir)
+  input_iterator = pipeline.tf_record_iterator(
+      input_dir, pipeline_instance.input_type)
+  if FLAGS.num_workers > 1:
+    pipeline.run_pipeline_parallel(
+        pipeline_instance,
+        input_iterator,
+        output_dir,
+        num_workers=FLAGS.num_workers,
+        seed=FLAGS.seed)
+  else:
+    pipeline.run_pipeline_serial(
+        pipeline_instance,
+        input_iterator,
+        output_dir)
 
 
 def console_entry_point():
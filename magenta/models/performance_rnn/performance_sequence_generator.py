@@ -14,6 +14,7 @@
 """Performance RNN generation code as a SequenceGenerator interface."""
 
 import ast
+import copy
 from functools import partial
 import math
 
@@ -86,6 +87,9 @@ class PerformanceRnnSequenceGenerator(mm.BaseSequenceGenerator):
     self.fill_generate_section = fill_generate_section
 
   def _generate(self, input_sequence, generator_options):
+    return self._generate_batch(input_sequence, generator_options, 1)[0]
+
+  def _generate_batch(self, input_sequence, generator_options, num_outputs):
     if len(generator_options.input_sections) > 1:
       raise mm.SequenceGeneratorException(
           'This model supports at most one input_sections message, but got %s' %
@@ -189,35 +193,65 @@ class PerformanceRnnSequenceGenerator(mm.BaseSequenceGenerator):
       # Primer is empty; let's just start with silence.
       performance.set_length(min(performance_lib.MAX_SHIFT_STEPS, total_steps))
 
-    while performance.num_steps < total_steps:
-      # Assume the specified (or default) note density and 4 RNN steps per note.
-      # Can't know for sure until generation is finished because the number of
-      # notes per quantized step is variable.
-      note_density = (args['note_density'] if 'note_density' in args
-                      else DEFAULT_NOTE_DENSITY)
-      note_density = max(1.0, note_density)
-      steps_to_gen = total_steps - performance.num_steps
-      rnn_steps_to_gen = int(math.ceil(
-          4.0 * note_density * steps_to_gen /
-          performance_lib.DEFAULT_STEPS_PER_SECOND))
-      tf.logging.info(
-          'Need to generate %d more steps for this sequence, will try asking '
-          'for %d RNN steps' % (steps_to_gen, rnn_steps_to_gen))
-      performance = self._model.generate_performance(
-          len(performance) + rnn_steps_to_gen, performance, **args)
-
-      if not self.fill_generate_section:
-        # In the interest of speed just go through this loop once, which may not
-        # entirely fill the generate section.
-        break
-
-    performance.set_length(total_steps)
-
-    generated_sequence = performance.to_sequence(
-        max_note_duration=self.max_note_duration)
-
-    assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
-    return generated_sequence
+    note_density = (args['note_density'] if 'note_density' in args
+                    else DEFAULT_NOTE_DENSITY)
+
+    if performance.num_steps < total_steps:
+      # All outputs share the same primer, so the first round of generation is
+      # batched across outputs.
+      performances = self._model.generate_performances(
+          len(performance) + _rnn_steps_to_gen(
+              performance, total_steps, note_density),
+          performance, num_outputs, **args)
+    else:
+      performances = [copy.deepcopy(performance) for _ in range(num_outputs)]
+
+    generated_sequences = []
+    for performance in performances:
+      # In the interest of speed, unless asked to fill the generate section,
+      # only generate once, which may not entirely fill the generate section.
+      # Otherwise any output that is still too short is extended on its own.
+      while (self.fill_generate_section and
+             performance.num_steps < total_steps):
+        performance = self._model.generate_performance(
+            len(performance) + _rnn_steps_to_gen(
+                performance, total_steps, note_density),
+            performance, **args)
+
+      performance.set_length(total_steps)
+
+      generated_sequence = performance.to_sequence(
+          max_note_duration=self.max_note_duration)
+
+      assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
+      generated_sequences.append(generated_sequence)
+    return generated_sequences
+
+
+def _rnn_steps_to_gen(performance, total_steps, note_density):
+  """Returns the number of RNN steps to request when extending a performance.
+
+  Args:
+    performance: The Performance to be extended.
+    total_steps: The total number of quantized steps the performance should
+        have.
+    note_density: The specified (or default) note density, in notes per second.
+
+  Returns:
+    The integer number of RNN steps to generate.
+  """
+  # Assume the specified (or default) note density and 4 RNN steps per note.
+  # Can't know for sure until generation is finished because the number of
+  # notes per quantized step is variable.
+  note_density = max(1.0, note_density)
+  steps_to_gen = total_steps - performance.num_steps
+  rnn_steps_to_gen = int(math.ceil(
+      4.0 * note_density * steps_to_gen /
+      performance_lib.DEFAULT_STEPS_PER_SECOND))
+  tf.logging.info(
+      'Need to generate %d more steps for this sequence, will try asking '
+      'for %d RNN steps' % (steps_to_gen, rnn_steps_to_gen))
+  return rnn_steps_to_gen
 
 
 def get_generator_map():
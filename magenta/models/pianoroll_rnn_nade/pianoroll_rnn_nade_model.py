@@ -29,29 +29,32 @@ class PianorollRnnNadeModel(events_rnn_model.EventSequenceRnnModel):
     return pianoroll_rnn_nade_graph.build_graph('generate', self._config)
 
   def _generate_step_for_batch(self, pianoroll_sequences, inputs, initial_state,
-                               temperature):
+                               temperature, random_state=None):
     """Extends a batch of event sequences by a single step each.
 
     This method modifies the event sequences in place.
 
     Args:
       pianoroll_sequences: A list of PianorollSequences. The list of event
-          sequences should have length equal to `self._batch_size()`.
-      inputs: A Python list of model inputs, with length equal to
+          sequences should have length at most `self._batch_size()`; any
+          remaining rows of `inputs` and `initial_state` are padding.
+      inputs: A numpy array of model inputs, with first dimension equal to
           `self._batch_size()`.
       initial_state: A numpy array containing the initial RNN-NADE state, where
           `initial_state.shape[0]` is equal to `self._batch_size()`.
       temperature: Unused.
+      random_state: Unused. The NADE samples in the TensorFlow graph, so its
+          samples cannot be seeded with a numpy random state.
 
     Returns:
       final_state: The final RNN-NADE state, the same size as `initial_state`.
       loglik: The log-likelihood of the sampled value for each event
-          sequence, a 1-D numpy array of length
-          `self._batch_size()`. If `inputs` is a full-length inputs batch, the
-          log-likelihood of each entire sequence up to and including the
-          generated step will be computed and returned.
+          sequence, a 1-D numpy array of length `len(pianoroll_sequences)`. If
+          `inputs` is a full-length inputs batch, the log-likelihood of each
+          entire sequence up to and including the generated step will be
+          computed and returned.
     """
-    assert len(pianoroll_sequences) == self._batch_size()
+    assert len(pianoroll_sequences) <= self._batch_size()
 
     graph_inputs = self._session.graph.get_collection('inputs')[0]
     graph_initial_state = tuple(
@@ -68,10 +71,11 @@ class PianorollRnnNadeModel(events_rnn_model.EventSequenceRnnModel):
             graph_initial_state: initial_state,
         })
 
+    num_seqs = len(pianoroll_sequences)
     self._config.encoder_decoder.extend_event_sequences(
-        pianoroll_sequences, sample)
+        pianoroll_sequences, sample[:num_seqs])
 
-    return final_state, loglik[:, 0]
+    return final_state, loglik[:num_seqs, 0]
 
   def generate_pianoroll_sequence(
       self, num_steps, primer_sequence, beam_size=1, branch_factor=1,
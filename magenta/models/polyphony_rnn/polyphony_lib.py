@@ -15,12 +15,14 @@
 
 from __future__ import division
 
+import array
 import collections
 import copy
 
 # internal imports
 
 from six.moves import range  # pylint: disable=redefined-builtin
+from six.moves import zip  # pylint: disable=redefined-builtin
 import tensorflow as tf
 
 from magenta.music import constants
@@ -34,10 +36,15 @@ MAX_MIDI_PITCH = constants.MAX_MIDI_PITCH
 MIN_MIDI_PITCH = constants.MIN_MIDI_PITCH
 STANDARD_PPQ = constants.STANDARD_PPQ
 
+# Packed pitch value for events that have no pitch.
+_NO_PITCH = -1
+
 
 class PolyphonicEvent(object):
   """Class for storing events in a polyphonic sequence."""
 
+  __slots__ = ('event_type', 'pitch')
+
   # Beginning of the sequence.
   START = 0
   # End of the sequence.
@@ -59,6 +66,14 @@ class PolyphonicEvent(object):
     self.event_type = event_type
     self.pitch = pitch
 
+  @classmethod
+  def _from_packed(cls, event_type, packed_pitch):
+    """Creates an event from already-validated packed values."""
+    event = cls.__new__(cls)
+    event.event_type = event_type
+    event.pitch = None if packed_pitch == _NO_PITCH else packed_pitch
+    return event
+
   def __repr__(self):
     return 'PolyphonicEvent(%r, %r)' % (self.event_type, self.pitch)
 
@@ -72,11 +87,13 @@ class PolyphonicEvent(object):
 class PolyphonicSequence(events_lib.EventSequence):
   """Stores a polyphonic sequence as a stream of single-note events.
 
-  Events are PolyphonicEvent tuples that encode event type and pitch.
+  Events are PolyphonicEvent tuples that encode event type and pitch. They are
+  stored packed in parallel arrays of types and pitches, and a new
+  PolyphonicEvent is created each time an event is accessed.
   """
 
   def __init__(self, quantized_sequence=None, steps_per_quarter=None,
-               start_step=0):
+               start_step=0, note_index=None):
     """Construct a PolyphonicSequence.
 
     Either quantized_sequence or steps_per_quarter should be supplied.
@@ -87,20 +104,27 @@ class PolyphonicSequence(events_lib.EventSequence):
       start_step: The offset of this sequence relative to the
           beginning of the source sequence. If a quantized sequence is used as
           input, only notes starting after this step will be considered.
+      note_index: An optional sequences_lib.QuantizedNoteIndex of
+          `quantized_sequence`, used to find the notes starting after
+          `start_step` without scanning all notes.
     """
     assert (quantized_sequence, steps_per_quarter).count(None) == 1
 
     if quantized_sequence:
       sequences_lib.assert_is_relative_quantized_sequence(quantized_sequence)
-      self._events = self._from_quantized_sequence(quantized_sequence,
-                                                   start_step)
+      events = self._from_quantized_sequence(quantized_sequence,
+                                             start_step, note_index)
       self._steps_per_quarter = (
           quantized_sequence.quantization_info.steps_per_quarter)
     else:
-      self._events = [
-          PolyphonicEvent(event_type=PolyphonicEvent.START, pitch=None)]
+      events = [PolyphonicEvent(event_type=PolyphonicEvent.START, pitch=None)]
       self._steps_per_quarter = steps_per_quarter
 
+    self._event_types = array.array('h')
+    self._pitches = array.array('h')
+    for event in events:
+      self._push_event(event.event_type, event.pitch)
+
     self._start_step = start_step
 
   @property
@@ -111,32 +135,41 @@ class PolyphonicSequence(events_lib.EventSequence):
   def steps_per_quarter(self):
     return self._steps_per_quarter
 
+  def _push_event(self, event_type, pitch):
+    """Appends an event given its type and pitch (or None)."""
+    self._event_types.append(event_type)
+    self._pitches.append(_NO_PITCH if pitch is None else pitch)
+
+  def _truncate_events(self, num_events):
+    """Removes all events after the first `num_events`."""
+    del self._event_types[num_events:]
+    del self._pitches[num_events:]
+
   def trim_trailing_end_events(self):
     """Removes the trailing END event if present.
 
     Should be called before using a sequence to prime generation.
     """
-    while self._events[-1].event_type == PolyphonicEvent.END:
-      del self._events[-1]
+    while self._event_types[-1] == PolyphonicEvent.END:
+      self._truncate_events(-1)
 
   def _append_silence_steps(self, num_steps):
     """Adds steps of silence to the end of the sequence."""
     for _ in range(num_steps):
-      self._events.append(
-          PolyphonicEvent(event_type=PolyphonicEvent.STEP_END, pitch=None))
+      self._push_event(PolyphonicEvent.STEP_END, None)
 
   def _trim_steps(self, num_steps):
     """Trims a given number of steps from the end of the sequence."""
     steps_trimmed = 0
-    for i in reversed(range(len(self._events))):
-      if self._events[i].event_type == PolyphonicEvent.STEP_END:
+    for i in reversed(range(len(self._event_types))):
+      if self._event_types[i] == PolyphonicEvent.STEP_END:
         if steps_trimmed == num_steps:
-          del self._events[i + 1:]
+          self._truncate_events(i + 1)
           break
         steps_trimmed += 1
       elif i == 0:
-        self._events = [
-            PolyphonicEvent(event_type=PolyphonicEvent.START, pitch=None)]
+        self._truncate_events(0)
+        self._push_event(PolyphonicEvent.START, None)
         break
 
   def set_length(self, steps, from_left=False):
@@ -159,16 +192,14 @@ class PolyphonicSequence(events_lib.EventSequence):
     # First remove any trailing end events.
     self.trim_trailing_end_events()
     # Then add an end step event, to close out any incomplete steps.
-    self._events.append(
-        PolyphonicEvent(event_type=PolyphonicEvent.STEP_END, pitch=None))
+    self._push_event(PolyphonicEvent.STEP_END, None)
     # Then trim or pad as needed.
     if self.num_steps < steps:
       self._append_silence_steps(steps - self.num_steps)
     elif self.num_steps > steps:
       self._trim_steps(self.num_steps - steps)
     # Then add a trailing end event.
-    self._events.append(
-        PolyphonicEvent(event_type=PolyphonicEvent.END, pitch=None))
+    self._push_event(PolyphonicEvent.END, None)
     assert self.num_steps == steps
 
   def append(self, event):
@@ -181,7 +212,7 @@ class PolyphonicSequence(events_lib.EventSequence):
     """
     if not isinstance(event, PolyphonicEvent):
       raise ValueError('Invalid polyphonic event: %s' % event)
-    self._events.append(event)
+    self._push_event(event.event_type, event.pitch)
 
   def __len__(self):
     """How many events are in this sequence.
@@ -189,15 +220,23 @@ class PolyphonicSequence(events_lib.EventSequence):
     Returns:
       Number of events as an integer.
     """
-    return len(self._events)
+    return len(self._event_types)
 
   def __getitem__(self, i):
-    """Returns the event at the given index."""
-    return self._events[i]
+    """Returns the event at the given index, or a list of events for a slice."""
+    if isinstance(i, slice):
+      return [PolyphonicEvent._from_packed(event_type, pitch)
+              for event_type, pitch in zip(self._event_types[i],
+                                           self._pitches[i])]
+    return PolyphonicEvent._from_packed(self._event_types[i], self._pitches[i])
 
   def __iter__(self):
     """Return an iterator over the events in this sequence."""
-    return iter(self._events)
+    for event_type, pitch in zip(self._event_types, self._pitches):
+      yield PolyphonicEvent._from_packed(event_type, pitch)
+
+  def branch(self):
+    return self._branch_event_storage('_event_types', '_pitches')
 
   def __str__(self):
     strs = []
@@ -230,14 +269,11 @@ class PolyphonicSequence(events_lib.EventSequence):
     Returns:
       Length of the sequence in quantized steps.
     """
-    steps = 0
-    for event in self:
-      if event.event_type == PolyphonicEvent.STEP_END:
-        steps += 1
-    return steps
+    return self._event_types.count(PolyphonicEvent.STEP_END)
 
   @staticmethod
-  def _from_quantized_sequence(quantized_sequence, start_step=0):
+  def _from_quantized_sequence(quantized_sequence, start_step=0,
+                               note_index=None):
     """Populate self with events from the given quantized NoteSequence object.
 
     Sequences start with START.
@@ -253,6 +289,8 @@ class PolyphonicSequence(events_lib.EventSequence):
       quantized_sequence: A quantized NoteSequence instance.
       start_step: Start converting the sequence at this time step.
           Assumed to be the beginning of a bar.
+      note_index: An optional sequences_lib.QuantizedNoteIndex of
+          `quantized_sequence`.
 
     Returns:
       A list of events.
@@ -260,7 +298,12 @@ class PolyphonicSequence(events_lib.EventSequence):
     pitch_start_steps = collections.defaultdict(list)
     pitch_end_steps = collections.defaultdict(list)
 
-    for note in quantized_sequence.notes:
+    if note_index is not None:
+      notes = note_index.notes(start_step=start_step)
+    else:
+      notes = quantized_sequence.notes
+
+    for note in notes:
       if note.quantized_start_step < start_step:
         continue
       pitch_start_steps[note.quantized_start_step].append(note.pitch)
@@ -402,7 +445,7 @@ class PolyphonicSequence(events_lib.EventSequence):
 
 def extract_polyphonic_sequences(
     quantized_sequence, start_step=0, min_steps_discard=None,
-    max_steps_discard=None):
+    max_steps_discard=None, note_index=None):
   """Extracts a polyphonic track from the given quantized NoteSequence.
 
   Currently, this extracts only one polyphonic sequence from a given track.
@@ -415,6 +458,8 @@ def extract_polyphonic_sequences(
         discarded.
     max_steps_discard: Maximum length of tracks in steps. Longer tracks are
         discarded.
+    note_index: An optional sequences_lib.QuantizedNoteIndex of
+        `quantized_sequence`.
 
   Returns:
     poly_seqs: A python list of PolyphonicSequence instances.
@@ -445,7 +490,8 @@ def extract_polyphonic_sequences(
 
   # Translate the quantized sequence into a PolyphonicSequence.
   poly_seq = PolyphonicSequence(quantized_sequence,
-                                start_step=start_step)
+                                start_step=start_step,
+                                note_index=note_index)
 
   poly_seqs = []
   num_steps = poly_seq.num_steps
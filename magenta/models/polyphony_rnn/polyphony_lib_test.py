@@ -504,6 +504,33 @@ class PolyphonyLibTest(tf.test.TestCase):
 
     self.assertEqual(poly_events_expected, list(poly_seq))
 
+  def testGetItemAndDeepCopy(self):
+    poly_seq = polyphony_lib.PolyphonicSequence(steps_per_quarter=1)
+
+    pe = polyphony_lib.PolyphonicEvent
+    poly_events = [
+        # step 0
+        pe(pe.NEW_NOTE, 60),
+        pe(pe.STEP_END, None),
+        # step 1
+        pe(pe.CONTINUED_NOTE, 60),
+        pe(pe.STEP_END, None),
+    ]
+    for event in poly_events:
+      poly_seq.append(event)
+
+    self.assertEqual(pe(pe.START, None), poly_seq[0])
+    self.assertEqual(pe(pe.CONTINUED_NOTE, 60), poly_seq[-2])
+    self.assertEqual(poly_events[1:3], poly_seq[2:4])
+    with self.assertRaises(IndexError):
+      _ = poly_seq[5]
+
+    poly_seq_copy = copy.deepcopy(poly_seq)
+    poly_seq_copy.set_length(1)
+    self.assertEqual([pe(pe.START, None)] + poly_events, list(poly_seq))
+    self.assertEqual(2, poly_seq.num_steps)
+    self.assertEqual(1, poly_seq_copy.num_steps)
+
   def testExtractPolyphonicSequences(self):
     testing_lib.add_track_to_sequence(
         self.note_sequence, 0, [(60, 100, 0.0, 4.0)])
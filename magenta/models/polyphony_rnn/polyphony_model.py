@@ -26,7 +26,8 @@ class PolyphonyRnnModel(events_rnn_model.EventSequenceRnnModel):
 
   def generate_polyphonic_sequence(
       self, num_steps, primer_sequence, temperature=1.0, beam_size=1,
-      branch_factor=1, steps_per_iteration=1, modify_events_callback=None):
+      branch_factor=1, steps_per_iteration=1, modify_events_callback=None,
+      random_state=None):
     """Generate a polyphonic track from a primer polyphonic track.
 
     Args:
@@ -46,13 +47,52 @@ class PolyphonyRnnModel(events_rnn_model.EventSequenceRnnModel):
           None, will be called with 3 arguments after every event: the current
           EventSequenceEncoderDecoder, a list of current EventSequences, and a
           list of current encoded event inputs.
+      random_state: An optional np.random.RandomState used to sample the
+          track. If None, the global numpy random state is used.
     Returns:
       The generated PolyphonicSequence object (which begins with the provided
       primer track).
     """
     return self._generate_events(num_steps, primer_sequence, temperature,
                                  beam_size, branch_factor, steps_per_iteration,
-                                 modify_events_callback=modify_events_callback)
+                                 modify_events_callback=modify_events_callback,
+                                 random_state=random_state)
+
+  def generate_polyphonic_sequences(
+      self, num_steps, primer_sequence, num_outputs, temperature=1.0,
+      beam_size=1, branch_factor=1, steps_per_iteration=1,
+      modify_events_callback=None, random_state=None):
+    """Generate multiple independent polyphonic tracks from a primer track.
+
+    Args:
+      num_steps: The integer length in steps of the final tracks, after
+          generation. Includes the primer.
+      primer_sequence: The primer sequence, a PolyphonicSequence object.
+      num_outputs: The integer number of tracks to generate.
+      temperature: A float specifying how much to divide the logits by
+         before computing the softmax. Greater than 1.0 makes tracks more
+         random, less than 1.0 makes tracks less random.
+      beam_size: An integer, beam size to use when generating tracks via
+          beam search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of steps to take per beam search
+          iteration.
+      modify_events_callback: An optional callback for modifying the event list.
+          Can be used to inject events rather than having them generated. If not
+          None, will be called with 3 arguments after every event: the current
+          EventSequenceEncoderDecoder, a list of current EventSequences, and a
+          list of current encoded event inputs.
+      random_state: An optional np.random.RandomState used to sample the
+          tracks. If None, the global numpy random state is used.
+    Returns:
+      A list of `num_outputs` generated PolyphonicSequence objects (each of
+      which begins with the provided primer track).
+    """
+    return self._generate_events_batch(
+        num_steps, primer_sequence, num_outputs, temperature, beam_size,
+        branch_factor, steps_per_iteration,
+        modify_events_callback=modify_events_callback,
+        random_state=random_state)
 
   def polyphonic_sequence_log_likelihood(self, sequence):
     """Evaluate the log likelihood of a polyphonic sequence.
@@ -49,6 +49,9 @@ class PolyphonyRnnSequenceGenerator(mm.BaseSequenceGenerator):
     self.steps_per_quarter = steps_per_quarter
 
   def _generate(self, input_sequence, generator_options):
+    return self._generate_batch(input_sequence, generator_options, 1)[0]
+
+  def _generate_batch(self, input_sequence, generator_options, num_outputs):
     if len(generator_options.input_sections) > 1:
       raise mm.SequenceGeneratorException(
           'This model supports at most one input_sections message, but got %s' %
@@ -160,28 +163,55 @@ class PolyphonyRnnSequenceGenerator(mm.BaseSequenceGenerator):
     total_steps = poly_seq.num_steps + (
         generate_end_step - generate_start_step)
 
-    while poly_seq.num_steps < total_steps:
-      # Assume it takes ~5 rnn steps to generate one quantized step.
-      # Can't know for sure until generation is finished because the number of
-      # notes per quantized step is variable.
-      steps_to_gen = total_steps - poly_seq.num_steps
-      rnn_steps_to_gen = 5 * steps_to_gen
-      tf.logging.info(
-          'Need to generate %d more steps for this sequence, will try asking '
-          'for %d RNN steps' % (steps_to_gen, rnn_steps_to_gen))
-      poly_seq = self._model.generate_polyphonic_sequence(
-          len(poly_seq) + rnn_steps_to_gen, poly_seq, **args)
-    poly_seq.set_length(total_steps)
-
-    if generator_options.args['condition_on_primer'].bool_value:
-      generated_sequence = poly_seq.to_sequence(qpm=qpm)
+    if poly_seq.num_steps < total_steps:
+      # All outputs share the same primer, so the first round of generation is
+      # batched across outputs.
+      poly_seqs = self._model.generate_polyphonic_sequences(
+          len(poly_seq) + _rnn_steps_to_gen(poly_seq, total_steps), poly_seq,
+          num_outputs, **args)
     else:
-      # Specify a base_note_sequence because the priming sequence was not
-      # included in poly_seq.
-      generated_sequence = poly_seq.to_sequence(
-          qpm=qpm, base_note_sequence=copy.deepcopy(primer_sequence))
-    assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
-    return generated_sequence
+      poly_seqs = [copy.deepcopy(poly_seq) for _ in range(num_outputs)]
+
+    generated_sequences = []
+    for poly_seq in poly_seqs:
+      # Any output that is still too short is extended on its own.
+      while poly_seq.num_steps < total_steps:
+        poly_seq = self._model.generate_polyphonic_sequence(
+            len(poly_seq) + _rnn_steps_to_gen(poly_seq, total_steps), poly_seq,
+            **args)
+      poly_seq.set_length(total_steps)
+
+      if generator_options.args['condition_on_primer'].bool_value:
+        generated_sequence = poly_seq.to_sequence(qpm=qpm)
+      else:
+        # Specify a base_note_sequence because the priming sequence was not
+        # included in poly_seq.
+        generated_sequence = poly_seq.to_sequence(
+            qpm=qpm, base_note_sequence=copy.deepcopy(primer_sequence))
+      assert (generated_sequence.total_time - generate_section.end_time) <= 1e-5
+      generated_sequences.append(generated_sequence)
+    return generated_sequences
+
+
+def _rnn_steps_to_gen(poly_seq, total_steps):
+  """Returns the number of RNN steps to request when extending a track.
+
+  Args:
+    poly_seq: The PolyphonicSequence to be extended.
+    total_steps: The total number of quantized steps the track should have.
+
+  Returns:
+    The integer number of RNN steps to generate.
+  """
+  # Assume it takes ~5 rnn steps to generate one quantized step.
+  # Can't know for sure until generation is finished because the number of
+  # notes per quantized step is variable.
+  steps_to_gen = total_steps - poly_seq.num_steps
+  rnn_steps_to_gen = 5 * steps_to_gen
+  tf.logging.info(
+      'Need to generate %d more steps for this sequence, will try asking '
+      'for %d RNN steps' % (steps_to_gen, rnn_steps_to_gen))
+  return rnn_steps_to_gen
 
 
 def _inject_melody(melody, start_step, encoder_decoder, event_sequences,
@@ -15,6 +15,7 @@
 
 import copy
 import heapq
+import itertools
 
 # internal imports
 
@@ -31,6 +32,29 @@ class EventSequenceRnnModelException(Exception):
   pass
 
 
+class _GenerationSession(object):
+  """The RNN state reached by feeding a primer to the model.
+
+  Attributes:
+    tf_session: The TF session the state was computed with.
+    events: A list of the primer events whose inputs have been fed to the RNN.
+    control_events: A list of the control events used to compute those inputs,
+        or None if generation is not conditioned on control events.
+    state: The RNN state after those inputs, a nested structure of numpy arrays
+        with first dimensions equal to 1.
+  """
+
+  def __init__(self):
+    self.reset(None, None, None)
+
+  def reset(self, tf_session, control_events, state):
+    """Replaces the cached state with one for which no events have been fed."""
+    self.tf_session = tf_session
+    self.events = []
+    self.control_events = control_events
+    self.state = state
+
+
 class EventSequenceRnnModel(mm.BaseModel):
   """Class for RNN event sequence generation models.
 
@@ -48,6 +72,24 @@ class EventSequenceRnnModel(mm.BaseModel):
     """
     super(EventSequenceRnnModel, self).__init__()
     self._config = config
+    self._generation_session = None
+
+  def start_generation_session(self):
+    """Starts caching the RNN state reached by priming between generate calls.
+
+    Within a session, the state after feeding a primer is kept. A later primer
+    that starts with the same events (and control events) is primed by feeding
+    only the events after them, rather than the full primer. Any other primer is
+    primed in full, replacing the cached state.
+
+    In a session, the log-likelihood logged by beam search does not include the
+    primer events.
+    """
+    self._generation_session = _GenerationSession()
+
+  def end_generation_session(self):
+    """Ends the session started by `start_generation_session`."""
+    self._generation_session = None
 
   def _build_graph_for_generation(self):
     return events_rnn_graph.build_graph('generate', self._config)
@@ -57,31 +99,34 @@ class EventSequenceRnnModel(mm.BaseModel):
     return self._session.graph.get_collection('inputs')[0].shape[0].value
 
   def _generate_step_for_batch(self, event_sequences, inputs, initial_state,
-                               temperature):
+                               temperature, random_state=None):
     """Extends a batch of event sequences by a single step each.
 
     This method modifies the event sequences in place.
 
     Args:
       event_sequences: A list of event sequences, each of which is a Python
-          list-like object. The list of event sequences should have length equal
-          to `self._batch_size()`. These are extended by this method.
-      inputs: A Python list of model inputs, with length equal to
+          list-like object. The list of event sequences should have length at
+          most `self._batch_size()`; any remaining rows of `inputs` and
+          `initial_state` are padding. These are extended by this method.
+      inputs: A numpy array of model inputs, with first dimension equal to
           `self._batch_size()`.
       initial_state: A numpy array containing the initial RNN state, where
           `initial_state.shape[0]` is equal to `self._batch_size()`.
       temperature: The softmax temperature.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
 
     Returns:
       final_state: The final RNN state, a numpy array the same size as
           `initial_state`.
       loglik: The log-likelihood of the chosen softmax value for each event
-          sequence, a 1-D numpy array of length
-          `self._batch_size()`. If `inputs` is a full-length inputs batch, the
-          log-likelihood of each entire sequence up to and including the
-          generated step will be computed and returned.
+          sequence, a 1-D numpy array of length `len(event_sequences)`. If
+          `inputs` is a full-length inputs batch, the log-likelihood of each
+          entire sequence up to and including the generated step will be
+          computed and returned.
     """
-    assert len(event_sequences) == self._batch_size()
+    assert len(event_sequences) <= self._batch_size()
 
     graph_inputs = self._session.graph.get_collection('inputs')[0]
     graph_initial_state = self._session.graph.get_collection('initial_state')
@@ -97,6 +142,7 @@ class EventSequenceRnnModel(mm.BaseModel):
       feed_dict[graph_temperature[0]] = temperature
     final_state, softmax = self._session.run(
         [graph_final_state, graph_softmax], feed_dict)
+    softmax = softmax[:len(event_sequences)]
 
     if softmax.shape[1] > 1:
       # The inputs batch is longer than a single step, so we also want to
@@ -108,13 +154,13 @@ class EventSequenceRnnModel(mm.BaseModel):
       loglik = np.zeros(len(event_sequences))
 
     indices = self._config.encoder_decoder.extend_event_sequences(
-        event_sequences, softmax)
+        event_sequences, softmax, random_state=random_state)
     p = softmax[range(len(event_sequences)), -1, indices]
 
     return final_state, loglik + np.log(p)
 
-  def _generate_step(self, event_sequences, inputs, initial_states,
-                     temperature):
+  def _generate_step(self, event_sequences, inputs, initial_state,
+                     temperature, random_state=None):
     """Extends a list of event sequences by a single step each.
 
     This method modifies the event sequences in place.
@@ -122,98 +168,291 @@ class EventSequenceRnnModel(mm.BaseModel):
     Args:
       event_sequences: A list of event sequence objects, which are extended by
           this method.
-      inputs: A Python list of model inputs, with length equal to the number of
-          event sequences.
-      initial_states: A collection of structures for the initial RNN states,
-          one for each event sequence.
+      inputs: A numpy array of model inputs, with first dimension equal to the
+          number of event sequences, as returned by `_get_inputs_batch`.
+      initial_state: A nested structure of numpy arrays for the initial RNN
+          states, with first dimensions equal to the number of event
+          sequences.
       temperature: The softmax temperature.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
 
     Returns:
-      final_states: The final RNN states, a list the same size as
-          `initial_states`.
+      final_state: A nested structure of numpy arrays for the final RNN states,
+          the same size as `initial_state`.
       loglik: The log-likelihood of the chosen softmax value for each event
-          sequence, a 1-D numpy array of length
-          `self._batch_size()`. If `inputs` is a full-length inputs batch, the
-          log-likelihood of each entire sequence up to and including the
-          generated step will be computed and returned.
+          sequence, a 1-D numpy array of length `len(event_sequences)`. If
+          `inputs` is a full-length inputs batch, the log-likelihood of each
+          entire sequence up to and including the generated step will be
+          computed and returned.
     """
+    if inputs.dtype == object:
+      # The event sequences have different numbers of input steps, so extend
+      # the event sequences with each number of input steps separately.
+      num_input_steps = np.array([len(input_) for input_ in inputs])
+      loglik = np.empty(len(event_sequences))
+      group_indices = []
+      group_final_states = []
+      for n in np.unique(num_input_steps):
+        indices = np.flatnonzero(num_input_steps == n)
+        group_final_state, loglik[indices] = self._generate_step(
+            [event_sequences[i] for i in indices],
+            np.stack(inputs[indices]),
+            state_util.gather(initial_state, indices),
+            temperature, random_state)
+        group_indices.append(indices)
+        group_final_states.append(group_final_state)
+      final_state = state_util.gather(
+          state_util.concatenate(group_final_states),
+          np.argsort(np.concatenate(group_indices)))
+      return final_state, loglik
+
     # Split the sequences to extend into batches matching the model batch size.
     batch_size = self._batch_size()
     num_seqs = len(event_sequences)
     num_batches = int(np.ceil(num_seqs / float(batch_size)))
 
+    # Fill the final batch by repeating the last row of the inputs and initial
+    # states. The padding rows are never used to extend an event sequence, so
+    # there is no need to copy the final event sequence.
+    pad_amt = -num_seqs % batch_size
+    if pad_amt:
+      padded_indices = np.concatenate(
+          [np.arange(num_seqs), np.full(pad_amt, num_seqs - 1, np.int64)])
+      inputs = inputs[padded_indices]
+      initial_state = state_util.gather(initial_state, padded_indices)
+
     final_states = []
     loglik = np.empty(num_seqs)
-
-    # Add padding to fill the final batch.
-    pad_amt = -len(event_sequences) % batch_size
-    padded_event_sequences = event_sequences + [
-        copy.deepcopy(event_sequences[-1]) for _ in range(pad_amt)]
-    padded_inputs = inputs + [inputs[-1]] * pad_amt
-    padded_initial_states = initial_states + [initial_states[-1]] * pad_amt
-
     for b in range(num_batches):
       i, j = b * batch_size, (b + 1) * batch_size
-      pad_amt = max(0, j - num_seqs)
       # Generate a single step for one batch of event sequences.
       batch_final_state, batch_loglik = self._generate_step_for_batch(
-          padded_event_sequences[i:j],
-          padded_inputs[i:j],
-          state_util.batch(padded_initial_states[i:j], batch_size),
-          temperature)
-      final_states += state_util.unbatch(
-          batch_final_state, batch_size)[:j - i - pad_amt]
-      loglik[i:j - pad_amt] = batch_loglik[:j - i - pad_amt]
+          event_sequences[i:j],
+          inputs[i:j],
+          state_util.gather(initial_state, np.arange(i, j)),
+          temperature, random_state)
+      final_states.append(batch_final_state)
+      loglik[i:j] = batch_loglik[:min(j, num_seqs) - i]
+
+    final_state = state_util.gather(
+        state_util.concatenate(final_states), np.arange(num_seqs))
+    return final_state, loglik
+
+  def _get_inputs_batch(self, event_sequences, control_events=None,
+                        full_length=False, modify_events_callback=None):
+    """Returns a numpy inputs batch for the given event sequences.
+
+    Args:
+      event_sequences: A list of event sequence objects.
+      control_events: A sequence of control events upon which to condition the
+          inputs, or None.
+      full_length: If True, the inputs batch will be for the full length of
+          each event sequence. If False, the inputs batch will only be for the
+          last event of each event sequence.
+      modify_events_callback: An optional callback for modifying the event list
+          and inputs, as described in `_generate_events`.
+
+    Returns:
+      A float32 numpy array of shape
+      [len(event_sequences), num_input_steps, input_size]. If
+      `modify_events_callback` left the event sequences with different numbers
+      of input steps, a 1-D numpy object array of length `len(event_sequences)`
+      is returned instead, holding a float32 array of shape
+      [num_input_steps, input_size] for each event sequence.
+    """
+    if control_events is not None:
+      # We are conditioning on a control sequence.
+      inputs = self._config.encoder_decoder.get_inputs_batch(
+          control_events, event_sequences, full_length=full_length)
+    else:
+      inputs = self._config.encoder_decoder.get_inputs_batch(
+          event_sequences, full_length=full_length)
+
+    if modify_events_callback:
+      modify_events_callback(
+          self._config.encoder_decoder, event_sequences, inputs)
+
+      if len(set(len(input_) for input_ in inputs)) > 1:
+        # The callback extended the inputs of only some event sequences.
+        ragged_inputs = np.empty(len(inputs), dtype=object)
+        for i, input_ in enumerate(inputs):
+          ragged_inputs[i] = np.asarray(input_, dtype=np.float32)
+        return ragged_inputs
+
+    return np.asarray(inputs, dtype=np.float32)
+
+  def _prime_session(self, session, primer_events, control_events=None):
+    """Feeds the primer events not yet seen in the session to the RNN.
 
-    return final_states, loglik
+    Every primer event but the last is fed, since the input for the last event
+    is used to generate the first new event. If the primer does not extend the
+    events already fed, the session is reset and the primer is fed in full.
+
+    Args:
+      session: The _GenerationSession to update.
+      primer_events: The primer event sequence, a Python list-like object.
+      control_events: A sequence of control events upon which to condition the
+          inputs, or None.
+
+    Returns:
+      The RNN state after feeding all but the last primer event, a nested
+      structure of numpy arrays with first dimensions equal to 1.
+    """
+    num_fed = len(session.events)
+    num_inputs = len(primer_events) - 1
+
+    # The input for position `i` uses the control event at position `i + 1`.
+    if control_events is not None:
+      control_prefix = list(itertools.islice(control_events, num_fed + 1))
+    else:
+      control_prefix = None
+
+    if (session.tf_session is not self._session or
+        num_inputs < num_fed or
+        list(itertools.islice(primer_events, num_fed)) != session.events or
+        control_prefix != session.control_events):
+      graph_initial_state = self._session.graph.get_collection('initial_state')
+      zero_state = self._session.run(graph_initial_state)
+      session.reset(
+          self._session,
+          None if control_prefix is None else control_prefix[:1],
+          state_util.gather(zero_state, np.zeros(1, np.int64)))
+      num_fed = 0
+
+    if num_inputs > num_fed:
+      encoder_decoder = self._config.encoder_decoder
+      if control_events is not None:
+        inputs = [
+            encoder_decoder.events_to_input(control_events, primer_events, i)
+            for i in range(num_fed, num_inputs)]
+      else:
+        inputs = [encoder_decoder.events_to_input(primer_events, i)
+                  for i in range(num_fed, num_inputs)]
+
+      # Feed the same inputs to every row of the batch.
+      batch_size = self._batch_size()
+      graph_inputs = self._session.graph.get_collection('inputs')[0]
+      graph_initial_state = self._session.graph.get_collection('initial_state')
+      graph_final_state = self._session.graph.get_collection('final_state')
+      feed_dict = {
+          graph_inputs: np.tile(np.asarray([inputs], dtype=np.float32),
+                                (batch_size, 1, 1)),
+          tuple(graph_initial_state): state_util.gather(
+              session.state, np.zeros(batch_size, np.int64))}
+      final_state = self._session.run(graph_final_state, feed_dict)
+
+      session.state = state_util.gather(final_state, np.zeros(1, np.int64))
+      session.events.extend(
+          itertools.islice(primer_events, num_fed, num_inputs))
+      if control_events is not None:
+        session.control_events = list(
+            itertools.islice(control_events, num_inputs + 1))
+
+    return session.state
+
+  def _get_primed_inputs_and_state(self, event_sequences, control_events=None,
+                                   modify_events_callback=None):
+    """Returns the inputs and initial RNN states for extending primer copies.
+
+    Outside a generation session, the inputs cover each full event sequence and
+    the initial states are zero. Within a session, the primer is fed through
+    `_prime_session`, and the inputs are only for the last event.
+
+    Args:
+      event_sequences: A list of copies of the primer event sequence.
+      control_events: A sequence of control events upon which to condition the
+          inputs, or None.
+      modify_events_callback: An optional callback for modifying the event list
+          and inputs, as described in `_generate_events`.
+
+    Returns:
+      inputs: A numpy array of model inputs for the first generation step, with
+          first dimension equal to the number of event sequences.
+      initial_state: A nested structure of numpy arrays for the initial RNN
+          states, with first dimensions equal to the number of event sequences.
+    """
+    # The session may be ended from another thread while this runs.
+    session = self._generation_session
+    if session is not None:
+      state = self._prime_session(session, event_sequences[0], control_events)
+      inputs = self._get_inputs_batch(
+          event_sequences, control_events=control_events,
+          modify_events_callback=modify_events_callback)
+    else:
+      inputs = self._get_inputs_batch(
+          event_sequences, control_events=control_events, full_length=True,
+          modify_events_callback=modify_events_callback)
+      graph_initial_state = self._session.graph.get_collection('initial_state')
+      state = self._session.run(graph_initial_state)
+
+    initial_state = state_util.gather(
+        state, np.zeros(len(event_sequences), np.int64))
+    return inputs, initial_state
 
   def _generate_branches(self, event_sequences, loglik, branch_factor,
-                         num_steps, inputs, initial_states, temperature):
+                         num_steps, inputs, initial_state, temperature,
+                         control_events=None, modify_events_callback=None,
+                         random_state=None):
     """Performs a single iteration of branch generation for beam search.
 
     This method generates `branch_factor` branches for each event sequence in
     `event_sequences`, where each branch extends the event sequence by
     `num_steps` steps.
 
+    The inputs and RNN states of the branches are copied from those of the
+    original event sequences by row index, and the first branch reuses the
+    original event sequence objects. The other `branch_factor - 1` branches of
+    each event sequence are made with `branch`, which lets them share their
+    events with the original rather than copying them.
+
     Args:
       event_sequences: A list of event sequence objects.
       loglik: A 1-D numpy array of event sequence log-likelihoods, the same size
           as `event_sequences`.
       branch_factor: The integer branch factor to use.
       num_steps: The integer number of steps to take per branch.
-      inputs: A Python list of model inputs, with length equal to the number of
-          event sequences.
-      initial_states: A collection of structures for the initial RNN states,
-          one for each event sequence.
+      inputs: A numpy array of model inputs for the first step, with first
+          dimension equal to the number of event sequences.
+      initial_state: A nested structure of numpy arrays for the initial RNN
+          states, with first dimensions equal to the number of event sequences.
       temperature: The softmax temperature.
+      control_events: A sequence of control events upon which to condition the
+          generation, or None.
+      modify_events_callback: An optional callback for modifying the event list
+          and inputs, as described in `_generate_events`.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
 
     Returns:
       all_event_sequences: A list of event sequences, with `branch_factor` times
           as many event sequences as the initial list.
-      all_final_state: A list of structures for the initial RNN states, with a
-          length equal to the length of `all_event_sequences`.
+      all_final_state: A nested structure of numpy arrays for the final RNN
+          states, with first dimensions equal to the length of
+          `all_event_sequences`.
       all_loglik: A 1-D numpy array of event sequence log-likelihoods, with
           length equal to the length of `all_event_sequences`.
     """
-    if branch_factor > 1:
-      all_event_sequences = [copy.deepcopy(events)
-                             for events in event_sequences * branch_factor]
-    else:
-      # No need to spend time coping the event sequences if there's no
-      # branching.
-      all_event_sequences = event_sequences
-    all_inputs = inputs * branch_factor
-    all_final_state = initial_states * branch_factor
-    all_loglik = np.tile(loglik, (branch_factor,))
-
-    for _ in range(num_steps):
+    all_event_sequences = event_sequences + [
+        events.branch() for events in event_sequences * (branch_factor - 1)]
+    branch_indices = np.tile(np.arange(len(event_sequences)), branch_factor)
+    all_inputs = inputs[branch_indices]
+    all_final_state = state_util.gather(initial_state, branch_indices)
+    all_loglik = loglik[branch_indices]
+
+    for step in range(num_steps):
+      if step > 0:
+        all_inputs = self._get_inputs_batch(
+            all_event_sequences, control_events=control_events,
+            modify_events_callback=modify_events_callback)
       all_final_state, all_step_loglik = self._generate_step(
-          all_event_sequences, all_inputs, all_final_state, temperature)
+          all_event_sequences, all_inputs, all_final_state, temperature,
+          random_state)
       all_loglik += all_step_loglik
 
     return all_event_sequences, all_final_state, all_loglik
 
-  def _prune_branches(self, event_sequences, final_states, loglik, k):
+  def _prune_branches(self, event_sequences, final_state, loglik, k):
     """Prune all but `k` event sequences.
 
     This method prunes all but the `k` event sequences with highest log-
@@ -221,16 +460,16 @@ class EventSequenceRnnModel(mm.BaseModel):
 
     Args:
       event_sequences: A list of event sequence objects.
-      final_states: A collection of structures for the final RNN states,
-          one for each event sequence.
+      final_state: A nested structure of numpy arrays for the final RNN states,
+          with first dimensions equal to the number of event sequences.
       loglik: A 1-D numpy array of log-likelihoods, the same size as
           `event_sequences`.
       k: The number of event sequences to keep after pruning.
 
     Returns:
       event_sequences: The pruned list of event sequences, of length `k`.
-      final_states: The pruned list of structures for the final RNN states, of
-          length `k`.
+      final_state: The pruned nested structure of numpy arrays for the final
+          RNN states, with first dimensions equal to `k`.
       loglik: The pruned event sequence log-likelihoods, a 1-D numpy array of
           length `k`.
     """
@@ -238,14 +477,14 @@ class EventSequenceRnnModel(mm.BaseModel):
                              key=lambda i: loglik[i])
 
     event_sequences = [event_sequences[i] for i in indices]
-    final_states = [final_states[i] for i in indices]
+    final_state = state_util.gather(final_state, indices)
     loglik = loglik[indices]
 
-    return event_sequences, final_states, loglik
+    return event_sequences, final_state, loglik
 
   def _beam_search(self, events, num_steps, temperature, beam_size,
                    branch_factor, steps_per_iteration, control_events=None,
-                   modify_events_callback=None):
+                   modify_events_callback=None, random_state=None):
     """Generates an event sequence using beam search.
 
     Initially, the beam is filled with `beam_size` copies of the initial event
@@ -269,6 +508,12 @@ class EventSequenceRnnModel(mm.BaseModel):
     After the final iteration, the single event sequence in the beam with
     highest likelihood will be returned.
 
+    The RNN states and model inputs of all sequences are kept in batched numpy
+    arrays throughout, and only the inputs for the most recent event of each
+    sequence are computed after priming. Within a generation session, priming
+    only feeds the primer events not already fed (see
+    `start_generation_session`).
+
     Args:
       events: The initial event sequence, a Python list-like object.
       num_steps: The integer length in steps of the final event sequence, after
@@ -288,56 +533,41 @@ class EventSequenceRnnModel(mm.BaseModel):
           None, will be called with 3 arguments after every event: the current
           EventSequenceEncoderDecoder, a list of current EventSequences, and a
           list of current encoded event inputs.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
 
     Returns:
       The highest-likelihood event sequence as computed by the beam search.
     """
-    event_sequences = [copy.deepcopy(events) for _ in range(beam_size)]
-    graph_initial_state = self._session.graph.get_collection('initial_state')
+    initial_events = copy.deepcopy(events)
+    event_sequences = [initial_events.branch() for _ in range(beam_size)]
     loglik = np.zeros(beam_size)
 
     # Choose the number of steps for the first iteration such that subsequent
     # iterations can all take the same number of steps.
     first_iteration_num_steps = (num_steps - 1) % steps_per_iteration + 1
 
-    if control_events is not None:
-      # We are conditioning on a control sequence.
-      inputs = self._config.encoder_decoder.get_inputs_batch(
-          control_events, event_sequences, full_length=True)
-    else:
-      inputs = self._config.encoder_decoder.get_inputs_batch(
-          event_sequences, full_length=True)
-
-    if modify_events_callback:
-      modify_events_callback(
-          self._config.encoder_decoder, event_sequences, inputs)
-
-    zero_state = state_util.unbatch(self._session.run(graph_initial_state))[0]
-    initial_states = [zero_state] * beam_size
+    inputs, initial_state = self._get_primed_inputs_and_state(
+        event_sequences, control_events=control_events,
+        modify_events_callback=modify_events_callback)
     event_sequences, final_state, loglik = self._generate_branches(
         event_sequences, loglik, branch_factor, first_iteration_num_steps,
-        inputs, initial_states, temperature)
+        inputs, initial_state, temperature, control_events,
+        modify_events_callback, random_state)
 
     num_iterations = (num_steps -
-                      first_iteration_num_steps) / steps_per_iteration
+                      first_iteration_num_steps) // steps_per_iteration
 
     for _ in range(num_iterations):
       event_sequences, final_state, loglik = self._prune_branches(
           event_sequences, final_state, loglik, k=beam_size)
-      if control_events is not None:
-        # We are conditioning on a control sequence.
-        inputs = self._config.encoder_decoder.get_inputs_batch(
-            control_events, event_sequences)
-      else:
-        inputs = self._config.encoder_decoder.get_inputs_batch(event_sequences)
-
-      if modify_events_callback:
-        modify_events_callback(
-            self._config.encoder_decoder, event_sequences, inputs)
-
+      inputs = self._get_inputs_batch(
+          event_sequences, control_events=control_events,
+          modify_events_callback=modify_events_callback)
       event_sequences, final_state, loglik = self._generate_branches(
           event_sequences, loglik, branch_factor, steps_per_iteration, inputs,
-          final_state, temperature)
+          final_state, temperature, control_events, modify_events_callback,
+          random_state)
 
     # Prune to a single sequence.
     event_sequences, final_state, loglik = self._prune_branches(
@@ -346,11 +576,45 @@ class EventSequenceRnnModel(mm.BaseModel):
     tf.logging.info('Beam search yields sequence with log-likelihood: %f ',
                     loglik[0])
 
-    return event_sequences[0]
+    # Copy the winning sequence so it no longer shares events with the pruned
+    # branches.
+    return copy.deepcopy(event_sequences[0])
+
+  def _check_generate_args(self, num_steps, primer_events, control_events):
+    """Checks that generation arguments are valid for this model.
+
+    Args:
+      num_steps: The integer length in steps of the final event sequence, after
+          generation. Includes the primer.
+      primer_events: The primer event sequence, a Python list-like object.
+      control_events: A sequence of control events upon which to condition the
+          generation, or None.
+
+    Raises:
+      EventSequenceRnnModelException: If the primer sequence has zero length or
+          is not shorter than num_steps, or if the control sequence is invalid.
+    """
+    if (control_events is not None and
+        not isinstance(self._config.encoder_decoder,
+                       mm.ConditionalEventSequenceEncoderDecoder)):
+      raise EventSequenceRnnModelException(
+          'control sequence provided but encoder/decoder is not a '
+          'ConditionalEventSequenceEncoderDecoder')
+
+    if not primer_events:
+      raise EventSequenceRnnModelException(
+          'primer sequence must have non-zero length')
+    if len(primer_events) >= num_steps:
+      raise EventSequenceRnnModelException(
+          'primer sequence must be shorter than `num_steps`')
+    if control_events is not None and len(control_events) < num_steps:
+      raise EventSequenceRnnModelException(
+          'control sequence must be at least `num_steps`')
 
   def _generate_events(self, num_steps, primer_events, temperature=1.0,
                        beam_size=1, branch_factor=1, steps_per_iteration=1,
-                       control_events=None, modify_events_callback=None):
+                       control_events=None, modify_events_callback=None,
+                       random_state=None):
     """Generate an event sequence from a primer sequence.
 
     Args:
@@ -374,6 +638,8 @@ class EventSequenceRnnModel(mm.BaseModel):
           None, will be called with 3 arguments after every event: the current
           EventSequenceEncoderDecoder, a list of current EventSequences, and a
           list of current encoded event inputs.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
 
     Returns:
       The generated event sequence (which begins with the provided primer).
@@ -382,30 +648,85 @@ class EventSequenceRnnModel(mm.BaseModel):
       EventSequenceRnnModelException: If the primer sequence has zero length or
           is not shorter than num_steps.
     """
-    if (control_events is not None and
-        not isinstance(self._config.encoder_decoder,
-                       mm.ConditionalEventSequenceEncoderDecoder)):
-      raise EventSequenceRnnModelException(
-          'control sequence provided but encoder/decoder is not a '
-          'ConditionalEventSequenceEncoderDecoder')
-
-    if not primer_events:
-      raise EventSequenceRnnModelException(
-          'primer sequence must have non-zero length')
-    if len(primer_events) >= num_steps:
-      raise EventSequenceRnnModelException(
-          'primer sequence must be shorter than `num_steps`')
-    if control_events is not None and len(control_events) < num_steps:
-      raise EventSequenceRnnModelException(
-          'control sequence must be at least `num_steps`')
+    self._check_generate_args(num_steps, primer_events, control_events)
 
     events = primer_events
     if num_steps > len(primer_events):
       events = self._beam_search(events, num_steps - len(events), temperature,
                                  beam_size, branch_factor, steps_per_iteration,
-                                 control_events, modify_events_callback)
+                                 control_events, modify_events_callback,
+                                 random_state)
     return events
 
+  def _generate_events_batch(self, num_steps, primer_events, num_outputs,
+                             temperature=1.0, beam_size=1, branch_factor=1,
+                             steps_per_iteration=1, control_events=None,
+                             modify_events_callback=None, random_state=None):
+    """Generate multiple independent event sequences from a primer sequence.
+
+    If beam search is not used (`beam_size` and `branch_factor` are both 1),
+    all `num_outputs` event sequences are sampled together, filling the batch
+    dimension of the generation graph. Otherwise a separate beam search is run
+    for each output.
+
+    Args:
+      num_steps: The integer length in steps of the final event sequences,
+          after generation. Includes the primer.
+      primer_events: The primer event sequence, a Python list-like object.
+      num_outputs: The integer number of event sequences to generate.
+      temperature: A float specifying how much to divide the logits by
+         before computing the softmax. Greater than 1.0 makes events more
+         random, less than 1.0 makes events less random.
+      beam_size: An integer, beam size to use when generating event sequences
+          via beam search.
+      branch_factor: An integer, beam search branch factor to use.
+      steps_per_iteration: An integer, number of steps to take per beam search
+          iteration.
+      control_events: A sequence of control events upon which to condition the
+          generation. If not None, the encoder/decoder should be a
+          ConditionalEventSequenceEncoderDecoder, and the control events will be
+          used along with the target sequence to generate model inputs.
+      modify_events_callback: An optional callback for modifying the event list.
+          Can be used to inject events rather than having them generated. If not
+          None, will be called with 3 arguments after every event: the current
+          EventSequenceEncoderDecoder, a list of current EventSequences, and a
+          list of current encoded event inputs.
+      random_state: An optional np.random.RandomState used to sample events.
+          If None, the global numpy random state is used.
+
+    Returns:
+      A list of `num_outputs` generated event sequences (each of which begins
+      with the provided primer).
+
+    Raises:
+      EventSequenceRnnModelException: If the primer sequence has zero length or
+          is not shorter than num_steps.
+    """
+    self._check_generate_args(num_steps, primer_events, control_events)
+
+    if beam_size > 1 or branch_factor > 1:
+      return [self._beam_search(primer_events, num_steps - len(primer_events),
+                                temperature, beam_size, branch_factor,
+                                steps_per_iteration, control_events,
+                                modify_events_callback, random_state)
+              for _ in range(num_outputs)]
+
+    event_sequences = [copy.deepcopy(primer_events)
+                       for _ in range(num_outputs)]
+
+    inputs, initial_state = self._get_primed_inputs_and_state(
+        event_sequences, control_events=control_events,
+        modify_events_callback=modify_events_callback)
+
+    # With a branch factor of 1, branch generation simply extends every event
+    # sequence in the batch.
+    event_sequences, _, _ = self._generate_branches(
+        event_sequences, np.zeros(num_outputs), 1,
+        num_steps - len(primer_events), inputs, initial_state, temperature,
+        control_events, modify_events_callback, random_state)
+
+    return event_sequences
+
   def _evaluate_batch_log_likelihood(self, event_sequences, inputs,
                                      initial_state):
     """Evaluates the log likelihood of a batch of event sequences.
@@ -499,14 +820,14 @@ class EventSequenceRnnModel(mm.BaseModel):
       offset += batch_size
 
     if offset < len(event_sequences):
-      # There's an extra non-full batch. Pad it with a bunch of copies of the
-      # final sequence.
+      # There's an extra non-full batch. Pad it with the final sequence, which
+      # is only read here, so it can be repeated rather than copied.
       num_extra = len(event_sequences) - offset
       pad_size = batch_size - num_extra
       batch_indices = range(offset, len(event_sequences))
       batch_loglik = self._evaluate_batch_log_likelihood(
-          [event_sequences[i] for i in batch_indices] + [
-              copy.deepcopy(event_sequences[-1]) for _ in range(pad_size)],
+          [event_sequences[i] for i in batch_indices] +
+          [event_sequences[-1]] * pad_size,
           [inputs[i] for i in batch_indices] + inputs[-1] * pad_size,
           np.append(initial_state[batch_indices],
                     np.tile(inputs[-1, :], (pad_size, 1)),
@@ -531,12 +852,15 @@ class EventSequenceRnnConfig(object):
         note to use.
     steps_per_second: The integer number of quantized time steps per second to
         use.
+    sparse_inputs: Whether the training and evaluation SequenceExamples store
+        their input vectors sparsely.
   """
 
   def __init__(self, details, encoder_decoder, hparams,
-               steps_per_quarter=4, steps_per_second=100):
+               steps_per_quarter=4, steps_per_second=100, sparse_inputs=False):
     self.details = details
     self.encoder_decoder = encoder_decoder
     self.hparams = hparams
     self.steps_per_quarter = steps_per_quarter
     self.steps_per_second = steps_per_second
+    self.sparse_inputs = sparse_inputs
@@ -0,0 +1,189 @@
+# Copyright 2016 Google Inc. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Tests for events_rnn_model."""
+
+import os
+
+# internal imports
+import numpy as np
+import tensorflow as tf
+import magenta
+
+from magenta.models.shared import events_rnn_graph
+from magenta.models.shared import events_rnn_model
+from magenta.music import events_lib
+
+# A temperature low enough that sampling always picks the most likely event, so
+# that generated sequences can be compared.
+ARGMAX_TEMPERATURE = 1e-6
+
+
+class EventSequenceRnnModelTest(tf.test.TestCase):
+
+  def setUp(self):
+    self.config = events_rnn_model.EventSequenceRnnConfig(
+        None,
+        magenta.music.OneHotEventSequenceEncoderDecoder(
+            magenta.music.testing_lib.TrivialOneHotEncoding(12)),
+        tf.contrib.training.HParams(
+            batch_size=4,
+            rnn_layer_sizes=[16, 16],
+            dropout_keep_prob=1.0,
+            clip_norm=5,
+            learning_rate=0.01))
+
+    # Save a checkpoint of a generation graph with random weights.
+    graph = events_rnn_graph.build_graph('generate', self.config)
+    with graph.as_default():
+      tf.set_random_seed(0)
+      init_op = tf.global_variables_initializer()
+      saver = tf.train.Saver()
+    with tf.Session(graph=graph) as sess:
+      sess.run(init_op)
+      self.checkpoint_file = saver.save(
+          sess, os.path.join(self.get_temp_dir(), 'model.ckpt'))
+
+  def _model(self):
+    model = events_rnn_model.EventSequenceRnnModel(self.config)
+    model.initialize_with_checkpoint(self.checkpoint_file)
+    self.addCleanup(model.close)
+    return model
+
+  def _inject_event_callback(self, rows):
+    """Returns a callback that appends an event to the given rows."""
+    def modify_events_callback(encoder_decoder, event_sequences, inputs):
+      for i in rows:
+        if i < len(event_sequences):
+          event_sequences[i].append(11)
+          inputs[i].extend(
+              encoder_decoder.get_inputs_batch([event_sequences[i]])[0])
+    return modify_events_callback
+
+  def testGenerateEventsBatchWithCallback(self):
+    model = self._model()
+    primer = events_lib.SimpleEventSequence(pad_event=0, events=[1, 2, 3])
+    num_steps = 8
+
+    # Only the second output has events injected, so the outputs have different
+    # numbers of inputs at each step.
+    outputs = model._generate_events_batch(
+        num_steps, primer, 3, temperature=ARGMAX_TEMPERATURE,
+        modify_events_callback=self._inject_event_callback([1]))
+
+    num_generated = num_steps - len(primer)
+    self.assertEquals(3, len(outputs))
+    self.assertEquals(num_steps, len(outputs[0]))
+    self.assertEquals(num_steps + num_generated, len(outputs[1]))
+    self.assertEquals(num_steps, len(outputs[2]))
+    self.assertEquals([11] * num_generated, list(outputs[1][len(primer)::2]))
+
+    # Each output matches the output generated on its own.
+    expected_uninjected = model._generate_events(
+        num_steps, primer, temperature=ARGMAX_TEMPERATURE,
+        modify_events_callback=self._inject_event_callback([]))
+    expected_injected = model._generate_events(
+        num_steps, primer, temperature=ARGMAX_TEMPERATURE,
+        modify_events_callback=self._inject_event_callback([0]))
+    self.assertEquals(list(expected_uninjected), list(outputs[0]))
+    self.assertEquals(list(expected_injected), list(outputs[1]))
+    self.assertEquals(list(expected_uninjected), list(outputs[2]))
+
+  def testGenerateEventsWithRandomState(self):
+    model = self._model()
+    primer = events_lib.SimpleEventSequence(pad_event=0, events=[1, 2, 3])
+    num_steps = 20
+
+    def generate(seed):
+      return list(model._generate_events(
+          num_steps, primer, random_state=np.random.RandomState(seed)))
+
+    def generate_batch(seed):
+      return [list(events) for events in model._generate_events_batch(
+          num_steps, primer, 3, random_state=np.random.RandomState(seed))]
+
+    self.assertEquals(generate(0), generate(0))
+    self.assertNotEqual(generate(0), generate(1))
+    self.assertEquals(generate_batch(0), generate_batch(0))
+    self.assertNotEqual(generate_batch(0), generate_batch(1))
+
+  def _assertStatesClose(self, expected_state, state):
+    self.assertEquals(len(expected_state), len(state))
+    for expected, actual in zip(expected_state, state):
+      self.assertAllClose(expected, actual)
+
+  def _primed_state(self, primer):
+    """Returns the state from priming `primer` in a new generation session."""
+    model = self._model()
+    model.start_generation_session()
+    return model._prime_session(model._generation_session, primer)
+
+  def testGenerationSession(self):
+    model = self._model()
+    model.start_generation_session()
+    session = model._generation_session
+    unprimed_model = self._model()
+
+    primer = events_lib.SimpleEventSequence(pad_event=0, events=[1, 2, 3, 4])
+    extended_primer = events_lib.SimpleEventSequence(
+        pad_event=0, events=[1, 2, 3, 4, 5, 6, 7])
+    shortened_primer = events_lib.SimpleEventSequence(
+        pad_event=0, events=[1, 2])
+    changed_primer = events_lib.SimpleEventSequence(
+        pad_event=0, events=[8, 2, 3, 4, 5, 6, 7])
+
+    for events in [primer, extended_primer, shortened_primer,
+                   changed_primer]:
+      num_steps = len(events) + 4
+      outputs = model._generate_events_batch(
+          num_steps, events, 2, temperature=ARGMAX_TEMPERATURE)
+
+      # Only the primer events not yet fed are fed, and the state matches the
+      # state from priming the full primer, including when the primer does not
+      # extend the events fed before and priming starts over.
+      self.assertEquals(list(events)[:-1], session.events)
+      self._assertStatesClose(self._primed_state(events), session.state)
+
+      # The outputs match the outputs generated without a session.
+      expected_outputs = unprimed_model._generate_events_batch(
+          num_steps, events, 2, temperature=ARGMAX_TEMPERATURE)
+      self.assertEquals([list(output) for output in expected_outputs],
+                        [list(output) for output in outputs])
+
+  def testGenerationSessionPrimesIncrementally(self):
+    model = self._model()
+    model.start_generation_session()
+    session = model._generation_session
+
+    primer = events_lib.SimpleEventSequence(pad_event=0, events=[1, 2, 3, 4])
+    model._prime_session(session, primer)
+    primed_state = session.state
+
+    # Priming an extended primer starts from the cached state, so replacing the
+    # cached state changes the result.
+    extended_primer = events_lib.SimpleEventSequence(
+        pad_event=0, events=[1, 2, 3, 4, 5, 6])
+    expected_state = self._primed_state(extended_primer)
+    session.state = [state + 1.0 for state in primed_state]
+    state = model._prime_session(session, extended_primer)
+    self.assertFalse(np.allclose(expected_state[0], state[0]))
+
+    # Priming from the right cached state gives the fully primed state.
+    session.reset(session.tf_session, None, primed_state)
+    session.events = list(primer)[:-1]
+    state = model._prime_session(session, extended_primer)
+    self._assertStatesClose(expected_state, state)
+
+
+if __name__ == '__main__':
+  tf.test.main()
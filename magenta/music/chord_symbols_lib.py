@@ -40,8 +40,11 @@ transposition only modifies the root and bass, leaving the chord kind and scale
 degree modifications unchanged.
 """
 
+import collections
+import functools
 import itertools
 import re
+import threading
 
 from magenta.music import constants
 
@@ -57,6 +60,90 @@ class ChordSymbolException(Exception):
   pass
 
 
+# The maximum number of results kept by each cached function. Lead sheet
+# corpora use at most a few thousand distinct chord symbol figures.
+_CACHE_MAX_SIZE = 4096
+
+CacheInfo = collections.namedtuple(
+    'CacheInfo', ['hits', 'misses', 'size', 'max_size'])
+
+
+class _LruCache(object):
+  """A bounded least-recently-used cache with hit and miss counters.
+
+  Exceptions raised while computing a value are not cached.
+  """
+
+  def __init__(self, max_size):
+    self._max_size = max_size
+    self._entries = collections.OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key, compute_fn):
+    """Returns the cached value for `key`, calling `compute_fn` on a miss."""
+    with self._lock:
+      if key in self._entries:
+        self.hits += 1
+        # Move the entry to the most recently used end.
+        value = self._entries.pop(key)
+        self._entries[key] = value
+        return value
+      self.misses += 1
+    value = compute_fn()
+    with self._lock:
+      self._entries[key] = value
+      if len(self._entries) > self._max_size:
+        self._entries.popitem(last=False)
+    return value
+
+  def info(self):
+    with self._lock:
+      return CacheInfo(self.hits, self.misses, len(self._entries),
+                       self._max_size)
+
+  def clear(self):
+    with self._lock:
+      self._entries.clear()
+      self.hits = 0
+      self.misses = 0
+
+
+# A dictionary mapping the name of each cached function to its _LruCache.
+_CACHES = {}
+
+
+def _cached(fn):
+  """Decorator that caches the results of a function by its arguments."""
+  cache = _LruCache(_CACHE_MAX_SIZE)
+  _CACHES[fn.__name__.lstrip('_')] = cache
+
+  @functools.wraps(fn)
+  def wrapper(*args):
+    return cache.get(args, lambda: fn(*args))
+
+  return wrapper
+
+
+def chord_symbol_cache_info():
+  """Returns the state of the caches used by the functions in this module.
+
+  Returns:
+    A dictionary mapping the name of each cached function to a CacheInfo
+    namedtuple with the number of cache hits and misses, and the current and
+    maximum number of cached results.
+  """
+  return dict((name, cache.info()) for name, cache in _CACHES.items())
+
+
+def clear_chord_symbol_caches():
+  """Empties the caches used by the functions in this module."""
+  for cache in _CACHES.values():
+    cache.clear()
+  _PITCH_CLASS_MASK_FIGURES[:] = [None] * len(_PITCH_CLASS_MASK_FIGURES)
+
+
 # Intervals between scale steps.
 _STEPS_ABOVE = {'A': 2, 'B': 1, 'C': 2, 'D': 2, 'E': 1, 'F': 2, 'G': 2}
 
@@ -480,12 +567,17 @@ def _largest_chord_kind_from_relative_pitches(relative_pitches):
 
 
 def _degrees_to_modifications(chord_degrees, target_chord_degrees):
-  """Find scale degree modifications to turn chord into target chord."""
+  """Find scale degree modifications to turn chord into target chord.
+
+  Added and altered scale degrees are listed in the order of
+  `target_chord_degrees`, followed by removed scale degrees in the order of
+  `chord_degrees`.
+  """
   degrees = dict(_parse_degree(degree_str) for degree_str in chord_degrees)
   target_degrees = dict(_parse_degree(degree_str)
                         for degree_str in target_chord_degrees)
   modifications_str = ''
-  for degree in target_degrees:
+  for degree, _ in map(_parse_degree, target_chord_degrees):
     if degree not in degrees:
       # Add a scale degree.
       alter = target_degrees[degree]
@@ -501,7 +593,7 @@ def _degrees_to_modifications(chord_degrees, target_chord_degrees):
       assert alter != 0
       alter_str = abs(alter) * ('#' if alter >= 0 else 'b')
       modifications_str += '(%s%d)' % (alter_str, degree)
-  for degree in degrees:
+  for degree, _ in map(_parse_degree, chord_degrees):
     if degree not in target_degrees:
       # Subtract a scale degree.
       modifications_str += '(no%d)' % degree
@@ -521,6 +613,12 @@ def transpose_chord_symbol(figure, transpose_amount):
   Raises:
     ChordSymbolException: If the given chord symbol cannot be interpreted.
   """
+  return _transpose_chord_symbol(figure, transpose_amount % 12)
+
+
+@_cached
+def _transpose_chord_symbol(figure, transpose_amount):
+  """Transposes a chord symbol figure string up by 0 to 11 half steps."""
   # Split chord symbol into root, kind, modifications, and bass.
   root_str, kind_str, modifications_str, bass_str = _split_chord_symbol(figure)
 
@@ -566,6 +664,14 @@ def pitches_to_chord_symbol(pitches):
   This will not always return the most natural name for a chord, but it should
   do something reasonable in most cases.
 
+  The result only depends on the pitch classes and on the pitch class of the
+  lowest pitch, not on the order or octaves of the pitches. Potential roots are
+  tried starting with the bass and then in ascending pitch class order, and the
+  first of the roots with equally large chord kinds is used; modifications are
+  listed in ascending order of their pitch above the root. Ties used to be
+  broken by the order of `pitches`, so some chords are named differently than
+  before, e.g. [80, 76, 60, 39] is now 'C+/Eb' rather than 'Ab(b13)/Eb'.
+
   Args:
     pitches: A python list of integer pitch values.
 
@@ -580,19 +686,104 @@ def pitches_to_chord_symbol(pitches):
   if not pitches:
     return constants.NO_CHORD
 
-  # Convert to pitch classes and dedupe.
-  pitch_classes = set(pitch % 12 for pitch in pitches)
-
-  # Try using the bass note as root first.
+  # The chord symbol only depends on the pitch classes and the bass.
+  pitch_class_mask = 0
+  for pitch in pitches:
+    pitch_class_mask |= 1 << (pitch % 12)
   bass = min(pitches) % 12
-  pitch_classes = [bass] + list(pitch_classes - set([bass]))
 
-  # Try each pitch class in turn as root.
+  figure = _lookup_pitch_class_mask(pitch_class_mask, bass)
+  if figure is None:
+    raise ChordSymbolException(
+        'Unable to determine chord symbol from pitches: %s' % str(pitches))
+  return figure
+
+
+def pitch_class_mask_to_chord_symbol(pitch_class_mask, bass):
+  """Converts a set of pitch classes and a bass pitch class to a chord symbol.
+
+  Equivalent to `pitches_to_chord_symbol` for any pitches with these pitch
+  classes and lowest pitch class `bass`. Results are kept in a table covering
+  all 12 * 4096 possible arguments, which is filled in as they are used.
+
+  Args:
+    pitch_class_mask: An integer bitmask of the pitch classes in the chord, with
+        bit `i` set if pitch class `i` is present.
+    bass: The pitch class of the lowest pitch, an integer between 0 and 11
+        inclusive.
+
+  Returns:
+    A chord symbol figure string representing the chord.
+
+  Raises:
+    ChordSymbolException: If no known chord symbol corresponds to the provided
+        pitch classes.
+  """
+  figure = _lookup_pitch_class_mask(pitch_class_mask, bass)
+  if figure is None:
+    raise ChordSymbolException(
+        'Unable to determine chord symbol from pitch classes: %s (bass %d)' %
+        (str([pitch_class for pitch_class in range(12)
+              if pitch_class_mask & (1 << pitch_class)]), bass))
+  return figure
+
+
+# Marks (bass, pitch class bitmask) combinations with no known chord symbol in
+# _PITCH_CLASS_MASK_FIGURES.
+_UNKNOWN_FIGURE = object()
+
+# A table of the chord symbol for each (bass, pitch class bitmask) combination,
+# indexed by `bass << 12 | pitch_class_mask`. Entries are None until computed.
+_PITCH_CLASS_MASK_FIGURES = [None] * (12 << 12)
+
+
+def _lookup_pitch_class_mask(pitch_class_mask, bass):
+  """Returns the table entry for a chord, computing it if needed.
+
+  Args:
+    pitch_class_mask: An integer bitmask of the pitch classes in the chord.
+    bass: The pitch class of the lowest pitch.
+
+  Returns:
+    A chord symbol figure string, or None if no known chord symbol corresponds
+    to the pitch classes.
+  """
+  pitch_class_mask |= 1 << bass
+  index = bass << 12 | pitch_class_mask
+  figure = _PITCH_CLASS_MASK_FIGURES[index]
+  if figure is None:
+    figure = _pitch_classes_to_chord_symbol(pitch_class_mask, bass)
+    if figure is None:
+      figure = _UNKNOWN_FIGURE
+    _PITCH_CLASS_MASK_FIGURES[index] = figure
+  return None if figure is _UNKNOWN_FIGURE else figure
+
+
+def _pitch_classes_to_chord_symbol(pitch_class_mask, bass):
+  """Converts a set of pitch classes to a chord symbol.
+
+  Args:
+    pitch_class_mask: An integer bitmask of the pitch classes in the chord, with
+        bit `i` set if pitch class `i` is present.
+    bass: The pitch class of the lowest pitch.
+
+  Returns:
+    A chord symbol figure string, or None if no known chord symbol corresponds
+    to the pitch classes.
+  """
+  # Try using the bass note as root first, then the other pitch classes in
+  # ascending order.
+  pitch_classes = [bass] + [pitch_class for pitch_class in range(12)
+                            if pitch_class != bass and
+                            pitch_class_mask & (1 << pitch_class)]
+
+  # Try each pitch class in turn as root. Of the roots whose chord kinds are
+  # equally large, the first one wins.
   best_root = None
   best_abbrev = None
   best_degrees = []
   for root in pitch_classes:
-    relative_pitches = set((pitch - root) % 12 for pitch in pitch_classes)
+    relative_pitches = sorted((pitch - root) % 12 for pitch in pitch_classes)
     abbrev, degrees = _largest_chord_kind_from_relative_pitches(
         relative_pitches)
     if abbrev is not None:
@@ -604,8 +795,7 @@ def pitches_to_chord_symbol(pitches):
         best_degrees = degrees
 
   if best_root is None:
-    raise ChordSymbolException(
-        'Unable to determine chord symbol from pitches: %s' % str(pitches))
+    return None
 
   root_str = _pitch_class_to_string(*_transpose_pitch_class('C', 0, best_root))
   kind_str = best_abbrev
@@ -644,15 +834,22 @@ def chord_symbol_pitches(figure):
   Raises:
     ChordSymbolException: If the given chord symbol cannot be interpreted.
   """
+  return list(_chord_symbol_pitches(figure))
+
+
+@_cached
+def _chord_symbol_pitches(figure):
+  """Returns a tuple of the pitch classes contained in a chord."""
   root, degrees, _ = _parse_chord_symbol(figure)
   root_step, root_alter = root
   root_pitch = _pitch_class_to_midi(root_step, root_alter)
   normalized_degrees = [((degree - 1) % 7 + 1, alter)
                         for degree, alter in degrees.items()]
-  return [(root_pitch + _DEGREE_OFFSETS[degree] + alter) % 12
-          for degree, alter in normalized_degrees]
+  return tuple((root_pitch + _DEGREE_OFFSETS[degree] + alter) % 12
+               for degree, alter in normalized_degrees)
 
 
+@_cached
 def chord_symbol_root(figure):
   """Return the root pitch class of a chord.
 
@@ -670,6 +867,7 @@ def chord_symbol_root(figure):
   return _pitch_class_to_midi(root_step, root_alter)
 
 
+@_cached
 def chord_symbol_bass(figure):
   """Return the bass pitch class of a chord.
 
@@ -692,6 +890,7 @@ def chord_symbol_bass(figure):
   return _pitch_class_to_midi(bass_step, bass_alter)
 
 
+@_cached
 def chord_symbol_quality(figure):
   """Return the quality (major, minor, dimished, augmented) of a chord.
 
@@ -13,6 +13,8 @@
 # limitations under the License.
 """Tests for chord_symbols_lib."""
 
+import itertools
+
 # internal imports
 import tensorflow as tf
 
@@ -116,6 +118,43 @@ class ChordSymbolFunctionsTest(tf.test.TestCase):
       chord_symbols_lib.pitches_to_chord_symbol(
           [60, 61, 62, 63, 64, 65, 66, 67, 68, 69, 70, 71])
 
+  def testPitchesToChordSymbolTieBreaking(self):
+    # Roots are tried starting with the bass and then in ascending pitch class
+    # order, and the first root with the largest chord kind wins, regardless of
+    # the order of the pitches.
+    for pitches in itertools.permutations([80, 76, 60, 39]):
+      self.assertEqual(
+          'C+/Eb', chord_symbols_lib.pitches_to_chord_symbol(list(pitches)))
+    for pitches in itertools.permutations([61, 55, 67, 68]):
+      self.assertEqual(
+          'Db5(#11)/G',
+          chord_symbols_lib.pitches_to_chord_symbol(list(pitches)))
+
+    # Modifications are in ascending order of their pitch above the root.
+    for pitches in itertools.permutations([44, 50, 54]):
+      self.assertEqual(
+          'Abped(addb5)(addb7)',
+          chord_symbols_lib.pitches_to_chord_symbol(list(pitches)))
+    for pitches in itertools.permutations([52, 58, 65, 68]):
+      self.assertEqual(
+          'Bb5(#11)(addb7)/E',
+          chord_symbols_lib.pitches_to_chord_symbol(list(pitches)))
+
+  def testPitchClassMaskToChordSymbol(self):
+    # C major triad (C, E, G).
+    figure = chord_symbols_lib.pitch_class_mask_to_chord_symbol(
+        1 << 0 | 1 << 4 | 1 << 7, 0)
+    self.assertEqual('C', figure)
+    # First inversion.
+    figure = chord_symbols_lib.pitch_class_mask_to_chord_symbol(
+        1 << 0 | 1 << 4 | 1 << 7, 4)
+    self.assertEqual('C/E', figure)
+    # Matches the chord inferred from pitches.
+    figure = chord_symbols_lib.pitch_class_mask_to_chord_symbol(
+        1 << 9 | 1 << 0 | 1 << 4, 9)
+    self.assertEqual(
+        chord_symbols_lib.pitches_to_chord_symbol([45, 48, 52]), figure)
+
   def testChordSymbolPitches(self):
     pitches = chord_symbols_lib.chord_symbol_pitches('Am')
     pitch_classes = set(pitch % 12 for pitch in pitches)
@@ -219,6 +258,42 @@ class ChordSymbolFunctionsTest(tf.test.TestCase):
     quality = chord_symbols_lib.chord_symbol_quality('E(no3)')
     self.assertEqual(CHORD_QUALITY_OTHER, quality)
 
+  def testChordSymbolCache(self):
+    chord_symbols_lib.clear_chord_symbol_caches()
+
+    # Cached results are not shared with the caller.
+    pitches = chord_symbols_lib.chord_symbol_pitches('Cmaj7')
+    pitches.append(1)
+    self.assertEqual(
+        [0, 4, 7, 11],
+        sorted(chord_symbols_lib.chord_symbol_pitches('Cmaj7')))
+
+    # Transposition amounts are cached modulo 12.
+    self.assertEqual(
+        'Eb7', chord_symbols_lib.transpose_chord_symbol('C7', 3))
+    self.assertEqual(
+        'Eb7', chord_symbols_lib.transpose_chord_symbol('C7', -9))
+
+    # Different voicings of the same chord share a cache entry.
+    self.assertEqual(
+        'C', chord_symbols_lib.pitches_to_chord_symbol([60, 64, 67]))
+    self.assertEqual(
+        'C', chord_symbols_lib.pitches_to_chord_symbol([48, 67, 76]))
+
+    # Failures are not cached.
+    for _ in range(2):
+      with self.assertRaises(chord_symbols_lib.ChordSymbolException):
+        chord_symbols_lib.chord_symbol_root('H7')
+
+    cache_info = chord_symbols_lib.chord_symbol_cache_info()
+    self.assertEqual((1, 1, 1), cache_info['chord_symbol_pitches'][:3])
+    self.assertEqual((1, 1, 1), cache_info['transpose_chord_symbol'][:3])
+    self.assertEqual((0, 2, 0), cache_info['chord_symbol_root'][:3])
+
+    chord_symbols_lib.clear_chord_symbol_caches()
+    cache_info = chord_symbols_lib.chord_symbol_cache_info()
+    self.assertEqual((0, 0, 0), cache_info['chord_symbol_pitches'][:3])
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -17,6 +17,7 @@
 import tensorflow as tf
 
 from magenta.music import drums_encoder_decoder
+from magenta.music import encoder_decoder
 
 DRUMS = lambda *args: frozenset(args)
 NO_DRUMS = frozenset()
@@ -74,5 +75,34 @@ class MultiDrumOneHotEncodingTest(tf.test.TestCase):
     self.assertEquals(3, len(event))
 
 
+class MultiDrumLookbackEncoderDecoderTest(tf.test.TestCase):
+
+  def setUp(self):
+    self.enc = encoder_decoder.LookbackEventSequenceEncoderDecoder(
+        drums_encoder_decoder.MultiDrumOneHotEncoding(), [1, 2], 3)
+
+  def testEventSequencesToArrays(self):
+    # Pitches 35 and 36 are both bass drum, and the unknown pitch 127 is
+    # ignored, so distinct events here share one-hot indices.
+    event_sequences = [
+        [DRUMS(35), DRUMS(36), DRUMS(35), DRUMS(36), DRUMS(36, 38)],
+        [NO_DRUMS, DRUMS(127), NO_DRUMS, DRUMS(36, 127), DRUMS(36)],
+        [DRUMS(127), NO_DRUMS, DRUMS(38), DRUMS(38), DRUMS(35, 36)],
+    ]
+    self.assertEquals(
+        self.enc._one_hot_encoding.encode_event(DRUMS(35)),
+        self.enc._one_hot_encoding.encode_event(DRUMS(36)))
+
+    inputs = self.enc.event_sequences_to_input_array(event_sequences)
+    labels = self.enc.event_sequences_to_label_array(event_sequences)
+    for i, events in enumerate(event_sequences):
+      self.assertEquals(
+          [self.enc.events_to_input(events, j) for j in range(len(events))],
+          inputs[i].tolist())
+      self.assertEquals(
+          [self.enc.events_to_label(events, j) for j in range(len(events))],
+          labels[i].tolist())
+
+
 if __name__ == '__main__':
   tf.test.main()
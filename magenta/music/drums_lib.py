@@ -20,7 +20,7 @@ use midi_io.sequence_proto_to_midi_file to write that NoteSequence to a midi
 file.
 """
 
-import collections
+import itertools
 import operator
 
 # internal imports
@@ -119,7 +119,8 @@ class DrumTrack(events_lib.SimpleEventSequence):
                               search_start_step=0,
                               gap_bars=1,
                               pad_end=False,
-                              ignore_is_drum=False):
+                              ignore_is_drum=False,
+                              note_index=None):
     """Populate self with drums from the given quantized NoteSequence object.
 
     A drum track is extracted from the given quantized sequence starting at time
@@ -144,6 +145,9 @@ class DrumTrack(events_lib.SimpleEventSequence):
       pad_end: If True, the end of the drums will be padded with empty events so
           that it will end at a bar boundary.
       ignore_is_drum: Whether accept notes where `is_drum` is False.
+      note_index: An optional sequences_lib.QuantizedNoteIndex of
+          `quantized_sequence`, to avoid re-indexing the notes when extracting
+          multiple drum tracks from the same sequence.
 
     Raises:
       NonIntegerStepsPerBarException: If `quantized_sequence`'s bar length
@@ -164,27 +168,23 @@ class DrumTrack(events_lib.SimpleEventSequence):
     self._steps_per_quarter = (
         quantized_sequence.quantization_info.steps_per_quarter)
 
-    # Group all drum notes that start at the same step.
-    all_notes = [note for note in quantized_sequence.notes
+    # Group all drum notes after start_step that start at the same step, sorted
+    # by note start times.
+    if note_index is None:
+      note_index = sequences_lib.QuantizedNoteIndex(quantized_sequence)
+    all_notes = (note for note in note_index.notes(start_step=search_start_step)
                  if ((note.is_drum or ignore_is_drum)  # drums only
-                     and note.velocity  # no zero-velocity notes
-                     # after start_step only
-                     and note.quantized_start_step >= search_start_step)]
-    grouped_notes = collections.defaultdict(list)
-    for note in all_notes:
-      grouped_notes[note.quantized_start_step].append(note)
-
-    # Sort by note start times.
-    notes = sorted(grouped_notes.items(), key=operator.itemgetter(0))
-
-    if not notes:
-      return
+                     and note.velocity))  # no zero-velocity notes
+    notes = itertools.groupby(
+        all_notes, key=operator.attrgetter('quantized_start_step'))
 
     gap_start_index = 0
 
-    track_start_step = (
-        notes[0][0] - (notes[0][0] - search_start_step) % steps_per_bar)
+    track_start_step = None
     for start, group in notes:
+      if track_start_step is None:
+        track_start_step = (
+            start - (start - search_start_step) % steps_per_bar)
 
       start_index = start - track_start_step
       pitches = frozenset(note.pitch for note in group)
@@ -276,7 +276,8 @@ def extract_drum_tracks(quantized_sequence,
                         max_steps_discard=None,
                         gap_bars=1.0,
                         pad_end=False,
-                        ignore_is_drum=False):
+                        ignore_is_drum=False,
+                        note_index=None):
   """Extracts a list of drum tracks from the given quantized NoteSequence.
 
   This function will search through `quantized_sequence` for drum tracks. A drum
@@ -312,6 +313,8 @@ def extract_drum_tracks(quantized_sequence,
     pad_end: If True, the end of the drum track will be padded with empty events
         so that it will end at a bar boundary.
     ignore_is_drum: Whether accept notes where `is_drum` is False.
+    note_index: An optional sequences_lib.QuantizedNoteIndex of
+        `quantized_sequence`. If None, one is built.
 
   Returns:
     drum_tracks: A python list of DrumTrack instances.
@@ -339,6 +342,9 @@ def extract_drum_tracks(quantized_sequence,
   steps_per_bar = int(
       sequences_lib.steps_per_bar_in_quantized_sequence(quantized_sequence))
 
+  if note_index is None:
+    note_index = sequences_lib.QuantizedNoteIndex(quantized_sequence)
+
   # Quantize the track into a DrumTrack object.
   # If any notes start at the same time, only one is kept.
   while 1:
@@ -349,7 +355,8 @@ def extract_drum_tracks(quantized_sequence,
           search_start_step=search_start_step,
           gap_bars=gap_bars,
           pad_end=pad_end,
-          ignore_is_drum=ignore_is_drum)
+          ignore_is_drum=ignore_is_drum,
+          note_index=note_index)
     except events_lib.NonIntegerStepsPerBarException:
       raise
     search_start_step = (
@@ -60,6 +60,58 @@ DEFAULT_STEPS_PER_BAR = constants.DEFAULT_STEPS_PER_BAR
 DEFAULT_LOOKBACK_DISTANCES = [DEFAULT_STEPS_PER_BAR, DEFAULT_STEPS_PER_BAR * 2]
 
 
+def _common_length(event_sequences):
+  """Returns the length shared by all of the given event sequences.
+
+  Args:
+    event_sequences: A list of list-like event sequences.
+
+  Returns:
+    The integer length of each event sequence, or 0 if `event_sequences` is
+    empty.
+
+  Raises:
+    ValueError: If the event sequences are not all the same length.
+  """
+  lengths = set(len(events) for events in event_sequences)
+  if len(lengths) > 1:
+    raise ValueError(
+        'event sequences must all be the same length, got lengths %s' %
+        sorted(lengths))
+  return lengths.pop() if lengths else 0
+
+
+def _sample_classes(probabilities, random_state=None):
+  """Samples one class index from each row of a batch of distributions.
+
+  Uses the inverse CDF method. The cumulative distributions of all rows are
+  offset by their row index and flattened, so a single `np.searchsorted` call
+  samples the whole batch.
+
+  Args:
+    probabilities: A 2-D numpy array of shape [batch_size, num_classes] whose
+        rows are (possibly unnormalized) probability distributions.
+    random_state: An optional np.random.RandomState used to draw the samples.
+        If None, the global numpy random state is used.
+
+  Returns:
+    An int64 numpy array of shape [batch_size] containing the sampled class
+    index for each row.
+  """
+  if random_state is None:
+    random_state = np.random
+  batch_size, num_classes = probabilities.shape
+  cdf = np.cumsum(probabilities, axis=1)
+  # Normalize each row so that rounding error in the softmax cannot leave
+  # uniform samples beyond the end of the distribution.
+  cdf /= cdf[:, -1:]
+  offsets = np.arange(batch_size)
+  samples = random_state.random_sample(batch_size) + offsets
+  indices = np.searchsorted(
+      (cdf + offsets[:, np.newaxis]).ravel(), samples, side='right')
+  return np.minimum(indices - offsets * num_classes, num_classes - 1)
+
+
 class OneHotEncoding(object):
   """An interface for specifying a one-hot encoding of individual events."""
   __metaclass__ = abc.ABCMeta
@@ -205,21 +257,96 @@ class EventSequenceEncoderDecoder(object):
     """
     pass
 
-  def encode(self, events):
+  def events_to_input_array(self, events):
+    """Returns the input vectors for every position in the event sequence.
+
+    Args:
+      events: A list-like sequence of events.
+
+    Returns:
+      A float32 numpy array of shape [len(events), self.input_size], where row
+      `i` is the input vector for position `i`.
+    """
+    return self.event_sequences_to_input_array([events])[0]
+
+  def events_to_label_array(self, events):
+    """Returns the labels for every position in the event sequence.
+
+    Args:
+      events: A list-like sequence of events.
+
+    Returns:
+      An int64 numpy array of shape [len(events)], where element `i` is the
+      label for position `i`.
+    """
+    return self.event_sequences_to_label_array([events])[0]
+
+  def event_sequences_to_input_array(self, event_sequences):
+    """Returns the input vectors for every position in each event sequence.
+
+    The default implementation calls `events_to_input` once per position.
+    Subclasses may override this with a vectorized implementation that must
+    produce identical input vectors.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      A float32 numpy array of shape
+      [len(event_sequences), len(event_sequences[0]), self.input_size].
+
+    Raises:
+      ValueError: If the event sequences are not all the same length.
+    """
+    num_steps = _common_length(event_sequences)
+    inputs = np.zeros([len(event_sequences), num_steps, self.input_size],
+                      dtype=np.float32)
+    for i, events in enumerate(event_sequences):
+      for j in range(num_steps):
+        inputs[i, j] = self.events_to_input(events, j)
+    return inputs
+
+  def event_sequences_to_label_array(self, event_sequences):
+    """Returns the labels for every position in each event sequence.
+
+    The default implementation calls `events_to_label` once per position.
+    Subclasses may override this with a vectorized implementation that must
+    produce identical labels.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      An int64 numpy array of shape
+      [len(event_sequences), len(event_sequences[0])].
+
+    Raises:
+      ValueError: If the event sequences are not all the same length.
+    """
+    num_steps = _common_length(event_sequences)
+    labels = np.zeros([len(event_sequences), num_steps], dtype=np.int64)
+    for i, events in enumerate(event_sequences):
+      for j in range(num_steps):
+        labels[i, j] = self.events_to_label(events, j)
+    return labels
+
+  def encode(self, events, sparse_inputs=False):
     """Returns a SequenceExample for the given event sequence.
 
     Args:
       events: A list-like sequence of events.
+      sparse_inputs: If True, the input vectors are stored sparsely. See
+          `sequence_example_lib.make_sequence_example`.
 
     Returns:
       A tf.train.SequenceExample containing inputs and labels.
     """
-    inputs = []
-    labels = []
-    for i in range(len(events) - 1):
-      inputs.append(self.events_to_input(events, i))
-      labels.append(self.events_to_label(events, i + 1))
-    return sequence_example_lib.make_sequence_example(inputs, labels)
+    inputs = self.events_to_input_array(events)[:-1]
+    labels = self.events_to_label_array(events)[1:]
+    return sequence_example_lib.make_sequence_example(
+        inputs.tolist(), labels.tolist(), sparse_inputs=sparse_inputs)
 
   def get_inputs_batch(self, event_sequences, full_length=False):
     """Returns an inputs batch for the given event sequences.
@@ -241,33 +368,34 @@ class EventSequenceEncoderDecoder(object):
     """
     inputs_batch = []
     for events in event_sequences:
-      inputs = []
       if full_length:
-        for i in range(len(events)):
-          inputs.append(self.events_to_input(events, i))
+        inputs = self.events_to_input_array(events).tolist()
       else:
-        inputs.append(self.events_to_input(events, len(events) - 1))
+        inputs = [self.events_to_input(events, len(events) - 1)]
       inputs_batch.append(inputs)
     return inputs_batch
 
-  def extend_event_sequences(self, event_sequences, softmax):
+  def extend_event_sequences(self, event_sequences, softmax,
+                             random_state=None):
     """Extends the event sequences by sampling the softmax probabilities.
 
+    The classes for all event sequences are sampled together in one vectorized
+    operation.
+
     Args:
       event_sequences: A list of EventSequence objects.
       softmax: A list of softmax probability vectors. The list of softmaxes
           should be the same length as the list of event sequences.
+      random_state: An optional np.random.RandomState used for sampling. If
+          None, the global numpy random state is used.
 
     Returns:
       A Python list of chosen class indices, one for each event sequence.
     """
-    num_classes = len(softmax[0][0])
-    chosen_classes = []
-    for i in xrange(len(event_sequences)):
-      chosen_class = np.random.choice(num_classes, p=softmax[i][-1])
-      event = self.class_index_to_event(chosen_class, event_sequences[i])
-      event_sequences[i].append(event)
-      chosen_classes.append(chosen_class)
+    probabilities = np.array([s[-1] for s in softmax], dtype=np.float64)
+    chosen_classes = _sample_classes(probabilities, random_state).tolist()
+    for events, chosen_class in zip(event_sequences, chosen_classes):
+      events.append(self.class_index_to_event(chosen_class, events))
     return chosen_classes
 
   def evaluate_log_likelihood(self, event_sequences, softmax):
@@ -291,20 +419,32 @@ class EventSequenceEncoderDecoder(object):
       ValueError: If one of the event sequences is too long with respect to the
           corresponding softmax vectors.
     """
-    all_loglik = []
-    for i in xrange(len(event_sequences)):
-      if len(softmax[i]) >= len(event_sequences[i]):
+    for events, events_softmax in zip(event_sequences, softmax):
+      if len(events_softmax) >= len(events):
         raise ValueError(
             'event sequence must be longer than softmax vector (%d events but '
-            'softmax vector has length %d)' % (len(event_sequences[i]),
-                                               len(softmax[i])))
-      end_pos = len(event_sequences[i])
-      start_pos = end_pos - len(softmax[i])
-      loglik = 0.0
-      for softmax_pos, position in enumerate(range(start_pos, end_pos)):
-        index = self.events_to_label(event_sequences[i], position)
-        loglik += np.log(softmax[i][softmax_pos][index])
-      all_loglik.append(loglik)
+            'softmax vector has length %d)' % (len(events),
+                                               len(events_softmax)))
+
+    if len(set(len(events) for events in event_sequences)) == 1:
+      # All event sequences are the same length, so their labels can be computed
+      # and gathered as a single batch.
+      softmax = np.asarray(softmax)
+      num_positions = softmax.shape[1]
+      labels = self.event_sequences_to_label_array(
+          event_sequences)[:, -num_positions:]
+      probs = softmax[np.arange(len(event_sequences))[:, np.newaxis],
+                      np.arange(num_positions)[np.newaxis, :],
+                      labels]
+      return np.sum(np.log(probs), axis=1).tolist()
+
+    all_loglik = []
+    for events, events_softmax in zip(event_sequences, softmax):
+      events_softmax = np.asarray(events_softmax)
+      num_positions = len(events_softmax)
+      labels = self.events_to_label_array(events)[-num_positions:]
+      probs = events_softmax[np.arange(num_positions), labels]
+      all_loglik.append(np.sum(np.log(probs)))
     return all_loglik
 
 
@@ -485,6 +625,62 @@ class LookbackEventSequenceEncoderDecoder(EventSequenceEncoderDecoder):
 
     return input_
 
+  def event_sequences_to_input_array(self, event_sequences):
+    """Returns the input vectors for every position in each event sequence.
+
+    Vectorized equivalent of calling `events_to_input` at every position; see
+    that method for the layout of each input vector.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      A float32 numpy array of shape
+      [len(event_sequences), len(event_sequences[0]), self.input_size].
+
+    Raises:
+      ValueError: If the event sequences are not all the same length.
+    """
+    indices = self._encode_event_sequences(event_sequences)
+    batch_size, num_steps = indices.shape
+    num_classes = self._one_hot_encoding.num_classes
+    default_index = self._one_hot_encoding.encode_event(
+        self._one_hot_encoding.default_event)
+
+    inputs = np.zeros([batch_size, num_steps, self.input_size],
+                      dtype=np.float32)
+    batch_range = np.arange(batch_size)[:, np.newaxis]
+    step_range = np.arange(num_steps)[np.newaxis, :]
+
+    # Last event.
+    inputs[batch_range, step_range, indices] = 1.0
+    offset = num_classes
+
+    # Next event if repeating N positions ago.
+    for lookback_distance in self._lookback_distances:
+      lookback_indices = np.full_like(indices, default_index)
+      shift = lookback_distance - 1
+      if shift < num_steps:
+        lookback_indices[:, shift:] = indices[:, :num_steps - shift]
+      inputs[batch_range, step_range, offset + lookback_indices] = 1.0
+      offset += num_classes
+
+    # Binary time counter giving the metric location of the *next* event.
+    n = np.arange(1, num_steps + 1)
+    for i in range(self._binary_counter_bits):
+      inputs[:, :, offset] = np.where((n >> i) & 1, 1.0, -1.0)
+      offset += 1
+
+    # Last event is repeating N bars ago.
+    for repeating in self._lookback_repeats(event_sequences):
+      inputs[:, :, offset] = repeating
+      offset += 1
+
+    assert offset == self.input_size
+
+    return inputs
+
   def events_to_label(self, events, position):
     """Returns the label for the given position in the event sequence.
 
@@ -529,6 +725,96 @@ class LookbackEventSequenceEncoderDecoder(EventSequenceEncoderDecoder):
     # specific event.
     return self._one_hot_encoding.encode_event(events[position])
 
+  def event_sequences_to_label_array(self, event_sequences):
+    """Returns the labels for every position in each event sequence.
+
+    Vectorized equivalent of calling `events_to_label` at every position.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      An int64 numpy array of shape
+      [len(event_sequences), len(event_sequences[0])].
+
+    Raises:
+      ValueError: If the event sequences are not all the same length.
+    """
+    indices = self._encode_event_sequences(event_sequences)
+    num_steps = indices.shape[1]
+    num_classes = self._one_hot_encoding.num_classes
+
+    labels = indices.copy()
+
+    # If last step repeated N bars ago. Later (more distant) lookbacks take
+    # precedence, so they are applied last.
+    for i, repeating in enumerate(self._lookback_repeats(event_sequences)):
+      labels[repeating] = num_classes + i
+
+    if self._lookback_distances:
+      default_event = self._one_hot_encoding.default_event
+      num_early_steps = min(self._lookback_distances[-1], num_steps)
+      early_default = np.zeros([len(event_sequences), num_early_steps],
+                               dtype=bool)
+      for i, events in enumerate(event_sequences):
+        early_default[i] = [event == default_event
+                            for event in list(events)[:num_early_steps]]
+      labels[:, :num_early_steps][early_default] = (
+          num_classes + len(self._lookback_distances) - 1)
+
+    return labels
+
+  def _lookback_repeats(self, event_sequences):
+    """Returns whether each event repeats the event each lookback ago.
+
+    Events are compared directly, as in `events_to_input` and
+    `events_to_label`, rather than by one-hot index: the one-hot encoding need
+    not be injective (e.g. `MultiDrumOneHotEncoding` maps several pitches to
+    the same drum type), so distinct events may share an index.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      A list with, for each lookback distance, a bool numpy array of shape
+      [len(event_sequences), len(event_sequences[0])] that is True where the
+      event equals the event that many steps earlier.
+    """
+    event_sequences = [list(events) for events in event_sequences]
+    num_steps = _common_length(event_sequences)
+    repeats = []
+    for lookback_distance in self._lookback_distances:
+      repeating = np.zeros([len(event_sequences), num_steps], dtype=bool)
+      for i, events in enumerate(event_sequences):
+        repeating[i, lookback_distance:] = [
+            event == lookback_event for event, lookback_event in zip(
+                events[lookback_distance:], events)]
+      repeats.append(repeating)
+    return repeats
+
+  def _encode_event_sequences(self, event_sequences):
+    """Returns an int64 numpy array of one-hot indices for each event.
+
+    Args:
+      event_sequences: A list of list-like event sequences, all the same
+          length.
+
+    Returns:
+      An int64 numpy array of shape
+      [len(event_sequences), len(event_sequences[0])].
+
+    Raises:
+      ValueError: If the event sequences are not all the same length.
+    """
+    num_steps = _common_length(event_sequences)
+    indices = np.zeros([len(event_sequences), num_steps], dtype=np.int64)
+    for i, events in enumerate(event_sequences):
+      indices[i] = [self._one_hot_encoding.encode_event(event)
+                    for event in events]
+    return indices
+
   def class_index_to_event(self, class_index, events):
     """Returns the event for the given class index.
 
@@ -666,13 +952,15 @@ class ConditionalEventSequenceEncoderDecoder(object):
     return self._target_encoder_decoder.class_index_to_event(
         class_index, target_events)
 
-  def encode(self, control_events, target_events):
+  def encode(self, control_events, target_events, sparse_inputs=False):
     """Returns a SequenceExample for the given event sequence pair.
 
     Args:
       control_events: A list-like sequence of control events.
       target_events: A list-like sequence of target events, the same length as
           `control_events`.
+      sparse_inputs: If True, the input vectors are stored sparsely. See
+          `sequence_example_lib.make_sequence_example`.
 
     Returns:
       A tf.train.SequenceExample containing inputs and labels.
@@ -686,12 +974,33 @@ class ConditionalEventSequenceEncoderDecoder(object):
                        '(%d control events but %d target events)' % (
                            len(control_events), len(target_events)))
 
-    inputs = []
-    labels = []
-    for i in range(len(target_events) - 1):
-      inputs.append(self.events_to_input(control_events, target_events, i))
-      labels.append(self.events_to_label(target_events, i + 1))
-    return sequence_example_lib.make_sequence_example(inputs, labels)
+    inputs = self._events_to_input_array(
+        control_events, target_events, len(target_events) - 1)
+    labels = self._target_encoder_decoder.events_to_label_array(
+        target_events)[1:]
+    return sequence_example_lib.make_sequence_example(
+        inputs.tolist(), labels.tolist(), sparse_inputs=sparse_inputs)
+
+  def _events_to_input_array(self, control_events, target_events, num_steps):
+    """Returns the input vectors for the first positions of a sequence pair.
+
+    Args:
+      control_events: A list-like sequence of control events, longer than
+          `num_steps`.
+      target_events: A list-like sequence of target events, at least
+          `num_steps` long.
+      num_steps: The number of positions to compute input vectors for.
+
+    Returns:
+      A float32 numpy array of shape [num_steps, self.input_size], where row
+      `i` is the input vector for position `i`.
+    """
+    control_inputs = self._control_encoder_decoder.events_to_input_array(
+        control_events)
+    target_inputs = self._target_encoder_decoder.events_to_input_array(
+        target_events)
+    return np.concatenate(
+        [control_inputs[1:num_steps + 1], target_inputs[:num_steps]], axis=1)
 
   def get_inputs_batch(self, control_events, target_event_sequences,
                        full_length=False):
@@ -725,29 +1034,31 @@ class ConditionalEventSequenceEncoderDecoder(object):
         raise ValueError('control event sequence must be longer than target '
                          'event sequence (%d control events but %d target '
                          'events)' % (len(control_events), len(target_events)))
-      inputs = []
       if full_length:
-        for i in range(len(target_events)):
-          inputs.append(self.events_to_input(control_events, target_events, i))
+        inputs = self._events_to_input_array(
+            control_events, target_events, len(target_events)).tolist()
       else:
-        inputs.append(self.events_to_input(
-            control_events, target_events, len(target_events) - 1))
+        inputs = [self.events_to_input(
+            control_events, target_events, len(target_events) - 1)]
       inputs_batch.append(inputs)
     return inputs_batch
 
-  def extend_event_sequences(self, target_event_sequences, softmax):
+  def extend_event_sequences(self, target_event_sequences, softmax,
+                             random_state=None):
     """Extends the event sequences by sampling the softmax probabilities.
 
     Args:
       target_event_sequences: A list of target EventSequence objects.
       softmax: A list of softmax probability vectors. The list of softmaxes
           should be the same length as the list of event sequences.
+      random_state: An optional np.random.RandomState used for sampling. If
+          None, the global numpy random state is used.
 
     Returns:
       A Python list of chosen class indices, one for each target event sequence.
     """
     return self._target_encoder_decoder.extend_event_sequences(
-        target_event_sequences, softmax)
+        target_event_sequences, softmax, random_state=random_state)
 
   def evaluate_log_likelihood(self, target_event_sequences, softmax):
     """Evaluate the log likelihood of multiple target event sequences.
@@ -832,20 +1143,25 @@ class MultipleEventSequenceEncoder(EventSequenceEncoderDecoder):
 class EncoderPipeline(pipeline.Pipeline):
   """A pipeline that converts an EventSequence to a model encoding."""
 
-  def __init__(self, input_type, encoder_decoder, name=None):
+  def __init__(self, input_type, encoder_decoder, name=None,
+               sparse_inputs=False):
     """Constructs an EncoderPipeline.
 
     Args:
       input_type: The type this pipeline expects as input.
       encoder_decoder: An EventSequenceEncoderDecoder.
       name: A unique pipeline name.
+      sparse_inputs: If True, the input vectors are stored sparsely. See
+          `sequence_example_lib.make_sequence_example`.
     """
     super(EncoderPipeline, self).__init__(
         input_type=input_type,
         output_type=tf.train.SequenceExample,
         name=name)
     self._encoder_decoder = encoder_decoder
+    self._sparse_inputs = sparse_inputs
 
   def transform(self, seq):
-    encoded = self._encoder_decoder.encode(seq)
+    encoded = self._encoder_decoder.encode(
+        seq, sparse_inputs=self._sparse_inputs)
     return [encoded]
@@ -68,6 +68,24 @@ class OneHotEventSequenceEncoderDecoderTest(tf.test.TestCase):
         expected_inputs, expected_labels)
     self.assertEqual(sequence_example, expected_sequence_example)
 
+  def testEncodeSparseInputs(self):
+    events = [0, 1, 0, 2, 0]
+    sequence_example = self.enc.encode(events, sparse_inputs=True)
+    feature_list = sequence_example.feature_lists.feature_list
+    self.assertFalse('inputs' in feature_list)
+    self.assertEqual(
+        [[0], [1], [0], [2]],
+        [list(feature.int64_list.value)
+         for feature in feature_list['input_indices'].feature])
+    self.assertEqual(
+        [[], [], [], []],
+        [list(feature.int64_list.value)
+         for feature in feature_list['input_value_indices'].feature])
+    self.assertEqual(
+        [1, 0, 2, 0],
+        [feature.int64_list.value[0]
+         for feature in feature_list['labels'].feature])
+
   def testGetInputsBatch(self):
     event_sequences = [[0, 1, 0, 2, 0], [0, 1, 2]]
     expected_inputs_1 = [[1.0, 0.0, 0.0],
@@ -99,6 +117,19 @@ class OneHotEventSequenceEncoderDecoderTest(tf.test.TestCase):
     self.assertListEqual(list(events2), [0, 0])
     self.assertListEqual(list(events3), [0, 1])
 
+  def testExtendEventSequencesWithRandomState(self):
+    softmax = [[[0.0, 0.5, 0.5]], [[0.3, 0.0, 0.7]], [[0.2, 0.3, 0.5]]] * 10
+    event_sequences_1 = [[0] for _ in range(len(softmax))]
+    event_sequences_2 = [[0] for _ in range(len(softmax))]
+    chosen_classes_1 = self.enc.extend_event_sequences(
+        event_sequences_1, softmax, np.random.RandomState(7))
+    chosen_classes_2 = self.enc.extend_event_sequences(
+        event_sequences_2, softmax, np.random.RandomState(7))
+    self.assertListEqual(chosen_classes_1, chosen_classes_2)
+    self.assertListEqual(event_sequences_1, event_sequences_2)
+    for chosen_class, probs in zip(chosen_classes_1, softmax):
+      self.assertGreater(probs[-1][chosen_class], 0.0)
+
   def testEvaluateLogLikelihood(self):
     events1 = [0, 1, 0]
     events2 = [1, 2, 2]
@@ -140,6 +171,47 @@ class LookbackEventSequenceEncoderDecoderTest(tf.test.TestCase):
                       1.0, -1.0, 0.0, 1.0],
                      self.enc.events_to_input(events, 4))
 
+  def testEventsToInputArray(self):
+    events = [0, 1, 0, 2, 0, 0, 1, 1, 2]
+    inputs = self.enc.events_to_input_array(events)
+    self.assertEqual((9, 13), inputs.shape)
+    self.assertEqual(np.float32, inputs.dtype)
+    for i in range(len(events)):
+      self.assertEqual(self.enc.events_to_input(events, i), inputs[i].tolist())
+
+  def testEventsToLabelArray(self):
+    events = [0, 1, 0, 2, 0, 0, 1, 1, 2]
+    self.assertEqual(
+        [self.enc.events_to_label(events, i) for i in range(len(events))],
+        self.enc.events_to_label_array(events).tolist())
+
+  def testEventSequencesToInputArray(self):
+    event_sequences = [[0, 1, 0, 2, 0], [2, 2, 1, 0, 0]]
+    inputs = self.enc.event_sequences_to_input_array(event_sequences)
+    self.assertEqual((2, 5, 13), inputs.shape)
+    for i, events in enumerate(event_sequences):
+      self.assertEqual(self.enc.events_to_input_array(events).tolist(),
+                       inputs[i].tolist())
+    with self.assertRaises(ValueError):
+      self.enc.event_sequences_to_input_array([[0, 1], [0]])
+
+  def testEncodeSparseInputs(self):
+    events = [0, 1, 0, 2, 0]
+    sequence_example = self.enc.encode(events, sparse_inputs=True)
+    feature_list = sequence_example.feature_lists.feature_list
+    self.assertEqual(
+        [[0, 3, 6, 9], [1, 4, 6, 10], [0, 3, 7, 9, 10, 12], [2, 5, 6]],
+        [list(feature.int64_list.value)
+         for feature in feature_list['input_indices'].feature])
+    self.assertEqual(
+        [[10], [9], [], [9, 10]],
+        [list(feature.int64_list.value)
+         for feature in feature_list['input_value_indices'].feature])
+    self.assertEqual(
+        [[-1.0], [-1.0], [], [-1.0, -1.0]],
+        [list(feature.float_list.value)
+         for feature in feature_list['input_values'].feature])
+
   def testEventsToLabel(self):
     events = [0, 1, 0, 2, 0]
     self.assertEqual(4, self.enc.events_to_label(events, 0))
@@ -20,6 +20,7 @@ interface.
 
 import abc
 import copy
+import itertools
 
 # internal imports
 from magenta.music import constants
@@ -34,6 +35,144 @@ class NonIntegerStepsPerBarException(Exception):
   pass
 
 
+class SharedPrefixList(object):
+  """A list of events that shares its prefix with the lists branched from it.
+
+  A SharedPrefixList holds a pointer to a frozen parent node, plus a suffix
+  buffer of the events added since it was last branched. Each node is a
+  `(parent, offset, buffer)` tuple. Branching freezes the current suffix into a
+  new parent node shared by both lists, which takes constant time regardless of
+  length. Appending and removing events at the end only touch the suffix. Any
+  other change to the shared prefix first copies all events into the suffix.
+
+  Buffers may be lists or `array.array` objects. All buffers have the type of
+  the one the list was created from, and slicing returns that type. Events are
+  shared between branches, not copied, so they should not be modified in
+  place.
+  """
+
+  def __init__(self, events):
+    """Construct a SharedPrefixList.
+
+    Args:
+      events: A list or array of events. It is used as the initial suffix
+          buffer, not copied.
+    """
+    self._parent = None
+    self._offset = 0
+    self._suffix = events
+
+  def branch(self):
+    """Returns a new list with the same events, sharing them with this one."""
+    if self._suffix:
+      self._parent = (self._parent, self._offset, self._suffix)
+      self._offset += len(self._suffix)
+      self._suffix = self._suffix[:0]
+    branch = SharedPrefixList(self._suffix[:0])
+    branch._parent = self._parent  # pylint: disable=protected-access
+    branch._offset = self._offset  # pylint: disable=protected-access
+    return branch
+
+  def _buffers(self):
+    """Returns all buffers holding events in this list, in order."""
+    buffers = [self._suffix]
+    node = self._parent
+    while node is not None:
+      buffers.append(node[2])
+      node = node[0]
+    buffers.reverse()
+    return buffers
+
+  def _flat(self):
+    """Returns a new buffer containing all events in this list."""
+    flat = self._suffix[:0]
+    for buffer in self._buffers():
+      flat.extend(buffer)
+    return flat
+
+  def _flatten(self):
+    """Copies all events into the suffix so that nothing is shared."""
+    if self._parent is not None:
+      self._suffix = self._flat()
+      self._parent = None
+      self._offset = 0
+
+  def _truncate(self, num_events):
+    """Removes all events after the first `num_events`."""
+    if num_events >= self._offset:
+      del self._suffix[num_events - self._offset:]
+      return
+    node = self._parent
+    while num_events < node[1]:
+      node = node[0]
+    self._parent, self._offset = node[0], node[1]
+    self._suffix = node[2][:num_events - node[1]]
+
+  def __len__(self):
+    return self._offset + len(self._suffix)
+
+  def __iter__(self):
+    return itertools.chain.from_iterable(self._buffers())
+
+  def __getitem__(self, i):
+    if isinstance(i, slice):
+      start, stop, step = i.indices(len(self))
+      if step == 1 and start >= self._offset:
+        stop = max(start, stop)
+        return self._suffix[start - self._offset:stop - self._offset]
+      return self._flat()[i]
+    if i < 0:
+      i += len(self)
+    if i >= self._offset:
+      return self._suffix[i - self._offset]
+    if i < 0:
+      raise IndexError('list index out of range')
+    node = self._parent
+    while i < node[1]:
+      node = node[0]
+    return node[2][i - node[1]]
+
+  def __setitem__(self, i, value):
+    if not isinstance(i, slice):
+      index = i + len(self) if i < 0 else i
+      if index >= self._offset:
+        self._suffix[index - self._offset] = value
+        return
+    self._flatten()
+    self._suffix[i] = value
+
+  def __delitem__(self, i):
+    if isinstance(i, slice):
+      if i.stop is None and i.step is None:
+        self._truncate(i.indices(len(self))[0])
+        return
+    elif len(self) and i in (-1, len(self) - 1):
+      self._truncate(len(self) - 1)
+      return
+    self._flatten()
+    del self._suffix[i]
+
+  def __deepcopy__(self, memo=None):
+    return copy.deepcopy(self._flat(), memo)
+
+  def __repr__(self):
+    return 'SharedPrefixList(%r)' % self._flat()
+
+  def append(self, event):
+    self._suffix.append(event)
+
+  def extend(self, events):
+    self._suffix.extend(events)
+
+  def pop(self):
+    event = self[-1]
+    self._truncate(len(self) - 1)
+    return event
+
+  def count(self, event):
+    return sum(buffer.count(event) for buffer in self._buffers())
+
+
 class EventSequence(object):
   """Stores a quantized stream of events.
 
@@ -105,6 +244,40 @@ class EventSequence(object):
     """
     pass
 
+  def branch(self):
+    """Returns a copy of this sequence that can be extended independently.
+
+    Used to branch event sequences during beam search. The default makes a
+    deep copy; subclasses can override this to share their events with the
+    copy in constant time (see `_branch_event_storage`).
+
+    Returns:
+      A new event sequence of the same type with the same events.
+    """
+    return copy.deepcopy(self)
+
+  def _branch_event_storage(self, *names):
+    """Returns a branch of this sequence that shares its event storage.
+
+    Converts each named attribute, which must hold a list or array of events,
+    to a SharedPrefixList, then returns a shallow copy of this sequence whose
+    attributes are new branches of those lists.
+
+    Args:
+      *names: The names of the attributes that store events.
+
+    Returns:
+      A new event sequence of the same type with the same events.
+    """
+    branch = copy.copy(self)
+    for name in names:
+      events = getattr(self, name)
+      if not isinstance(events, SharedPrefixList):
+        events = SharedPrefixList(events)
+        setattr(self, name, events)
+      setattr(branch, name, events.branch())
+    return branch
+
 
 class SimpleEventSequence(EventSequence):
   """Stores a quantized stream of events.
@@ -208,6 +381,9 @@ class SimpleEventSequence(EventSequence):
                       steps_per_bar=self.steps_per_bar,
                       steps_per_quarter=self.steps_per_quarter)
 
+  def branch(self):
+    return self._branch_event_storage('_events')
+
   def __eq__(self, other):
     if type(self) is not type(other):
       return False
@@ -33,6 +33,49 @@ class EventsLibTest(tf.test.TestCase):
     events.set_length(2)
     self.assertNotEqual(events, events_copy)
 
+  def testBranch(self):
+    events = events_lib.SimpleEventSequence(
+        pad_event=0, events=[0, 1, 2], start_step=0, steps_per_quarter=4,
+        steps_per_bar=8)
+    events_branch = events.branch()
+    self.assertEqual(events, events_branch)
+
+    events.append(3)
+    events_branch.set_length(2)
+    self.assertListEqual([0, 1, 2, 3], list(events))
+    self.assertListEqual([0, 1], list(events_branch))
+    self.assertEqual(4, events.end_step)
+    self.assertEqual(2, events_branch.end_step)
+    self.assertEqual(events, copy.deepcopy(events))
+
+  def testSharedPrefixList(self):
+    events = events_lib.SharedPrefixList([0, 1, 2])
+    events_branch = events.branch()
+    events.append(3)
+    events_branch.append(4)
+    events_branch_branch = events_branch.branch()
+    events_branch_branch.append(5)
+    self.assertListEqual([0, 1, 2, 3], list(events))
+    self.assertListEqual([0, 1, 2, 4], list(events_branch))
+    self.assertListEqual([0, 1, 2, 4, 5], list(events_branch_branch))
+    self.assertEqual(5, len(events_branch_branch))
+    self.assertEqual(4, events_branch_branch[3])
+    self.assertEqual(1, events_branch_branch[-4])
+    self.assertListEqual([2, 4], events_branch_branch[2:4])
+    with self.assertRaises(IndexError):
+      _ = events_branch_branch[5]
+
+    del events_branch_branch[1:]
+    events_branch_branch.append(6)
+    events_branch[0] = 7
+    self.assertListEqual([0, 6], list(events_branch_branch))
+    self.assertListEqual([7, 1, 2, 4], list(events_branch))
+    self.assertListEqual([0, 1, 2, 3], list(events))
+
+    self.assertEqual(3, events.pop())
+    self.assertEqual(1, events.count(2))
+    self.assertListEqual([0, 1, 2], copy.deepcopy(events))
+
   def testAppendEvent(self):
     events = events_lib.SimpleEventSequence(pad_event=0)
 
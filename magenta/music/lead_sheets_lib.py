@@ -124,6 +124,9 @@ class LeadSheet(events_lib.EventSequence):
     return LeadSheet(copy.deepcopy(self._melody, memo),
                      copy.deepcopy(self._chords, memo))
 
+  def branch(self):
+    return LeadSheet(self._melody.branch(), self._chords.branch())
+
   def __eq__(self, other):
     if not isinstance(other, LeadSheet):
       return False
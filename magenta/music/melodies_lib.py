@@ -20,6 +20,8 @@ Use Melody.to_sequence to write a melody to a NoteSequence proto. Then use
 midi_io.sequence_proto_to_midi_file to write that NoteSequence to a midi file.
 """
 
+import itertools
+
 # internal imports
 import numpy as np
 from six.moves import range  # pylint: disable=redefined-builtin
@@ -231,7 +233,8 @@ class Melody(events_lib.SimpleEventSequence):
                               gap_bars=1,
                               ignore_polyphonic_notes=False,
                               pad_end=False,
-                              filter_drums=True):
+                              filter_drums=True,
+                              note_index=None):
     """Populate self with a melody from the given quantized NoteSequence.
 
     A monophonic melody is extracted from the given `instrument` starting at
@@ -265,6 +268,9 @@ class Melody(events_lib.SimpleEventSequence):
       pad_end: If True, the end of the melody will be padded with NO_EVENTs so
           that it will end at a bar boundary.
       filter_drums: If True, notes for which `is_drum` is True will be ignored.
+      note_index: An optional sequences_lib.QuantizedNoteIndex of
+          `quantized_sequence`, to avoid re-indexing the notes when extracting
+          multiple melodies from the same sequence.
 
     Raises:
       NonIntegerStepsPerBarException: If `quantized_sequence`'s bar length
@@ -287,20 +293,21 @@ class Melody(events_lib.SimpleEventSequence):
     self._steps_per_quarter = (
         quantized_sequence.quantization_info.steps_per_quarter)
 
-    # Sort track by note start times, and secondarily by pitch descending.
-    notes = sorted([n for n in quantized_sequence.notes
-                    if n.instrument == instrument and
-                    n.quantized_start_step >= search_start_step],
-                   key=lambda note: (note.quantized_start_step, -note.pitch))
+    # Get track notes sorted by start times, and secondarily by pitch
+    # descending.
+    if note_index is None:
+      note_index = sequences_lib.QuantizedNoteIndex(quantized_sequence)
+    notes = note_index.notes(instrument, search_start_step)
 
-    if not notes:
+    first_note = next(notes, None)
+    if first_note is None:
       return
 
     # The first step in the melody, beginning at the first step of a bar.
     melody_start_step = (
-        notes[0].quantized_start_step -
-        (notes[0].quantized_start_step - search_start_step) % steps_per_bar)
-    for note in notes:
+        first_note.quantized_start_step -
+        (first_note.quantized_start_step - search_start_step) % steps_per_bar)
+    for note in itertools.chain([first_note], notes):
       if filter_drums and note.is_drum:
         continue
 
@@ -528,7 +535,8 @@ def extract_melodies(quantized_sequence,
                      min_unique_pitches=5,
                      ignore_polyphonic_notes=True,
                      pad_end=False,
-                     filter_drums=True):
+                     filter_drums=True,
+                     note_index=None):
   """Extracts a list of melodies from the given quantized NoteSequence.
 
   This function will search through `quantized_sequence` for monophonic
@@ -570,6 +578,8 @@ def extract_melodies(quantized_sequence,
     pad_end: If True, the end of the melody will be padded with NO_EVENTs so
         that it will end at a bar boundary.
     filter_drums: If True, notes for which `is_drum` is True will be ignored.
+    note_index: An optional sequences_lib.QuantizedNoteIndex of
+        `quantized_sequence`. If None, one is built.
 
   Returns:
     melodies: A python list of Melody instances.
@@ -599,7 +609,9 @@ def extract_melodies(quantized_sequence,
       'melody_lengths_in_bars',
       [0, 1, 10, 20, 30, 40, 50, 100, 200, 500, min_bars // 2, min_bars,
        min_bars + 1, min_bars - 1])
-  instruments = set([n.instrument for n in quantized_sequence.notes])
+  if note_index is None:
+    note_index = sequences_lib.QuantizedNoteIndex(quantized_sequence)
+  instruments = note_index.instruments
   steps_per_bar = int(
       sequences_lib.steps_per_bar_in_quantized_sequence(quantized_sequence))
   for instrument in instruments:
@@ -616,7 +628,8 @@ def extract_melodies(quantized_sequence,
             gap_bars=gap_bars,
             ignore_polyphonic_notes=ignore_polyphonic_notes,
             pad_end=pad_end,
-            filter_drums=filter_drums)
+            filter_drums=filter_drums,
+            note_index=note_index)
       except PolyphonicMelodyException:
         stats['polyphonic_tracks_discarded'].increment()
         break  # Look for monophonic melodies in other tracks.
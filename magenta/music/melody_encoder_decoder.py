@@ -23,11 +23,13 @@ use by melody models.
 """
 
 import collections
+import weakref
 
 # internal imports
+import numpy as np
+
 from magenta.music import constants
 from magenta.music import encoder_decoder
-from magenta.music import melodies_lib
 
 NUM_SPECIAL_MELODY_EVENTS = constants.NUM_SPECIAL_MELODY_EVENTS
 MELODY_NOTE_OFF = constants.MELODY_NOTE_OFF
@@ -39,6 +41,8 @@ DEFAULT_STEPS_PER_BAR = constants.DEFAULT_STEPS_PER_BAR
 
 DEFAULT_LOOKBACK_DISTANCES = encoder_decoder.DEFAULT_LOOKBACK_DISTANCES
 
+NOTE_KEYS = constants.NOTE_KEYS
+
 
 class MelodyOneHotEncoding(encoder_decoder.OneHotEncoding):
   """Basic one hot encoding for melody events.
@@ -127,6 +131,50 @@ class MelodyOneHotEncoding(encoder_decoder.OneHotEncoding):
     return index - NUM_SPECIAL_MELODY_EVENTS + self._min_note
 
 
+class _KeyMelodyInputState(object):
+  """The running state of a melody used by KeyMelodyEncoderDecoder inputs.
+
+  Attributes:
+    current_note: The pitch of the note currently playing, or None.
+    is_attack: Whether the last event started the current note.
+    is_ascending: Whether the melody last moved up (True) or down (False), or
+        None if it has not moved yet.
+    last_3_notes: A deque of the last 3 distinct pitches played, oldest first.
+    key_histogram: A list of 12 ints, the number of notes so far that fit into
+        each major key.
+    last_event: The last event added, or None.
+  """
+
+  def __init__(self):
+    self.current_note = None
+    self.is_attack = False
+    self.is_ascending = None
+    self.last_3_notes = collections.deque(maxlen=3)
+    self.key_histogram = [0] * NOTES_PER_OCTAVE
+    self.last_event = None
+
+  def update(self, note):
+    """Advances the state by one melody event."""
+    self.last_event = note
+    if note == MELODY_NO_EVENT:
+      self.is_attack = False
+    elif note == MELODY_NOTE_OFF:
+      self.current_note = None
+    else:
+      self.is_attack = True
+      self.current_note = note
+      if self.last_3_notes:
+        if note > self.last_3_notes[-1]:
+          self.is_ascending = True
+        if note < self.last_3_notes[-1]:
+          self.is_ascending = False
+      if note in self.last_3_notes:
+        self.last_3_notes.remove(note)
+      self.last_3_notes.append(note)
+      for key in NOTE_KEYS[note % NOTES_PER_OCTAVE]:
+        self.key_histogram[key] += 1
+
+
 class KeyMelodyEncoderDecoder(encoder_decoder.EventSequenceEncoderDecoder):
   """A MelodyEncoderDecoder that encodes repeated events, time, and key."""
 
@@ -150,6 +198,10 @@ class KeyMelodyEncoderDecoder(encoder_decoder.EventSequenceEncoderDecoder):
     self._binary_counter_bits = binary_counter_bits
     self._min_note = min_note
     self._note_range = max_note - min_note
+    # A dictionary mapping the id of each melody passed to `events_to_input` to
+    # a (weak reference, position, _KeyMelodyInputState) tuple for the last
+    # position encoded.
+    self._input_states = {}
 
   @property
   def input_size(self):
@@ -192,39 +244,103 @@ class KeyMelodyEncoderDecoder(encoder_decoder.EventSequenceEncoderDecoder):
     49: The next event is the start of a bar.
     [50, 61]: The keys the current melody is in.
     [62, 73]: The keys the last 3 notes are in.
+
+    Successive calls for increasing positions in the same melody, as made
+    during generation, continue from the state reached by the previous call
+    rather than replaying the melody from the start.
+
     Args:
       events: A magenta.music.Melody object.
       position: An integer event position in the melody.
     Returns:
       An input vector, an self.input_size length list of floats.
     """
-    current_note = None
-    is_attack = False
-    is_ascending = None
-    last_3_notes = collections.deque(maxlen=3)
-    sub_melody = melodies_lib.Melody(events[:position + 1])
-    for note in sub_melody:
-      if note == MELODY_NO_EVENT:
-        is_attack = False
-      elif note == MELODY_NOTE_OFF:
-        current_note = None
-      else:
-        is_attack = True
-        current_note = note
-        if last_3_notes:
-          if note > last_3_notes[-1]:
-            is_ascending = True
-          if note < last_3_notes[-1]:
-            is_ascending = False
-        if note in last_3_notes:
-          last_3_notes.remove(note)
-        last_3_notes.append(note)
+    state = self._get_input_state(events, position)
+    return self._state_to_input(state, events, position)
+
+  def _get_input_state(self, events, position):
+    """Returns the melody state after the event at the given position.
+
+    The state reached for each live melody is cached. If the cached state for
+    `events` is at or before `position`, only the events after it are replayed.
+    Melodies are assumed to only be extended between calls; a melody whose
+    cached position is now past its end or holds a different event is replayed
+    from the start.
+
+    Args:
+      events: A magenta.music.Melody object.
+      position: An integer event position in the melody.
+
+    Returns:
+      A _KeyMelodyInputState for the melody up to and including `position`.
+    """
+    key = id(events)
+    cached = self._input_states.get(key)
+    if (cached is not None and cached[0]() is events and
+        cached[1] <= position and
+        events[cached[1]] == cached[2].last_event):
+      _, start, state = cached
+      start += 1
+    else:
+      start = 0
+      state = _KeyMelodyInputState()
+
+    for i in range(start, position + 1):
+      state.update(events[i])
+
+    try:
+      ref = weakref.ref(events, lambda _: self._input_states.pop(key, None))
+    except TypeError:
+      # Plain lists cannot be weakly referenced, so their states are not kept.
+      return state
+    self._input_states[key] = (ref, position, state)
+    return state
+
+  def event_sequences_to_input_array(self, event_sequences):
+    """Returns the input vectors for every position in each melody.
+
+    Computes the same input vectors as `events_to_input`, but carries the
+    melody state forward in a single pass over each melody.
+
+    Args:
+      event_sequences: A list of magenta.music.Melody objects, all the same
+          length.
+
+    Returns:
+      A float32 numpy array of shape
+      [len(event_sequences), len(event_sequences[0]), self.input_size].
+
+    Raises:
+      ValueError: If the melodies are not all the same length.
+    """
+    # pylint: disable=protected-access
+    num_steps = encoder_decoder._common_length(event_sequences)
+    # pylint: enable=protected-access
+    inputs = np.zeros([len(event_sequences), num_steps, self.input_size],
+                      dtype=np.float32)
+    for i, events in enumerate(event_sequences):
+      state = _KeyMelodyInputState()
+      for j in range(num_steps):
+        state.update(events[j])
+        inputs[i, j] = self._state_to_input(state, events, j)
+    return inputs
+
+  def _state_to_input(self, state, events, position):
+    """Returns the input vector for a position given the melody state there.
+
+    Args:
+      state: The _KeyMelodyInputState after the event at `position`.
+      events: A magenta.music.Melody object.
+      position: An integer event position in the melody.
 
+    Returns:
+      An input vector, an self.input_size length list of floats.
+    """
     input_ = [0.0] * self.input_size
     offset = 0
-    if current_note:
+    if state.current_note:
       # The pitch of current note if a note is playing.
-      input_[offset + current_note - self._min_note] = 1.0
+      input_[offset + state.current_note - self._min_note] = 1.0
       # A note is playing.
       input_[offset + self._note_range] = 1.0
     else:
@@ -233,13 +349,13 @@ class KeyMelodyEncoderDecoder(encoder_decoder.EventSequenceEncoderDecoder):
     offset += self._note_range + 2
 
     # The current event is the note-on event of the currently playing note.
-    if is_attack:
+    if state.is_attack:
       input_[offset] = 1.0
     offset += 1
 
     # Whether the melody is currently ascending or descending.
-    if is_ascending is not None:
-      input_[offset] = 1.0 if is_ascending else -1.0
+    if state.is_ascending is not None:
+      input_[offset] = 1.0 if state.is_ascending else -1.0
     offset += 1
 
     # Last event is repeating N bars ago.
@@ -251,27 +367,28 @@ class KeyMelodyEncoderDecoder(encoder_decoder.EventSequenceEncoderDecoder):
       offset += 1
 
     # Binary time counter giving the metric location of the *next* note.
-    n = len(sub_melody)
+    n = position + 1
     for i in range(self._binary_counter_bits):
-      input_[offset] = 1.0 if (n / 2 ** i) % 2 else -1.0
+      input_[offset] = 1.0 if (n // 2 ** i) % 2 else -1.0
       offset += 1
 
     # The next event is the start of a bar.
-    if len(sub_melody) % DEFAULT_STEPS_PER_BAR == 0:
+    if n % DEFAULT_STEPS_PER_BAR == 0:
       input_[offset] = 1.0
     offset += 1
 
     # The keys the current melody is in.
-    key_histogram = sub_melody.get_major_key_histogram()
-    max_val = max(key_histogram)
-    for i, key_val in enumerate(key_histogram):
+    max_val = max(state.key_histogram)
+    for i, key_val in enumerate(state.key_histogram):
       if key_val == max_val:
         input_[offset] = 1.0
       offset += 1
 
     # The keys the last 3 notes are in.
-    last_3_note_melody = melodies_lib.Melody(list(last_3_notes))
-    key_histogram = last_3_note_melody.get_major_key_histogram()
+    key_histogram = [0] * NOTES_PER_OCTAVE
+    for note in state.last_3_notes:
+      for key in NOTE_KEYS[note % NOTES_PER_OCTAVE]:
+        key_histogram[key] += 1
     max_val = max(key_histogram)
     for i, key_val in enumerate(key_histogram):
       if key_val == max_val:
@@ -643,6 +643,29 @@ class KeyMelodyEncoderDecoderTest(tf.test.TestCase):
         [expected_inputs[-1:], expected_inputs[-1:]],
         med.get_inputs_batch(melodies))
 
+  def testEventsToInputIncremental(self):
+    med = melody_encoder_decoder.KeyMelodyEncoderDecoder(48, 84)
+    melody_events = ([48, NO_EVENT, 49, 83, NOTE_OFF] + [NO_EVENT] * 11 +
+                     [48, NOTE_OFF] + [NO_EVENT] * 14 +
+                     [48, NOTE_OFF, 49, 82])
+    expected_inputs = med.events_to_input_array(
+        melodies_lib.Melody(melody_events)).tolist()
+
+    # Extend a melody one event at a time, as during generation.
+    melody = melodies_lib.Melody()
+    for i, event in enumerate(melody_events):
+      melody.append(event)
+      self.assertListEqual(expected_inputs[i],
+                           med.events_to_input(melody, i))
+
+    # Encoding an earlier position or a shortened melody starts over.
+    self.assertListEqual(expected_inputs[16], med.events_to_input(melody, 16))
+    melody.set_length(3)
+    melody.append(60)
+    expected_inputs = med.events_to_input_array(
+        melodies_lib.Melody(melody_events[:3] + [60])).tolist()
+    self.assertListEqual(expected_inputs[3], med.events_to_input(melody, 3))
+
 
 if __name__ == '__main__':
   tf.test.main()
@@ -86,6 +86,19 @@ class BaseModel(object):
       saver.save(self._session, checkpoint_filename, meta_graph_suffix='meta',
                  write_meta_graph=True)
 
+  def start_generation_session(self):
+    """Starts a session in which generation may reuse work across calls.
+
+    Meant for interactive use, where the primer of each generation call
+    usually extends the primer of the previous one. Models that can reuse work
+    in this case override this method; by default it does nothing.
+    """
+    pass
+
+  def end_generation_session(self):
+    """Ends the session started by `start_generation_session`."""
+    pass
+
   def close(self):
     """Closes the TF session."""
     self._session.close()
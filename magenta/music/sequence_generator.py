@@ -108,6 +108,27 @@ class BaseSequenceGenerator(object):
     """
     pass
 
+  def _generate_batch(self, input_sequence, generator_options, num_outputs):
+    """Implementation for generating multiple sequences from the same options.
+
+    The default implementation calls `_generate` once per output. Subclasses
+    whose models can generate several sequences in a single batched pass should
+    override this method.
+
+    The implementation can assume that _initialize has been called before this
+    method is called.
+
+    Args:
+      input_sequence: An input NoteSequence to base the generation on.
+      generator_options: A GeneratorOptions proto with options to use for
+          generation.
+      num_outputs: The integer number of sequences to generate.
+    Returns:
+      A list of `num_outputs` generated NoteSequence protos.
+    """
+    return [self._generate(input_sequence, generator_options)
+            for _ in range(num_outputs)]
+
   def initialize(self):
     """Builds the TF graph and loads the checkpoint.
 
@@ -170,6 +191,20 @@ class BaseSequenceGenerator(object):
       self._model.close()
       self._initialized = False
 
+  def start_generation_session(self):
+    """Lets the model reuse work between `generate` calls.
+
+    Meant for interactive use, where the input of each `generate` call usually
+    extends the input of the previous one. For example, an RNN model can avoid
+    re-priming on input it has already seen. Generated sequences are not
+    affected.
+    """
+    self._model.start_generation_session()
+
+  def end_generation_session(self):
+    """Ends the session started by `start_generation_session`."""
+    self._model.end_generation_session()
+
   def __enter__(self):
     """When used as a context manager, initializes the TF session."""
     self.initialize()
@@ -195,6 +230,23 @@ class BaseSequenceGenerator(object):
     self.initialize()
     return self._generate(input_sequence, generator_options)
 
+  def generate_batch(self, input_sequence, generator_options, num_outputs):
+    """Generates multiple independent sequences based on sequence and options.
+
+    Also initializes the TF graph if not yet initialized.
+
+    Args:
+      input_sequence: An input NoteSequence to base the generation on.
+      generator_options: A GeneratorOptions proto with options to use for
+          generation.
+      num_outputs: The integer number of sequences to generate.
+
+    Returns:
+      A list of `num_outputs` generated NoteSequence protos.
+    """
+    self.initialize()
+    return self._generate_batch(input_sequence, generator_options, num_outputs)
+
   def create_bundle_file(self, bundle_file, bundle_description=None):
     """Writes a generator_pb2.GeneratorBundle file in the specified location.
 
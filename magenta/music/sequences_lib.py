@@ -13,6 +13,7 @@
 # limitations under the License.
 """Defines sequence of notes objects for creating datasets."""
 
+import bisect
 import collections
 import copy
 import itertools
@@ -40,6 +41,10 @@ QUANTIZE_CUTOFF = 0.5
 # Shortcut to chord symbol text annotation type.
 CHORD_SYMBOL = music_pb2.NoteSequence.TextAnnotation.CHORD_SYMBOL
 
+# The number of segments of simultaneous notes for which chord inference counts
+# the active pitches at once, bounding its memory use for long sequences.
+_CHORD_INFERENCE_SEGMENTS_PER_CHUNK = 4096
+
 
 class BadTimeSignatureException(Exception):
   pass
@@ -66,6 +71,177 @@ class QuantizationStatusException(Exception):
   pass
 
 
+# Columns of a NoteArray and their NumPy dtypes, in NoteSequence.Note order.
+_NOTE_ARRAY_FIELDS = (
+    ('pitch', np.int32),
+    ('velocity', np.int32),
+    ('start_time', np.float64),
+    ('end_time', np.float64),
+    ('quantized_start_step', np.int64),
+    ('quantized_end_step', np.int64),
+    ('instrument', np.int32),
+    ('program', np.int32),
+    ('is_drum', np.bool_),
+)
+
+
+class NoteArray(object):
+  """A struct-of-arrays view of the notes in a NoteSequence.
+
+  Each field is a NumPy array with one entry per note (or None if the field was
+  not requested), so operations over all notes can be vectorized instead of
+  going through the protobuf attributes of each note. Only the fields listed in
+  `_NOTE_ARRAY_FIELDS` are represented; other note fields (e.g. `part` or
+  `pitch_name`) are ignored.
+
+  Attributes:
+    fields: A tuple of the names of the fields present in this NoteArray.
+  """
+
+  def __init__(self, **columns):
+    """Construct a NoteArray from per-field columns.
+
+    Args:
+      **columns: A mapping from note field name to a 1-D array-like of values,
+          one per note. All columns must have the same length.
+
+    Raises:
+      ValueError: If an unknown field is given or the columns differ in length.
+    """
+    dtypes = dict(_NOTE_ARRAY_FIELDS)
+    unknown_fields = set(columns) - set(dtypes)
+    if unknown_fields:
+      raise ValueError('Unknown note fields: %s' % sorted(unknown_fields))
+    lengths = set(len(column) for column in columns.values())
+    if len(lengths) > 1:
+      raise ValueError('NoteArray columns must all have the same length.')
+
+    self.fields = tuple(field for field, _ in _NOTE_ARRAY_FIELDS
+                        if field in columns)
+    for field, dtype in _NOTE_ARRAY_FIELDS:
+      setattr(self, field, (np.asarray(columns[field], dtype=dtype)
+                            if field in columns else None))
+    self._num_notes = lengths.pop() if lengths else 0
+
+  @classmethod
+  def from_notes(cls, notes, fields=None):
+    """Extracts a NoteArray from a sequence of NoteSequence.Note protos.
+
+    Args:
+      notes: A sequence of NoteSequence.Note protos, e.g. `note_sequence.notes`.
+      fields: A sequence of field names to extract, or None to extract all
+          fields. Extracting only the fields that are needed is much cheaper.
+
+    Returns:
+      A NoteArray containing the requested fields of `notes`.
+    """
+    if fields is None:
+      fields = [field for field, _ in _NOTE_ARRAY_FIELDS]
+    dtypes = dict(_NOTE_ARRAY_FIELDS)
+    columns = {}
+    for field in fields:
+      if field not in dtypes:
+        raise ValueError('Unknown note field: %s' % field)
+      columns[field] = np.fromiter(
+          (getattr(note, field) for note in notes), dtype=dtypes[field],
+          count=len(notes))
+    return cls(**columns)
+
+  @classmethod
+  def from_sequence(cls, note_sequence, fields=None):
+    """Extracts a NoteArray from the notes of a NoteSequence.
+
+    Args:
+      note_sequence: A music_pb2.NoteSequence proto.
+      fields: A sequence of field names to extract, or None to extract all
+          fields.
+
+    Returns:
+      A NoteArray containing the requested fields of `note_sequence.notes`.
+    """
+    return cls.from_notes(note_sequence.notes, fields)
+
+  def __len__(self):
+    return self._num_notes
+
+  def __getitem__(self, key):
+    """Selects notes by slice, integer index array, or boolean mask."""
+    return NoteArray(**dict((field, getattr(self, field)[key])
+                            for field in self.fields))
+
+  def write_to(self, notes):
+    """Writes the fields of this NoteArray into existing Note protos in place.
+
+    Only the fields present in this NoteArray are written.
+
+    Args:
+      notes: A sequence of NoteSequence.Note protos with the same length as
+          this NoteArray.
+
+    Raises:
+      ValueError: If `notes` has a different length than this NoteArray.
+    """
+    if len(notes) != len(self):
+      raise ValueError('Cannot write %d notes into %d Note protos.' %
+                       (len(self), len(notes)))
+    for field in self.fields:
+      for note, value in zip(notes, getattr(self, field).tolist()):
+        setattr(note, field, value)
+
+  def to_sequence(self, note_sequence=None):
+    """Appends the notes in this NoteArray to a NoteSequence.
+
+    Args:
+      note_sequence: The music_pb2.NoteSequence to append notes to, or None to
+          create a new one.
+
+    Returns:
+      The NoteSequence the notes were appended to.
+    """
+    if note_sequence is None:
+      note_sequence = music_pb2.NoteSequence()
+    for _ in range(len(self)):
+      note_sequence.notes.add()
+    self.write_to(note_sequence.notes[-len(self):] if len(self) else [])
+    return note_sequence
+
+
+def _extract_notes(sequence, subsequence, start_time, end_time):
+  """Replaces the notes of `subsequence` with those of `sequence` in a range.
+
+  Notes starting before `start_time` or at or after `end_time` are removed and
+  notes ending after `end_time` are truncated. `subsequence` must be a copy of
+  `sequence` whose notes have not been modified. The kept notes are located with
+  a NoteArray, so when they are contiguous (e.g. the notes are sorted by start
+  time) they are sliced out of `subsequence` without copying notes one by one.
+
+  Args:
+    sequence: The source NoteSequence.
+    subsequence: A copy of `sequence` whose notes will be replaced in place.
+    start_time: The float time in seconds at which the range starts.
+    end_time: The float time in seconds at which the range ends.
+
+  Returns:
+    A NumPy array of the (truncated) end times of the notes in `subsequence`.
+  """
+  starts = NoteArray.from_notes(sequence.notes, ['start_time']).start_time
+  keep = np.flatnonzero((starts >= start_time) & (starts < end_time))
+  if not keep.size:
+    del subsequence.notes[:]
+  elif keep[-1] - keep[0] + 1 == keep.size:
+    del subsequence.notes[keep[-1] + 1:]
+    del subsequence.notes[:keep[0]]
+  else:
+    del subsequence.notes[:]
+    for i in keep.tolist():
+      subsequence.notes.add().CopyFrom(sequence.notes[i])
+
+  end_times = NoteArray.from_notes(subsequence.notes, ['end_time']).end_time
+  for i in np.flatnonzero(end_times > end_time).tolist():
+    subsequence.notes[i].end_time = end_time
+  return np.minimum(end_times, end_time)
+
+
 def trim_note_sequence(sequence, start_time, end_time):
   """Trim notes from a NoteSequence to lie within a specified time range.
 
@@ -91,13 +267,7 @@ def trim_note_sequence(sequence, start_time, end_time):
   subsequence = music_pb2.NoteSequence()
   subsequence.CopyFrom(sequence)
 
-  del subsequence.notes[:]
-  for note in sequence.notes:
-    if note.start_time < start_time or note.start_time >= end_time:
-      continue
-    new_note = subsequence.notes.add()
-    new_note.CopyFrom(note)
-    new_note.end_time = min(note.end_time, end_time)
+  _extract_notes(sequence, subsequence, start_time, end_time)
 
   subsequence.total_time = min(sequence.total_time, end_time)
 
@@ -144,17 +314,15 @@ def extract_subsequence(sequence, start_time, end_time):
 
   subsequence.total_time = 0.0
 
-  # Extract notes.
-  del subsequence.notes[:]
-  for note in sequence.notes:
-    if note.start_time < start_time or note.start_time >= end_time:
-      continue
-    new_note = subsequence.notes.add()
-    new_note.CopyFrom(note)
-    new_note.start_time -= start_time
-    new_note.end_time = min(note.end_time, end_time) - start_time
-    if new_note.end_time > subsequence.total_time:
-      subsequence.total_time = new_note.end_time
+  # Extract notes and shift them to start at time zero.
+  end_times = _extract_notes(sequence, subsequence, start_time, end_time)
+  if start_time:
+    for note in subsequence.notes:
+      note.start_time -= start_time
+      note.end_time -= start_time
+  if end_times.size:
+    subsequence.total_time = max(
+        0.0, float((end_times - start_time).max()))
 
   # Extract time signatures.
   del subsequence.time_signatures[:]
@@ -244,6 +412,106 @@ def extract_subsequence(sequence, start_time, end_time):
   return subsequence
 
 
+def _extract_subsequences(sequence, split_times):
+  """Extracts consecutive subsequences from a NoteSequence in a single pass.
+
+  Produces the same NoteSequences as calling `extract_subsequence` on each pair
+  of consecutive split times, but sorts the notes and time-based events once
+  and sweeps over the split times, instead of copying the whole source
+  NoteSequence and rescanning all of its events for every subsequence.
+
+  Args:
+    sequence: The NoteSequence to extract subsequences from.
+    split_times: A sorted sequence of float times in seconds. The i-th
+        subsequence spans from `split_times[i]` to `split_times[i + 1]`.
+
+  Returns:
+    A Python list of `len(split_times) - 1` NoteSequences.
+
+  Raises:
+    QuantizationStatusException: If the sequence has already been quantized.
+    ValueError: If a subsequence would start past the end of `sequence`.
+  """
+  if is_quantized_sequence(sequence):
+    raise QuantizationStatusException(
+        'Can only extract subsequence from unquantized NoteSequence.')
+
+  if len(split_times) > 1 and split_times[-2] >= sequence.total_time:
+    raise ValueError('Cannot extract subsequence past end of sequence.')
+
+  # Everything except the time-based events is shared by all subsequences.
+  template = music_pb2.NoteSequence()
+  template.CopyFrom(sequence)
+  template.total_time = 0.0
+  del template.notes[:]
+  del template.time_signatures[:]
+  del template.key_signatures[:]
+  del template.tempos[:]
+  del template.text_annotations[:]
+  del template.pitch_bends[:]
+  del template.control_changes[:]
+
+  # Order note indices by start time; the notes of each subsequence are later
+  # restored to their original order.
+  notes = NoteArray.from_sequence(sequence, ['start_time'])
+  notes_order = np.argsort(notes.start_time, kind='mergesort')
+  sorted_start_times = notes.start_time[notes_order]
+
+  # Time signatures, key signatures, tempos, and chord symbols sorted by time,
+  # along with the name of the repeated field each belongs to.
+  chord_symbols = [annotation for annotation in sequence.text_annotations
+                   if annotation.annotation_type == CHORD_SYMBOL]
+  events_by_field = []
+  for field, events in [('time_signatures', sequence.time_signatures),
+                        ('key_signatures', sequence.key_signatures),
+                        ('tempos', sequence.tempos),
+                        ('text_annotations', chord_symbols)]:
+    events = sorted(events, key=lambda event: event.time)
+    events_by_field.append(
+        (field, events, np.array([event.time for event in events],
+                                 dtype=np.float64)))
+
+  subsequences = []
+  for start_time, end_time in zip(split_times[:-1], split_times[1:]):
+    subsequence = music_pb2.NoteSequence()
+    subsequence.CopyFrom(template)
+
+    # Extract notes.
+    first, last = np.searchsorted(
+        sorted_start_times, [start_time, end_time], side='left')
+    for i in np.sort(notes_order[first:last]).tolist():
+      note = sequence.notes[i]
+      new_note = subsequence.notes.add()
+      new_note.CopyFrom(note)
+      new_note.start_time -= start_time
+      new_note.end_time = min(note.end_time, end_time) - start_time
+      if new_note.end_time > subsequence.total_time:
+        subsequence.total_time = new_note.end_time
+
+    # Extract time signatures, key signatures, tempos, and chord symbols. The
+    # most recent event at or before `start_time` is moved to time zero.
+    for field, events, times in events_by_field:
+      first = np.searchsorted(times, start_time, side='right')
+      last = np.searchsorted(times, end_time, side='left')
+      repeated_field = getattr(subsequence, field)
+      if first > 0:
+        initial_event = repeated_field.add()
+        initial_event.CopyFrom(events[first - 1])
+        initial_event.time = 0.0
+      for event in events[first:max(first, last)]:
+        new_event = repeated_field.add()
+        new_event.CopyFrom(event)
+        new_event.time -= start_time
+
+    subsequence.subsequence_info.start_time_offset = start_time
+    subsequence.subsequence_info.end_time_offset = (
+        sequence.total_time - start_time - subsequence.total_time)
+
+    subsequences.append(subsequence)
+
+  return subsequences
+
+
 def _is_power_of_2(x):
   return x and not x & (x - 1)
 
@@ -356,6 +624,94 @@ def steps_per_bar_in_quantized_sequence(note_sequence):
   return steps_per_bar_float
 
 
+class QuantizedNoteIndex(object):
+  """An index of the notes of a quantized NoteSequence by instrument and step.
+
+  Notes are grouped by instrument and sorted by start step, and secondarily by
+  pitch descending. The notes starting at or after a given step are found by
+  bisection, so extractors that repeatedly search the same sequence from
+  increasing start steps can share one index instead of filtering and sorting
+  all notes of the sequence on every search.
+  """
+
+  def __init__(self, quantized_sequence):
+    """Builds the index.
+
+    Args:
+      quantized_sequence: A quantized NoteSequence. The index is not updated if
+          the sequence is subsequently modified.
+
+    Raises:
+      QuantizationStatusException: If `quantized_sequence` is not quantized.
+    """
+    assert_is_quantized_sequence(quantized_sequence)
+
+    # Notes of all instruments are stored under the key None.
+    self._notes = collections.defaultdict(list)
+    for note in quantized_sequence.notes:
+      self._notes[note.instrument].append(note)
+    self._notes[None] = list(quantized_sequence.notes)
+
+    self._start_steps = {}
+    for instrument, notes in self._notes.items():
+      notes.sort(key=lambda note: (note.quantized_start_step, -note.pitch))
+      self._start_steps[instrument] = [
+          note.quantized_start_step for note in notes]
+
+  @property
+  def instruments(self):
+    """A sorted list of the instruments that have notes."""
+    return sorted(instrument for instrument in self._start_steps
+                  if instrument is not None)
+
+  def notes(self, instrument=None, start_step=0):
+    """Iterates over the notes starting at or after a given step.
+
+    Args:
+      instrument: The instrument whose notes to iterate over, or None to iterate
+          over the notes of all instruments.
+      start_step: Only notes starting at or after this step are returned.
+
+    Yields:
+      NoteSequence.Note protos sorted by start step, and secondarily by pitch
+      descending.
+    """
+    notes = self._notes.get(instrument, [])
+    i = bisect.bisect_left(self._start_steps.get(instrument, []), start_step)
+    while i < len(notes):
+      yield notes[i]
+      i += 1
+
+
+def _splits_inside_notes(note_sequence, split_times):
+  """Determines which split times occur within sustained notes.
+
+  Args:
+    note_sequence: The NoteSequence whose notes to check.
+    split_times: A sequence of float split times in seconds.
+
+  Returns:
+    A boolean NumPy array with one entry per split time, True if any note in
+    `note_sequence` starts before and ends after that split time.
+  """
+  split_times = np.asarray(split_times, dtype=np.float64)
+  notes = NoteArray.from_sequence(note_sequence, ['start_time', 'end_time'])
+  if not len(notes):
+    return np.zeros(len(split_times), dtype=bool)
+
+  # A split time is inside a note iff the latest end time among the notes
+  # starting before it is after it.
+  order = np.argsort(notes.start_time, kind='mergesort')
+  max_end_times = np.maximum.accumulate(notes.end_time[order])
+  num_started = np.searchsorted(
+      notes.start_time[order], split_times, side='left')
+  inside_notes = np.zeros(len(split_times), dtype=bool)
+  started = num_started > 0
+  inside_notes[started] = (
+      max_end_times[num_started[started] - 1] > split_times[started])
+  return inside_notes
+
+
 def split_note_sequence(note_sequence, hop_size_seconds,
                         skip_splits_inside_notes=False):
   """Split one NoteSequence into many using a fixed hop size.
@@ -381,38 +737,24 @@ def split_note_sequence(note_sequence, hop_size_seconds,
   """
   prev_split_time = 0.0
 
-  notes_by_start_time = sorted(list(note_sequence.notes),
-                               key=lambda note: note.start_time)
-  note_idx = 0
-  notes_crossing_split = []
+  split_times = np.arange(
+      hop_size_seconds, note_sequence.total_time, hop_size_seconds)
+  splits_inside_notes = _splits_inside_notes(note_sequence, split_times)
 
-  subsequences = []
+  subsequence_boundaries = [prev_split_time]
 
-  for split_time in np.arange(
-      hop_size_seconds, note_sequence.total_time, hop_size_seconds):
-    # Update notes crossing potential split.
-    while (note_idx < len(notes_by_start_time) and
-           notes_by_start_time[note_idx].start_time < split_time):
-      notes_crossing_split.append(notes_by_start_time[note_idx])
-      note_idx += 1
-    notes_crossing_split = [note for note in notes_crossing_split
-                            if note.end_time > split_time]
-
-    if not (skip_splits_inside_notes and notes_crossing_split):
-      # Extract the subsequence between the previous split time and this split
+  for split_time, inside_notes in zip(split_times, splits_inside_notes):
+    if not (skip_splits_inside_notes and inside_notes):
+      # Split the subsequence between the previous split time and this split
       # time.
-      subsequence = extract_subsequence(
-          note_sequence, prev_split_time, split_time)
-      subsequences.append(subsequence)
+      subsequence_boundaries.append(split_time)
       prev_split_time = split_time
 
   # Handle the final subsequence.
   if note_sequence.total_time > prev_split_time:
-    subsequence = extract_subsequence(note_sequence, prev_split_time,
-                                      note_sequence.total_time)
-    subsequences.append(subsequence)
+    subsequence_boundaries.append(note_sequence.total_time)
 
-  return subsequences
+  return _extract_subsequences(note_sequence, subsequence_boundaries)
 
 
 def split_note_sequence_on_time_changes(note_sequence,
@@ -445,15 +787,13 @@ def split_note_sequence_on_time_changes(note_sequence,
       key=lambda t: t.time)
   time_signatures_and_tempos = [t for t in time_signatures_and_tempos
                                 if t.time < note_sequence.total_time]
+  splits_inside_notes = _splits_inside_notes(
+      note_sequence, [t.time for t in time_signatures_and_tempos])
 
-  notes_by_start_time = sorted(list(note_sequence.notes),
-                               key=lambda note: note.start_time)
-  note_idx = 0
-  notes_crossing_split = []
+  subsequence_boundaries = [prev_change_time]
 
-  subsequences = []
-
-  for time_change in time_signatures_and_tempos:
+  for time_change, inside_notes in zip(time_signatures_and_tempos,
+                                       splits_inside_notes):
     if isinstance(time_change, music_pb2.NoteSequence.TimeSignature):
       if (time_change.numerator == current_numerator and
           time_change.denominator == current_denominator):
@@ -464,21 +804,11 @@ def split_note_sequence_on_time_changes(note_sequence,
         # Tempo didn't actually change.
         continue
 
-    # Update notes crossing potential split.
-    while (note_idx < len(notes_by_start_time) and
-           notes_by_start_time[note_idx].start_time < time_change.time):
-      notes_crossing_split.append(notes_by_start_time[note_idx])
-      note_idx += 1
-    notes_crossing_split = [note for note in notes_crossing_split
-                            if note.end_time > time_change.time]
-
     if time_change.time > prev_change_time:
-      if not (skip_splits_inside_notes and notes_crossing_split):
-        # Extract the subsequence between the previous time change and this
+      if not (skip_splits_inside_notes and inside_notes):
+        # Split the subsequence between the previous time change and this
         # time change.
-        subsequence = extract_subsequence(note_sequence, prev_change_time,
-                                          time_change.time)
-        subsequences.append(subsequence)
+        subsequence_boundaries.append(time_change.time)
         prev_change_time = time_change.time
 
     # Even if we didn't split here, update the current time signature or tempo.
@@ -490,11 +820,9 @@ def split_note_sequence_on_time_changes(note_sequence,
 
   # Handle the final subsequence.
   if note_sequence.total_time > prev_change_time:
-    subsequence = extract_subsequence(note_sequence, prev_change_time,
-                                      note_sequence.total_time)
-    subsequences.append(subsequence)
+    subsequence_boundaries.append(note_sequence.total_time)
 
-  return subsequences
+  return _extract_subsequences(note_sequence, subsequence_boundaries)
 
 
 def quantize_to_step(unquantized_seconds, steps_per_second,
@@ -538,24 +866,29 @@ def _quantize_notes(note_sequence, steps_per_second):
   Raises:
     NegativeTimeException: If a note or chord occurs at a negative time.
   """
-  for note in note_sequence.notes:
-    # Quantize the start and end times of the note.
-    note.quantized_start_step = quantize_to_step(
-        note.start_time, steps_per_second)
-    note.quantized_end_step = quantize_to_step(
-        note.end_time, steps_per_second)
-    if note.quantized_end_step == note.quantized_start_step:
-      note.quantized_end_step += 1
-
-    # Do not allow notes to start or end in negative time.
-    if note.quantized_start_step < 0 or note.quantized_end_step < 0:
-      raise NegativeTimeException(
-          'Got negative note time: start_step = %s, end_step = %s' %
-          (note.quantized_start_step, note.quantized_end_step))
-
-    # Extend quantized sequence if necessary.
-    if note.quantized_end_step > note_sequence.total_quantized_steps:
-      note_sequence.total_quantized_steps = note.quantized_end_step
+  notes = NoteArray.from_sequence(note_sequence, ['start_time', 'end_time'])
+
+  # Quantize the start and end times of all notes at once. Like
+  # `quantize_to_step`, this truncates toward zero.
+  start_steps = (notes.start_time * steps_per_second +
+                 (1 - QUANTIZE_CUTOFF)).astype(np.int64)
+  end_steps = (notes.end_time * steps_per_second +
+               (1 - QUANTIZE_CUTOFF)).astype(np.int64)
+  end_steps[end_steps == start_steps] += 1
+
+  # Do not allow notes to start or end in negative time.
+  negative = np.flatnonzero((start_steps < 0) | (end_steps < 0))
+  if negative.size:
+    raise NegativeTimeException(
+        'Got negative note time: start_step = %s, end_step = %s' %
+        (start_steps[negative[0]], end_steps[negative[0]]))
+
+  NoteArray(quantized_start_step=start_steps,
+            quantized_end_step=end_steps).write_to(note_sequence.notes)
+
+  # Extend quantized sequence if necessary.
+  if len(notes) and end_steps.max() > note_sequence.total_quantized_steps:
+    note_sequence.total_quantized_steps = int(end_steps.max())
 
   # Also quantize chord symbol annotations.
   for annotation in note_sequence.text_annotations:
@@ -920,55 +1253,106 @@ def infer_chords_for_sequence(
     ChordSymbolException: If a chord cannot be determined for a set of
     simultaneous notes in `sequence`.
   """
-  notes = [note for note in sequence.notes
-           if not note.is_drum and (instrument is None or
-                                    note.instrument == instrument)]
-  sorted_notes = sorted(notes, key=lambda note: note.start_time)
-
   # If the sequence is quantized, use quantized steps instead of time.
   if is_quantized_sequence(sequence):
-    note_start = lambda note: note.quantized_start_step
-    note_end = lambda note: note.quantized_end_step
+    start_field, end_field = 'quantized_start_step', 'quantized_end_step'
   else:
-    note_start = lambda note: note.start_time
-    note_end = lambda note: note.end_time
-
-  # Sort all note start and end events.
-  onsets = [(note_start(note), idx, False)
-            for idx, note in enumerate(sorted_notes)]
-  offsets = [(note_end(note), idx, True)
-             for idx, note in enumerate(sorted_notes)]
-  events = sorted(onsets + offsets)
+    start_field, end_field = 'start_time', 'end_time'
+
+  note_array = NoteArray.from_sequence(
+      sequence, ['pitch', start_field, end_field, 'instrument', 'is_drum'])
+  selected = ~note_array.is_drum
+  if instrument is not None:
+    selected &= note_array.instrument == instrument
+  pitches = note_array.pitch[selected]
+  starts = getattr(note_array, start_field)[selected]
+  ends = getattr(note_array, end_field)[selected]
+  if not pitches.size:
+    return
+
+  # Split the sequence into segments at every note start and end. Segment `i`
+  # begins at `times[i]` and ends at `times[i + 1]`; the last time only ends a
+  # segment.
+  times = np.unique(np.concatenate([starts, ends]))
+  start_indices = np.searchsorted(times, starts)
+  end_indices = np.searchsorted(times, ends)
+  if np.any(end_indices < start_indices):
+    raise ValueError('Note ends before it starts.')
+
+  # Sort the note starts and ends by segment, so that the active notes can be
+  # counted a bounded number of segments at a time.
+  num_segments = len(times) - 1
+  num_pitch_values = max(constants.MAX_MIDI_PITCH, pitches.max()) + 1
+  event_segments = np.concatenate([start_indices, end_indices])
+  order = np.argsort(event_segments, kind='mergesort')
+  event_segments = event_segments[order]
+  event_pitches = np.concatenate([pitches, pitches])[order]
+  event_deltas = np.concatenate([
+      np.ones(len(pitches), dtype=np.int32),
+      -np.ones(len(pitches), dtype=np.int32)])[order]
+
+  # The number of distinct pitches, the lowest pitch class, and the bitmask of
+  # pitch classes in each segment.
+  num_pitches = np.empty(num_segments, dtype=np.int64)
+  bass = np.empty(num_segments, dtype=np.int64)
+  pitch_class_masks = np.empty(num_segments, dtype=np.int64)
+  pitch_class_bits = 1 << np.arange(12)
+  # Round the pitches up to whole octaves, so they can be folded into classes.
+  num_octave_pitches = -(-num_pitch_values // 12) * 12
+  pitch_counts = np.zeros(num_pitch_values, dtype=np.int32)
+  for chunk_start in range(
+      0, num_segments, _CHORD_INFERENCE_SEGMENTS_PER_CHUNK):
+    chunk_end = min(
+        chunk_start + _CHORD_INFERENCE_SEGMENTS_PER_CHUNK, num_segments)
+    lo, hi = np.searchsorted(event_segments, [chunk_start, chunk_end])
+
+    # Count the active notes at each pitch in each segment of the chunk using a
+    # difference array, starting from the counts at the end of the last chunk.
+    chunk_counts = np.zeros(
+        [chunk_end - chunk_start, num_pitch_values], dtype=np.int32)
+    np.add.at(chunk_counts,
+              (event_segments[lo:hi] - chunk_start, event_pitches[lo:hi]),
+              event_deltas[lo:hi])
+    chunk_counts[0] += pitch_counts
+    np.cumsum(chunk_counts, axis=0, out=chunk_counts)
+    pitch_counts = chunk_counts[-1].copy()
+
+    active = np.zeros([chunk_end - chunk_start, num_octave_pitches], dtype=bool)
+    np.greater(chunk_counts, 0, out=active[:, :num_pitch_values])
+    num_pitches[chunk_start:chunk_end] = np.sum(active, axis=1)
+    bass[chunk_start:chunk_end] = np.argmax(active, axis=1) % 12
+    pitch_class_masks[chunk_start:chunk_end] = np.dot(
+        np.any(active.reshape([chunk_end - chunk_start, -1, 12]), axis=1),
+        pitch_class_bits)
 
-  current_time = 0
   current_figure = constants.NO_CHORD
-  active_notes = set()
-
-  for time, idx, is_offset in events:
-    if time > current_time:
-      active_pitches = set(sorted_notes[idx].pitch for idx in active_notes)
-      if len(active_pitches) >= min_notes_per_chord:
-        # Infer a chord symbol for the active pitches.
-        figure = chord_symbols_lib.pitches_to_chord_symbol(active_pitches)
-
-        if figure != current_figure:
-          # Add a text annotation to the sequence.
-          text_annotation = sequence.text_annotations.add()
-          text_annotation.text = figure
-          text_annotation.annotation_type = CHORD_SYMBOL
-          if is_quantized_sequence(sequence):
-            text_annotation.time = (
-                current_time * sequence.quantization_info.steps_per_quarter)
-            text_annotation.quantized_step = current_time
-          else:
-            text_annotation.time = current_time
-
-        current_figure = figure
-
-    current_time = time
-    if is_offset:
-      active_notes.remove(idx)
+  is_quantized = is_quantized_sequence(sequence)
+  # The segment before the first note never has a chord, so it is skipped.
+  for i in np.nonzero(num_pitches >= min_notes_per_chord)[0]:
+    if num_pitches[i]:
+      # Infer a chord symbol for the active pitches.
+      try:
+        figure = chord_symbols_lib.pitch_class_mask_to_chord_symbol(
+            int(pitch_class_masks[i]), int(bass[i]))
+      except chord_symbols_lib.ChordSymbolException:
+        active = (start_indices <= i) & (end_indices > i)
+        raise chord_symbols_lib.ChordSymbolException(
+            'Unable to determine chord symbol from pitches: %s' %
+            str(set(int(pitch) for pitch in pitches[active])))
     else:
-      active_notes.add(idx)
+      figure = constants.NO_CHORD
+
+    if figure != current_figure:
+      # Add a text annotation to the sequence.
+      current_time = times[i].item()
+      text_annotation = sequence.text_annotations.add()
+      text_annotation.text = figure
+      text_annotation.annotation_type = CHORD_SYMBOL
+      if is_quantized:
+        text_annotation.time = (
+            current_time * sequence.quantization_info.steps_per_quarter)
+        text_annotation.quantized_step = current_time
+      else:
+        text_annotation.time = current_time
 
-  assert not active_notes
+    current_figure = figure
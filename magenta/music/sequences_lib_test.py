@@ -39,6 +39,32 @@ class SequencesLibTest(tf.test.TestCase):
         tempos: {
           qpm: 60}""")
 
+  def testNoteArray(self):
+    sequence = copy.copy(self.note_sequence)
+    testing_lib.add_track_to_sequence(
+        sequence, 0, [(12, 100, 0.01, 10.0), (11, 55, 0.22, 0.50)])
+    testing_lib.add_track_to_sequence(
+        sequence, 9, [(36, 80, 2.50, 3.50)], is_drum=True)
+
+    notes = sequences_lib.NoteArray.from_sequence(sequence)
+    self.assertEqual(3, len(notes))
+    self.assertEqual([12, 11, 36], notes.pitch.tolist())
+    self.assertEqual([0.01, 0.22, 2.50], notes.start_time.tolist())
+    self.assertEqual([0, 0, 9], notes.instrument.tolist())
+    self.assertEqual([False, False, True], notes.is_drum.tolist())
+
+    expected_sequence = music_pb2.NoteSequence()
+    expected_sequence.notes.extend(sequence.notes[1:])
+    self.assertProtoEquals(expected_sequence, notes[1:].to_sequence())
+
+    notes = sequences_lib.NoteArray.from_sequence(sequence, ['end_time'])
+    self.assertEqual(('end_time',), notes.fields)
+    self.assertIsNone(notes.pitch)
+    notes.end_time *= 2
+    notes.write_to(sequence.notes)
+    self.assertEqual([20.0, 1.0, 7.0],
+                     [note.end_time for note in sequence.notes])
+
   def testTrimNoteSequence(self):
     sequence = copy.copy(self.note_sequence)
     testing_lib.add_track_to_sequence(
@@ -75,6 +101,24 @@ class SequencesLibTest(tf.test.TestCase):
     subsequence = sequences_lib.extract_subsequence(sequence, 2.5, 4.75)
     self.assertProtoEquals(expected_subsequence, subsequence)
 
+  def testExtractSubsequenceUnsortedNotes(self):
+    sequence = copy.copy(self.note_sequence)
+    testing_lib.add_track_to_sequence(
+        sequence, 0, [(40, 45, 2.50, 3.50), (12, 100, 0.01, 10.0)])
+    testing_lib.add_track_to_sequence(
+        sequence, 1, [(55, 120, 4.0, 4.01), (11, 55, 0.22, 0.50)])
+    expected_subsequence = copy.copy(self.note_sequence)
+    testing_lib.add_track_to_sequence(
+        expected_subsequence, 0, [(40, 45, 0.0, 1.0)])
+    testing_lib.add_track_to_sequence(
+        expected_subsequence, 1, [(55, 120, 1.5, 1.51)])
+    expected_subsequence.total_time = 1.51
+    expected_subsequence.subsequence_info.start_time_offset = 2.5
+    expected_subsequence.subsequence_info.end_time_offset = 5.99
+
+    subsequence = sequences_lib.extract_subsequence(sequence, 2.5, 4.75)
+    self.assertProtoEquals(expected_subsequence, subsequence)
+
   def testExtractSubsequencePastEnd(self):
     sequence = copy.copy(self.note_sequence)
     testing_lib.add_track_to_sequence(
@@ -214,6 +258,30 @@ class SequencesLibTest(tf.test.TestCase):
     self.assertProtoEquals(expected_subsequence_1, subsequences[0])
     self.assertProtoEquals(expected_subsequence_2, subsequences[1])
 
+  def testSplitNoteSequenceMatchesExtractSubsequence(self):
+    sequence = copy.copy(self.note_sequence)
+    testing_lib.add_track_to_sequence(
+        sequence, 0,
+        [(12, 100, 4.5, 8.0), (11, 55, 0.22, 0.50), (40, 45, 2.50, 3.50)])
+    testing_lib.add_track_to_sequence(
+        sequence, 1, [(55, 120, 4.0, 4.01), (52, 99, 1.75, 5.0)])
+    testing_lib.add_chords_to_sequence(
+        sequence, [('F', 4.0), ('C', 1.0), ('G7', 2.0)])
+    testing_lib.add_control_changes_to_sequence(sequence, 0, [(1.5, 64, 127)])
+    sequence.key_signatures.add(
+        time=3.0, key=music_pb2.NoteSequence.KeySignature.G)
+    sequence.total_time = 8.0
+
+    expected_subsequences = [
+        sequences_lib.extract_subsequence(sequence, start_time, end_time)
+        for start_time, end_time in [(0.0, 3.0), (3.0, 6.0), (6.0, 8.0)]]
+
+    subsequences = sequences_lib.split_note_sequence(sequence, 3.0)
+    self.assertEquals(3, len(subsequences))
+    for expected_subsequence, subsequence in zip(expected_subsequences,
+                                                 subsequences):
+      self.assertProtoEquals(expected_subsequence, subsequence)
+
   def testSplitNoteSequenceNoTimeChanges(self):
     # Tests splitting a NoteSequence on time changes for a NoteSequence that has
     # no time changes (time signature and tempo changes).
@@ -499,6 +567,29 @@ class SequencesLibTest(tf.test.TestCase):
 
     self.assertProtoEquals(expected_quantized_sequence, quantized_sequence)
 
+  def testQuantizedNoteIndex(self):
+    testing_lib.add_track_to_sequence(
+        self.note_sequence, 1,
+        [(12, 100, 0.01, 10.0), (11, 55, 2.50, 3.50), (40, 45, 2.50, 3.50)])
+    testing_lib.add_track_to_sequence(
+        self.note_sequence, 0, [(55, 120, 4.0, 4.01), (52, 99, 0.25, 5.0)])
+    quantized_sequence = sequences_lib.quantize_note_sequence(
+        self.note_sequence, steps_per_quarter=self.steps_per_quarter)
+
+    note_index = sequences_lib.QuantizedNoteIndex(quantized_sequence)
+    self.assertEqual([0, 1], note_index.instruments)
+    self.assertEqual([12, 40, 11],
+                     [note.pitch for note in note_index.notes(1)])
+    self.assertEqual([40, 11],
+                     [note.pitch for note in note_index.notes(1, 1)])
+    self.assertEqual([55], [note.pitch for note in note_index.notes(0, 2)])
+    self.assertEqual([], list(note_index.notes(2)))
+    self.assertEqual([12, 52, 40, 11, 55],
+                     [note.pitch for note in note_index.notes()])
+
+    with self.assertRaises(sequences_lib.QuantizationStatusException):
+      sequences_lib.QuantizedNoteIndex(self.note_sequence)
+
   def testQuantizeNoteSequenceAbsolute(self):
     testing_lib.add_track_to_sequence(
         self.note_sequence, 0,
@@ -939,5 +1030,28 @@ class SequencesLibTest(tf.test.TestCase):
     self.assertProtoEquals(expected_sequence, sequence)
 
 
+  def testInferChordsForSequenceInChunks(self):
+    sequence = copy.copy(self.note_sequence)
+    testing_lib.add_track_to_sequence(
+        sequence, 0,
+        [(60, 100, 1.0, 3.0), (64, 100, 1.0, 2.0), (67, 100, 1.0, 2.0),
+         (65, 100, 2.0, 3.0), (69, 100, 2.0, 3.0),
+         (62, 100, 3.0, 5.0), (65, 100, 3.0, 4.0), (69, 100, 3.0, 4.0),
+         (48, 100, 4.5, 7.0), (55, 100, 5.0, 6.0), (64, 100, 5.5, 6.5)])
+    expected_sequence = copy.copy(sequence)
+    sequences_lib.infer_chords_for_sequence(
+        expected_sequence, min_notes_per_chord=2)
+
+    # Count the active notes a few segments at a time, so that notes are held
+    # across chunks.
+    segments_per_chunk = sequences_lib._CHORD_INFERENCE_SEGMENTS_PER_CHUNK
+    sequences_lib._CHORD_INFERENCE_SEGMENTS_PER_CHUNK = 2
+    try:
+      sequences_lib.infer_chords_for_sequence(sequence, min_notes_per_chord=2)
+    finally:
+      sequences_lib._CHORD_INFERENCE_SEGMENTS_PER_CHUNK = segments_per_chunk
+    self.assertProtoEquals(expected_sequence, sequence)
+
+
 if __name__ == '__main__':
   tf.test.main()
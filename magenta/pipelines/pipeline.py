@@ -14,8 +14,11 @@
 """For running data processing pipelines."""
 
 import abc
+import collections
 import inspect
+import multiprocessing
 import os.path
+import random
 
 # internal imports
 import six
@@ -308,6 +311,21 @@ def tf_record_iterator(tfrecord_file, proto):
     yield proto.FromString(raw_bytes)
 
 
+def _check_serializable_output_type(pipeline):
+  """Raises a ValueError if `pipeline` outputs cannot be serialized."""
+  if isinstance(pipeline.output_type, dict):
+    for name, type_ in pipeline.output_type.items():
+      if not hasattr(type_, 'SerializeToString'):
+        raise ValueError(
+            'Pipeline output "%s" does not have method SerializeToString. '
+            'Output type = %s' % (name, pipeline.output_type))
+  else:
+    if not hasattr(pipeline.output_type, 'SerializeToString'):
+      raise ValueError(
+          'Pipeline output type %s does not have method SerializeToString.'
+          % pipeline.output_type)
+
+
 def run_pipeline_serial(pipeline,
                         input_iterator,
                         output_dir,
@@ -337,17 +355,7 @@ def run_pipeline_serial(pipeline,
     ValueError: If any of `pipeline`'s output types do not have a
         SerializeToString method.
   """
-  if isinstance(pipeline.output_type, dict):
-    for name, type_ in pipeline.output_type.items():
-      if not hasattr(type_, 'SerializeToString'):
-        raise ValueError(
-            'Pipeline output "%s" does not have method SerializeToString. '
-            'Output type = %s' % (name, pipeline.output_type))
-  else:
-    if not hasattr(pipeline.output_type, 'SerializeToString'):
-      raise ValueError(
-          'Pipeline output type %s does not have method SerializeToString.'
-          % pipeline.output_type)
+  _check_serializable_output_type(pipeline)
 
   if not tf.gfile.Exists(output_dir):
     tf.gfile.MakeDirs(output_dir)
@@ -367,7 +375,7 @@ def run_pipeline_serial(pipeline,
 
   total_inputs = 0
   total_outputs = 0
-  stats = []
+  stats = statistics.StatisticsAccumulator()
   for input_ in input_iterator:
     total_inputs += 1
     for name, outputs in _guarantee_dict(pipeline.transform(input_),
@@ -375,15 +383,184 @@ def run_pipeline_serial(pipeline,
       for output in outputs:
         writers[name].write(output.SerializeToString())
       total_outputs += len(outputs)
-    stats = statistics.merge_statistics(stats + pipeline.get_stats())
+    stats.merge(pipeline.get_stats())
     if total_inputs % 500 == 0:
       tf.logging.info('Processed %d inputs so far. Produced %d outputs.',
                       total_inputs, total_outputs)
-      statistics.log_statistics_list(stats, tf.logging.info)
+      stats.log(tf.logging.info)
+  tf.logging.info('\n\nCompleted.\n')
+  tf.logging.info('Processed %d inputs total. Produced %d outputs.',
+                  total_inputs, total_outputs)
+  stats.log(tf.logging.info)
+
+
+# The pipeline instance owned by a worker process of `run_pipeline_parallel`.
+_worker_pipeline = None
+
+
+def _init_worker(pipeline):
+  global _worker_pipeline
+  _worker_pipeline = pipeline
+
+
+def _transform_chunk(chunk, seed):
+  """Runs the worker pipeline on a chunk of indexed inputs.
+
+  Args:
+    chunk: A list of (input index, input object) tuples.
+    seed: If not None, the `random` module is seeded with `seed` plus the input
+        index before each input is transformed.
+
+  Returns:
+    A tuple (results, stats) where `results` is a list of
+    (input index, output dictionary) tuples with each output dictionary mapping
+    dataset names to lists of serialized outputs, and `stats` is a list of the
+    merged `Statistic` objects for the whole chunk.
+  """
+  output_names = list(_worker_pipeline.output_type_as_dict.keys())
+  results = []
+  stats = statistics.StatisticsAccumulator()
+  for index, input_ in chunk:
+    if seed is not None:
+      random.seed(seed + index)
+    outputs = _guarantee_dict(_worker_pipeline.transform(input_),
+                              output_names[0])
+    results.append(
+        (index, dict([(name, [output.SerializeToString() for output in outs])
+                      for name, outs in outputs.items()])))
+    stats.merge(_worker_pipeline.get_stats())
+  return results, stats.snapshot()
+
+
+def _chunk_iterator(input_iterator, chunk_size):
+  """Yields lists of up to `chunk_size` (index, input) tuples."""
+  chunk = []
+  for index, input_ in enumerate(input_iterator):
+    chunk.append((index, input_))
+    if len(chunk) == chunk_size:
+      yield chunk
+      chunk = []
+  if chunk:
+    yield chunk
+
+
+def run_pipeline_parallel(pipeline,
+                          input_iterator,
+                          output_dir,
+                          output_file_base=None,
+                          num_workers=None,
+                          num_shards=1,
+                          chunk_size=16,
+                          seed=None):
+  """Runs a pipeline on a data source using a pool of worker processes.
+
+  Behaves like `run_pipeline_serial`, but inputs are sent in chunks to
+  `num_workers` processes that each hold their own copy of `pipeline`. Workers
+  send serialized outputs back to this process, where they are written to
+  `num_shards` TFRecord files per dataset. Statistics are merged within each
+  chunk by the workers and then across chunks here.
+
+  Results are written in input order, and the input at index i is always
+  written to shard i % `num_shards`. If `seed` is given, the `random` module
+  (used by `RandomPartition`) is seeded with `seed + i` before transforming
+  input i, so the datasets produced do not depend on how inputs happen to be
+  scheduled across workers.
+
+  Args:
+    pipeline: A Pipeline instance. `pipeline.output_type` must be a protocol
+        buffer or a dictionary mapping names to protocol buffers. The pipeline
+        must be picklable.
+    input_iterator: Iterates over the input data. Items returned by it are fed
+        directly into the pipeline's `transform` method and must be picklable.
+    output_dir: Path to directory where datasets will be written. Each dataset
+        is a file whose name contains the pipeline's dataset name. If the
+        directory does not exist, it will be created.
+    output_file_base: An optional string prefix for all datasets output by this
+        run. The prefix will also be followed by an underscore.
+    num_workers: The number of worker processes to use. If None, the number of
+        CPUs is used.
+    num_shards: The number of TFRecord files to write per dataset. If greater
+        than 1, a "-00000-of-0000N" style suffix is appended to each file name.
+    chunk_size: The number of inputs sent to a worker at a time.
+    seed: An optional integer used to seed the `random` module before each
+        input is transformed.
+
+  Raises:
+    ValueError: If any of `pipeline`'s output types do not have a
+        SerializeToString method, or if `num_shards` or `chunk_size` is less
+        than 1.
+  """
+  _check_serializable_output_type(pipeline)
+  if num_shards < 1:
+    raise ValueError('num_shards must be at least 1: %d' % num_shards)
+  if chunk_size < 1:
+    raise ValueError('chunk_size must be at least 1: %d' % chunk_size)
+  if num_workers is None:
+    num_workers = multiprocessing.cpu_count()
+
+  if not tf.gfile.Exists(output_dir):
+    tf.gfile.MakeDirs(output_dir)
+
+  output_names = list(pipeline.output_type_as_dict.keys())
+
+  writers = {}
+  for name in output_names:
+    if output_file_base is None:
+      path = os.path.join(output_dir, name + '.tfrecord')
+    else:
+      path = os.path.join(output_dir,
+                          '%s_%s.tfrecord' % (output_file_base, name))
+    if num_shards == 1:
+      writers[name] = [tf.python_io.TFRecordWriter(path)]
+    else:
+      writers[name] = [
+          tf.python_io.TFRecordWriter(
+              '%s-%05d-of-%05d' % (path, shard, num_shards))
+          for shard in range(num_shards)]
+
+  total_inputs = 0
+  total_outputs = 0
+  stats = statistics.StatisticsAccumulator()
+  pool = multiprocessing.Pool(
+      num_workers, initializer=_init_worker, initargs=(pipeline,))
+  try:
+    # Keep a bounded number of chunks in flight so that neither the inputs nor
+    # the outputs are buffered in memory all at once.
+    pending = collections.deque()
+    chunks = _chunk_iterator(input_iterator, chunk_size)
+    max_pending = 2 * num_workers
+    while True:
+      for chunk in chunks:
+        pending.append(pool.apply_async(_transform_chunk, (chunk, seed)))
+        if len(pending) >= max_pending:
+          break
+      if not pending:
+        break
+      results, chunk_stats = pending.popleft().get()
+      for index, outputs in results:
+        total_inputs += 1
+        for name, serialized_outputs in outputs.items():
+          writer = writers[name][index % num_shards]
+          for serialized_output in serialized_outputs:
+            writer.write(serialized_output)
+          total_outputs += len(serialized_outputs)
+        if total_inputs % 500 == 0:
+          tf.logging.info('Processed %d inputs so far. Produced %d outputs.',
+                          total_inputs, total_outputs)
+      stats.merge(chunk_stats)
+  finally:
+    # All results have been retrieved unless an error occurred, so it is safe
+    # to stop the workers immediately.
+    pool.terminate()
+    pool.join()
+    for shard_writers in writers.values():
+      for writer in shard_writers:
+        writer.close()
+
   tf.logging.info('\n\nCompleted.\n')
   tf.logging.info('Processed %d inputs total. Produced %d outputs.',
                   total_inputs, total_outputs)
-  statistics.log_statistics_list(stats, tf.logging.info)
+  stats.log(tf.logging.info)
 
 
 def load_pipeline(pipeline, input_iterator):
@@ -406,7 +583,7 @@ def load_pipeline(pipeline, input_iterator):
       [(name, []) for name in pipeline.output_type_as_dict])
   total_inputs = 0
   total_outputs = 0
-  stats = []
+  stats = statistics.StatisticsAccumulator()
   for input_object in input_iterator:
     total_inputs += 1
     outputs = _guarantee_dict(pipeline.transform(input_object),
@@ -414,13 +591,13 @@ def load_pipeline(pipeline, input_iterator):
     for name, output_list in outputs.items():
       aggregated_outputs[name].extend(output_list)
       total_outputs += len(output_list)
-    stats = statistics.merge_statistics(stats + pipeline.get_stats())
+    stats.merge(pipeline.get_stats())
     if total_inputs % 500 == 0:
       tf.logging.info('Processed %d inputs so far. Produced %d outputs.',
                       total_inputs, total_outputs)
-      statistics.log_statistics_list(stats, tf.logging.info)
+      stats.log(tf.logging.info)
   tf.logging.info('\n\nCompleted.\n')
   tf.logging.info('Processed %d inputs total. Produced %d outputs.',
                   total_inputs, total_outputs)
-  statistics.log_statistics_list(stats, tf.logging.info)
+  stats.log(tf.logging.info)
   return aggregated_outputs
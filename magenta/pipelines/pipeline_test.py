@@ -125,6 +125,36 @@ class PipelineTest(tf.test.TestCase):
         set(['serialized:%s_C' % s for s in strings]),
         set(dataset_2_reader))
 
+  def testRunPipelineParallel(self):
+    strings = ['abcdefg', 'helloworld!', 'qwerty', 'zxcvbnm', '123']
+    root_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    pipeline.run_pipeline_parallel(
+        MockPipeline(), iter(strings), root_dir, num_workers=2, num_shards=2,
+        chunk_size=2)
+
+    dataset_1_paths = [
+        os.path.join(root_dir, 'dataset_1.tfrecord-%05d-of-00002' % shard)
+        for shard in range(2)]
+    dataset_2_paths = [
+        os.path.join(root_dir, 'dataset_2.tfrecord-%05d-of-00002' % shard)
+        for shard in range(2)]
+    for path in dataset_1_paths + dataset_2_paths:
+      self.assertTrue(tf.gfile.Exists(path))
+
+    # Input i is written to shard i % 2, in input order.
+    self.assertEqual(
+        ['serialized:%s_%s' % (s, suffix)
+         for s in strings[::2] for suffix in 'AB'],
+        list(tf.python_io.tf_record_iterator(dataset_1_paths[0])))
+    self.assertEqual(
+        ['serialized:%s_%s' % (s, suffix)
+         for s in strings[1::2] for suffix in 'AB'],
+        list(tf.python_io.tf_record_iterator(dataset_1_paths[1])))
+    self.assertEqual(
+        set(['serialized:%s_C' % s for s in strings]),
+        set(tf.python_io.tf_record_iterator(dataset_2_paths[0])) |
+        set(tf.python_io.tf_record_iterator(dataset_2_paths[1])))
+
   def testPipelineIterator(self):
     strings = ['abcdefg', 'helloworld!', 'qwerty']
     result = pipeline.load_pipeline(MockPipeline(), iter(strings))
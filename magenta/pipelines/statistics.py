@@ -125,6 +125,62 @@ def merge_statistics(stats_list):
   return name_map.values()
 
 
+class StatisticsAccumulator(object):
+  """Aggregates Statistics in place over the course of many pipeline runs.
+
+  Unlike calling `merge_statistics` on an ever growing list, merging new
+  statistics into a `StatisticsAccumulator` only costs time proportional to the
+  number of new statistics, since each is merged directly into the single
+  aggregated `Statistic` of the same name.
+
+  The accumulator takes ownership of the `Statistic` objects passed to
+  `merge`, just like `merge_statistics`. Use `snapshot` to get copies of the
+  aggregated statistics that will not change as more statistics are merged.
+  """
+
+  def __init__(self, stats_list=None):
+    """Constructs a `StatisticsAccumulator`.
+
+    Args:
+      stats_list: An optional list of `Statistic` objects to start with.
+    """
+    self._name_map = {}
+    if stats_list is not None:
+      self.merge(stats_list)
+
+  def merge(self, stats_list):
+    """Merges the given Statistics into the aggregated Statistics.
+
+    Args:
+      stats_list: An iterable of `Statistic` objects.
+    """
+    for stat in stats_list:
+      if stat.name in self._name_map:
+        self._name_map[stat.name].merge_from(stat)
+      else:
+        self._name_map[stat.name] = stat
+
+  def snapshot(self):
+    """Returns a list of copies of the aggregated Statistics.
+
+    Returns:
+      A list of `Statistic` objects. Each name will appear only once.
+    """
+    return [stat.copy() for stat in self._name_map.values()]
+
+  def log(self, logger_fn=tf.logging.info):
+    """Calls the given logger function on each aggregated `Statistic`.
+
+    Args:
+      logger_fn: The function which will be called on the string representation
+          of each `Statistic`.
+    """
+    log_statistics_list(self._name_map.values(), logger_fn)
+
+  def __len__(self):
+    return len(self._name_map)
+
+
 def log_statistics_list(stats_list, logger_fn=tf.logging.info):
   """Calls the given logger function on each `Statistic` in the list.
 
@@ -270,4 +326,7 @@ class Histogram(Statistic):
          if self.verbose_pretty_print or self.counters[lower]])
 
   def copy(self):
-    return copy.copy(self)
+    # Copy the counts so that merging into the copy does not modify `self`.
+    stat_copy = copy.copy(self)
+    stat_copy.counters = dict(self.counters)
+    return stat_copy
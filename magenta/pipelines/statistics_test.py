@@ -91,6 +91,35 @@ class StatisticsTest(tf.test.TestCase):
                      {float('-inf'): 6, 1: 1, 2: 13, 10: 3})
     self.assertEqual(histo_copy.name, 'name_123')
 
+  def testStatisticsAccumulator(self):
+    accumulator = statistics.StatisticsAccumulator(
+        [statistics.Counter('counter', 2)])
+    histo = statistics.Histogram('histo', [1, 2])
+    histo.increment(1)
+    accumulator.merge([histo, statistics.Counter('counter', 3)])
+
+    snapshot = dict([(stat.name, stat) for stat in accumulator.snapshot()])
+    self.assertEqual(2, len(accumulator))
+    self.assertEqual(5, snapshot['counter'].count)
+    self.assertEqual({float('-inf'): 0, 1: 1, 2: 0},
+                     snapshot['histo'].counters)
+
+    histo_2 = statistics.Histogram('histo', [1, 2])
+    histo_2.increment(5, 2)
+    accumulator.merge([histo_2])
+
+    # Earlier snapshots are not affected by later merges.
+    self.assertEqual({float('-inf'): 0, 1: 1, 2: 0},
+                     snapshot['histo'].counters)
+    snapshot = dict([(stat.name, stat) for stat in accumulator.snapshot()])
+    self.assertEqual({float('-inf'): 0, 1: 1, 2: 2},
+                     snapshot['histo'].counters)
+
+    logged = []
+    accumulator.log(logged.append)
+    self.assertEqual(
+        ['counter: 5', 'histo:\n  [1,2): 1\n  [2,inf): 2'], logged)
+
   def testMergeDifferentNames(self):
     counter_1 = statistics.Counter('counter_1')
     counter_2 = statistics.Counter('counter_2')
@@ -23,8 +23,21 @@ Example usage:
     --output_file=/path/to/tfrecord/file \
     --num_threads=4 \
     --log=INFO
+
+Parsing is CPU-bound, so on multi-core machines it is usually faster to
+convert files in worker processes, e.g. with --num_processes=8, and to split the
+output into shards with --num_shards.
+
+To convert a growing directory incrementally, pass --manifest_file. Each run
+then only converts files that are new or have changed since a previous run with
+the same manifest, skips files whose contents are identical to a file that was
+already converted, and records what it did in the manifest. Since earlier output
+is not rewritten, each such run should use a new --output_file.
 """
 
+import collections
+import hashlib
+import json
 import os
 
 # internal imports
@@ -46,42 +59,191 @@ tf.app.flags.DEFINE_bool('recursive', False,
                          'Whether or not to recurse into subdirectories.')
 tf.app.flags.DEFINE_integer('num_threads', 1,
                             'Number of worker threads to run in parallel.')
+tf.app.flags.DEFINE_integer('num_processes', 0,
+                            'Number of worker processes to run in parallel. '
+                            'If greater than 0, files are converted in worker '
+                            'processes and --num_threads is ignored.')
+tf.app.flags.DEFINE_integer('num_shards', 1,
+                            'Number of TFRecord files to write. If greater '
+                            'than 1, a "-00000-of-0000N" style suffix is '
+                            'appended to --output_file.')
+tf.app.flags.DEFINE_string('manifest_file', None,
+                           'Path to a manifest of the files converted by '
+                           'previous runs. If given, only new or changed files '
+                           'are converted, files with contents identical to '
+                           'an already converted file are skipped, and the '
+                           'results are recorded in the manifest.')
 tf.app.flags.DEFINE_string('log', 'INFO',
                            'The threshold for what messages will be logged '
                            'DEBUG, INFO, WARN, ERROR, or FATAL.')
 
+# The minimum number of converted files after which the output is flushed and
+# their manifest entries are committed. Since committing rewrites the whole
+# manifest, entries are also committed no more often than every tenth of the
+# size of the manifest, so the total cost of saving it stays linear.
+_MANIFEST_COMMIT_INTERVAL = 100
+
+
+class ConversionManifest(object):
+  """A record of the input files seen by conversion runs.
+
+  Each line of the manifest is a JSON object describing one input file: its
+  path, the SHA-1 hash of its contents, its size and modification time, the
+  output file it was written to, and its status. When a file appears more than
+  once, its last entry wins. Malformed lines are ignored.
+
+  Recorded entries are kept in memory until `save` is called, which writes the
+  whole manifest to a temporary file and renames it over the manifest. So the
+  manifest does not need a filesystem that supports appending (GCS does not),
+  and a run that is killed leaves a complete manifest behind.
+
+  Attributes:
+    CONVERTED: Status of a file that was converted and written.
+    FAILED: Status of a file that the converter could not parse.
+    DUPLICATE: Status of a file that was skipped because a file with identical
+        contents was already converted.
+  """
+
+  CONVERTED = 'converted'
+  FAILED = 'failed'
+  DUPLICATE = 'duplicate'
+
+  def __init__(self, path):
+    """Loads the manifest at `path`, if any.
+
+    Args:
+      path: Path to the manifest file. It is created when first saved if it
+          does not exist.
+    """
+    self._path = path
+    self._entries = {}
+    self._content_hashes = set()
+    self._modified = False
+    if tf.gfile.Exists(path):
+      with tf.gfile.Open(path) as f:
+        for line in f:
+          try:
+            self._add(json.loads(line))
+          except ValueError:
+            if line.strip():
+              tf.logging.warning('Ignoring malformed manifest line: %r', line)
+
+  def _add(self, entry):
+    self._entries[entry['path']] = entry
+    if entry['status'] == ConversionManifest.CONVERTED:
+      self._content_hashes.add(entry['content_hash'])
+
+  def __len__(self):
+    return len(self._entries)
+
+  def lookup(self, path):
+    """Returns the last entry recorded for `path`, or None if there is none."""
+    return self._entries.get(path)
+
+  def has_content(self, content_hash):
+    """Returns whether a file with the given contents was already converted."""
+    return content_hash in self._content_hashes
+
+  def record(self, path, content_hash, size, mtime, output_file, status):
+    """Records an entry for an input file, to be written by `save`.
+
+    Args:
+      path: The full path to the input file.
+      content_hash: The hex SHA-1 hash of the contents of the file.
+      size: The size of the file, in bytes.
+      mtime: The modification time of the file, in nanoseconds.
+      output_file: The path to the TFRecord file the NoteSequence was written
+          to, or None if nothing was written.
+      status: One of CONVERTED, FAILED, or DUPLICATE.
+    """
+    entry = {
+        'path': path,
+        'content_hash': content_hash,
+        'size': size,
+        'mtime': mtime,
+        'output_file': output_file,
+        'status': status,
+    }
+    self._add(entry)
+    self._modified = True
+
+  def save(self):
+    """Writes the manifest, if entries were recorded since it was last saved."""
+    if not self._modified:
+      return
+    temp_path = self._path + '.tmp'
+    with tf.gfile.Open(temp_path, 'w') as f:
+      for path in sorted(self._entries):
+        f.write(json.dumps(self._entries[path], sort_keys=True) + '\n')
+    tf.gfile.Rename(temp_path, self._path, overwrite=True)
+    self._modified = False
+
+
+def _check_manifest(manifest, full_file_path, queued_content_hashes):
+  """Decides whether a file has to be converted, based on the manifest.
+
+  Files whose size and modification time are unchanged since they were last
+  recorded are skipped without being read. Other files are hashed, and those
+  with the same contents as a file already converted are recorded as
+  duplicates.
+
+  Args:
+    manifest: The ConversionManifest of previous conversions.
+    full_file_path: The full path to the file to check.
+    queued_content_hashes: The set of content hashes of files already queued
+        for conversion in this run.
+
+  Returns:
+    A (content_hash, size, mtime) tuple if the file has to be converted, or None
+    if it can be skipped.
+  """
+  stat = tf.gfile.Stat(full_file_path)
+  size, mtime = stat.length, stat.mtime_nsec
+  entry = manifest.lookup(full_file_path)
+  if (entry is not None and entry['size'] == size and
+      entry['mtime'] == mtime):
+    return None
+
+  with tf.gfile.Open(full_file_path, 'rb') as f:
+    content_hash = hashlib.sha1(f.read()).hexdigest()
+  if entry is not None and entry['content_hash'] == content_hash:
+    # Only the modification time changed.
+    manifest.record(full_file_path, content_hash, size, mtime,
+                    entry['output_file'], entry['status'])
+    return None
+  if (manifest.has_content(content_hash) or
+      content_hash in queued_content_hashes):
+    manifest.record(full_file_path, content_hash, size, mtime, None,
+                    ConversionManifest.DUPLICATE)
+    return None
+  return content_hash, size, mtime
+
+
+def iterate_files(root_dir, sub_dir='', recursive=False):
+  """Yields the files to convert in a directory, listing directories lazily.
 
-def queue_conversions(root_dir, sub_dir, pool, recursive=False):
-  """Queues callables for converting files to NoteSequences via threadpool.
+  Files in a directory are yielded before those in its subdirectories, and each
+  subdirectory is only listed once the files before it have been consumed.
 
   Args:
     root_dir: A string specifying a root directory.
     sub_dir: A string specifying a path to a directory under `root_dir` in which
         to convert contents.
-    pool: A ThreadPoolExecutor submit the conversion callables to.
     recursive: A boolean specifying whether or not recursively convert files
         contained in subdirectories of the specified directory.
 
-  Returns:
-    A map from the resulting Futures to the file paths being converted.
+  Yields:
+    (sub_dir, full_file_path) tuples for each MIDI or MusicXML file, where
+    `sub_dir` is the directory containing the file relative to `root_dir`.
   """
   dir_to_convert = os.path.join(root_dir, sub_dir)
   tf.logging.info("Converting files in '%s'.", dir_to_convert)
   files_in_dir = tf.gfile.ListDirectory(os.path.join(dir_to_convert))
-  future_to_path = {}
   recurse_sub_dirs = []
   for file_in_dir in files_in_dir:
-    tf.logging.log_every_n(tf.logging.INFO, 'Queued %d files for conversion.',
-                           1000, len(future_to_path))
     full_file_path = os.path.join(dir_to_convert, file_in_dir)
-    if (full_file_path.lower().endswith('.mid') or
-        full_file_path.lower().endswith('.midi')):
-      future_to_path[pool.submit(
-          convert_midi, root_dir, sub_dir, full_file_path)] = full_file_path
-    elif (full_file_path.lower().endswith('.xml') or
-          full_file_path.lower().endswith('.mxl')):
-      future_to_path[pool.submit(
-          convert_musicxml, root_dir, sub_dir, full_file_path)] = full_file_path
+    if _converter_for_file(full_file_path) is not None:
+      yield sub_dir, full_file_path
     else:
       if recursive and tf.gfile.IsDirectory(full_file_path):
         recurse_sub_dirs.append(os.path.join(sub_dir, file_in_dir))
@@ -90,9 +252,40 @@ def queue_conversions(root_dir, sub_dir, pool, recursive=False):
             'Unable to find a converter for file %s', full_file_path)
 
   for recurse_sub_dir in recurse_sub_dirs:
-    future_to_path.update(queue_conversions(
-        root_dir, recurse_sub_dir, pool, recursive))
-  return future_to_path
+    for file_to_convert in iterate_files(root_dir, recurse_sub_dir, recursive):
+      yield file_to_convert
+
+
+def _converter_for_file(full_file_path):
+  """Returns the conversion function for a file, or None if there is none."""
+  if (full_file_path.lower().endswith('.mid') or
+      full_file_path.lower().endswith('.midi')):
+    return convert_midi
+  elif (full_file_path.lower().endswith('.xml') or
+        full_file_path.lower().endswith('.mxl')):
+    return convert_musicxml
+  return None
+
+
+def convert_file_to_string(root_dir, sub_dir, full_file_path):
+  """Converts a music file to a serialized NoteSequence proto.
+
+  Runs in the worker threads or processes of `convert_directory`; returning
+  the serialized proto lets the writer use it as is.
+
+  Args:
+    root_dir: A string specifying the root directory for the files being
+        converted.
+    sub_dir: The directory being converted currently.
+    full_file_path: the full path to the file to convert.
+
+  Returns:
+    Either a serialized NoteSequence proto or None if the file could not be
+    converted.
+  """
+  sequence = _converter_for_file(full_file_path)(
+      root_dir, sub_dir, full_file_path)
+  return sequence.SerializeToString() if sequence else None
 
 
 def convert_midi(root_dir, sub_dir, full_file_path):
@@ -151,7 +344,8 @@ def convert_musicxml(root_dir, sub_dir, full_file_path):
 
 
 def convert_directory(root_dir, output_file, num_threads,
-                      recursive=False):
+                      recursive=False, num_processes=0, num_shards=1,
+                      manifest_file=None):
   """Converts files to NoteSequences and writes to `output_file`.
 
   Input files found in `root_dir` are converted to NoteSequence protos with the
@@ -159,34 +353,136 @@ def convert_directory(root_dir, output_file, num_threads,
   file from `root_dir` as the filename. If `recursive` is true, recursively
   converts any subdirectories of the specified directory.
 
+  The directory is walked as conversions proceed, and only a bounded number of
+  files are being converted at any time, so memory use does not grow with the
+  number of files.
+
   Args:
     root_dir: A string specifying a root directory.
     output_file: Path to TFRecord file to write results to.
     num_threads: The number of threads to use for conversions.
     recursive: A boolean specifying whether or not recursively convert files
         contained in subdirectories of the specified directory.
+    num_processes: If greater than 0, the number of worker processes to use for
+        conversions instead of threads.
+    num_shards: The number of TFRecord files to write. If greater than 1, a
+        "-00000-of-0000N" style suffix is appended to `output_file` and the
+        i-th file converted is written to shard i % `num_shards`.
+    manifest_file: Optional path to a manifest of previous conversions. If
+        given, only files that are new or changed since they were recorded in
+        the manifest are converted, files with contents identical to a file
+        already converted are skipped, and the outcome for each file is
+        recorded in the manifest. See ConversionManifest. Entries for converted
+        files are only committed once their NoteSequences have been flushed to
+        the output, so a killed run can be resumed with the same manifest and
+        a new `output_file`; files converted since the last commit are
+        converted again. Files whose conversion raised an exception, e.g.
+        because a worker process crashed, are not recorded, so that they are
+        retried by the next run.
+
+  Raises:
+    ValueError: If `num_shards` is less than 1.
   """
-  with futures.ThreadPoolExecutor(max_workers=num_threads) as pool:
-    future_to_path = queue_conversions(root_dir, '', pool, recursive)
-
-    with note_sequence_io.NoteSequenceRecordWriter(output_file) as writer:
-      sequences_written = 0
-      for future in futures.as_completed(future_to_path):
-        path = future_to_path[future]
-        try:
-          sequence = future.result()
-        except Exception as exc:  # pylint: disable=broad-except
-          tf.logging.fatal('%r generated an exception: %s', path, exc)
-
-        if sequence:
-          writer.write(sequence)
-          sequences_written += 1
-        tf.logging.log_every_n(
-            tf.logging.INFO, "Wrote %d of %d NoteSequence protos to '%s'", 100,
-            sequences_written, len(future_to_path), output_file)
-
-    tf.logging.info("Wrote %d NoteSequence protos to '%s'", sequences_written,
-                    output_file)
+  if num_shards < 1:
+    raise ValueError('num_shards must be at least 1: %d' % num_shards)
+
+  if num_processes > 0:
+    pool = futures.ProcessPoolExecutor(max_workers=num_processes)
+    num_workers = num_processes
+  else:
+    pool = futures.ThreadPoolExecutor(max_workers=num_threads)
+    num_workers = num_threads
+
+  if num_shards == 1:
+    output_files = [output_file]
+  else:
+    output_files = ['%s-%05d-of-%05d' % (output_file, shard, num_shards)
+                    for shard in range(num_shards)]
+  writers = [tf.python_io.TFRecordWriter(path) for path in output_files]
+  manifest = ConversionManifest(manifest_file) if manifest_file else None
+  queued_content_hashes = set()
+  # Manifest entries for files whose results may not be on disk yet.
+  uncommitted_entries = []
+
+  with pool:
+    files_queued = 0
+    sequences_written = 0
+    # A map from the Futures being converted to their file paths and indices.
+    pending = collections.OrderedDict()
+    files_to_convert = iterate_files(root_dir, '', recursive)
+    try:
+      while True:
+        # Keep a bounded number of conversions in flight.
+        for sub_dir, full_file_path in files_to_convert:
+          content_hash, size, mtime = None, None, None
+          if manifest is not None:
+            check = _check_manifest(
+                manifest, full_file_path, queued_content_hashes)
+            if check is None:
+              continue
+            content_hash, size, mtime = check
+            queued_content_hashes.add(content_hash)
+          future = pool.submit(
+              convert_file_to_string, root_dir, sub_dir, full_file_path)
+          pending[future] = (
+              full_file_path, files_queued, content_hash, size, mtime)
+          files_queued += 1
+          tf.logging.log_every_n(
+              tf.logging.INFO, 'Queued %d files for conversion.', 1000,
+              files_queued)
+          if len(pending) >= 2 * num_workers:
+            break
+        if not pending:
+          break
+
+        done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+          path, index, content_hash, size, mtime = pending.pop(future)
+          try:
+            serialized_sequence = future.result()
+          except Exception as exc:  # pylint: disable=broad-except
+            # The error may be transient, so the file is not recorded in the
+            # manifest and is retried by the next run.
+            tf.logging.fatal('%r generated an exception: %s', path, exc)
+            continue
+
+          shard = index % num_shards
+          if serialized_sequence:
+            writers[shard].write(serialized_sequence)
+            sequences_written += 1
+          if manifest is not None:
+            if serialized_sequence:
+              uncommitted_entries.append(
+                  (path, content_hash, size, mtime, output_files[shard],
+                   ConversionManifest.CONVERTED))
+            else:
+              uncommitted_entries.append(
+                  (path, content_hash, size, mtime, None,
+                   ConversionManifest.FAILED))
+            if len(uncommitted_entries) >= max(_MANIFEST_COMMIT_INTERVAL,
+                                               len(manifest) // 10):
+              for writer in writers:
+                writer.flush()
+              for entry in uncommitted_entries:
+                manifest.record(*entry)
+              manifest.save()
+              del uncommitted_entries[:]
+          tf.logging.log_every_n(
+              tf.logging.INFO, "Wrote %d of %d NoteSequence protos to '%s'",
+              100, sequences_written, files_queued, output_file)
+    finally:
+      for future in pending:
+        future.cancel()
+      for writer in writers:
+        writer.close()
+      if manifest is not None:
+        # The writers have been closed, so everything they wrote is on disk.
+        for entry in uncommitted_entries:
+          manifest.record(*entry)
+        manifest.save()
+
+  tf.logging.info("Wrote %d NoteSequence protos to '%s'", sequences_written,
+                  output_file)
 
 
 def main(unused_argv):
@@ -201,12 +497,15 @@ def main(unused_argv):
 
   input_dir = os.path.expanduser(FLAGS.input_dir)
   output_file = os.path.expanduser(FLAGS.output_file)
+  manifest_file = (os.path.expanduser(FLAGS.manifest_file)
+                   if FLAGS.manifest_file else None)
   output_dir = os.path.dirname(output_file)
 
   if output_dir:
     tf.gfile.MakeDirs(output_dir)
 
-  convert_directory(input_dir, output_file, FLAGS.num_threads, FLAGS.recursive)
+  convert_directory(input_dir, output_file, FLAGS.num_threads, FLAGS.recursive,
+                    FLAGS.num_processes, FLAGS.num_shards, manifest_file)
 
 
 def console_entry_point():
@@ -63,7 +63,7 @@ class ConvertMidiDirToSequencesTest(tf.test.TestCase):
     }
     self.root_dir = root_dir
 
-  def runTest(self, relative_root, recursive):
+  def runTest(self, relative_root, recursive, num_processes=0, num_shards=1):
     """Tests the output for the given parameters."""
     root_dir = os.path.join(self.root_dir, relative_root)
     expected_filenames = self.expected_dir_midi_contents[relative_root]
@@ -76,10 +76,20 @@ class ConvertMidiDirToSequencesTest(tf.test.TestCase):
     with tempfile.NamedTemporaryFile(
         prefix='ConvertMidiDirToSequencesTest') as output_file:
       convert_dir_to_note_sequences.convert_directory(
-          root_dir, output_file.name, 1, recursive)
+          root_dir, output_file.name, 1, recursive, num_processes, num_shards)
+      if num_shards == 1:
+        output_files = [output_file.name]
+      else:
+        output_files = [
+            '%s-%05d-of-%05d' % (output_file.name, shard, num_shards)
+            for shard in range(num_shards)]
+      sequences = []
+      for path in output_files:
+        sequences.extend(note_sequence_io.note_sequence_record_iterator(path))
+        if path != output_file.name:
+          tf.gfile.Remove(path)
       actual_filenames = set()
-      for sequence in note_sequence_io.note_sequence_record_iterator(
-          output_file.name):
+      for sequence in sequences:
         self.assertEquals(
             note_sequence_io.generate_note_sequence_id(
                 sequence.filename, os.path.basename(relative_root), 'midi'),
@@ -102,6 +112,151 @@ class ConvertMidiDirToSequencesTest(tf.test.TestCase):
     self.runTest('sub_1/sub', recursive=True)
     self.runTest('sub_2', recursive=True)
 
+  def testConvertMidiDirToSequences_Manifest(self):
+    manifest_file = os.path.join(self.root_dir, 'manifest')
+    output_file = os.path.join(self.root_dir, 'output.tfrecord')
+
+    def convert():
+      convert_dir_to_note_sequences.convert_directory(
+          self.root_dir, output_file, 1, recursive=True,
+          manifest_file=manifest_file)
+      return set(
+          sequence.filename for sequence in
+          note_sequence_io.note_sequence_record_iterator(output_file))
+
+    # Every file has the same contents, so only one of them is converted.
+    self.assertEquals(1, len(convert()))
+    manifest = convert_dir_to_note_sequences.ConversionManifest(manifest_file)
+    self.assertEquals(6, len(manifest))
+
+    # Nothing has changed, so nothing is converted.
+    self.assertEquals(set(), convert())
+
+    # New and changed files are converted.
+    tf.gfile.Copy(
+        os.path.join(tf.resource_loader.get_data_files_path(),
+                     '../testdata/example_complex.mid'),
+        os.path.join(self.root_dir, 'sub_2', 'midi_4.mid'), overwrite=True)
+    tf.gfile.FastGFile(
+        os.path.join(self.root_dir, 'midi_6.mid'), mode='w').write('bad data')
+    self.assertEquals({'sub_2/midi_4.mid'}, convert())
+
+    manifest = convert_dir_to_note_sequences.ConversionManifest(manifest_file)
+    self.assertEquals(7, len(manifest))
+    self.assertEquals(
+        convert_dir_to_note_sequences.ConversionManifest.FAILED,
+        manifest.lookup(os.path.join(self.root_dir, 'midi_6.mid'))['status'])
+    self.assertEquals(
+        output_file,
+        manifest.lookup(
+            os.path.join(self.root_dir, 'sub_2', 'midi_4.mid'))['output_file'])
+
+  def testConvertMidiDirToSequences_ManifestRetriesExceptions(self):
+    manifest_file = os.path.join(self.get_temp_dir(), 'retry_manifest')
+    output_file = os.path.join(self.get_temp_dir(), 'retry.tfrecord')
+    midi_path = os.path.join(self.root_dir, 'sub_1', 'sub', 'midi_5.mid')
+    tf.gfile.Copy(
+        os.path.join(tf.resource_loader.get_data_files_path(),
+                     '../testdata/example_complex.mid'),
+        midi_path, overwrite=True)
+
+    # An exception, unlike a file that cannot be parsed, is not recorded.
+    convert_file_to_string = (
+        convert_dir_to_note_sequences.convert_file_to_string)
+
+    def convert_or_raise(root_dir, sub_dir, full_file_path):
+      if full_file_path == midi_path:
+        raise IOError('Transient error.')
+      return convert_file_to_string(root_dir, sub_dir, full_file_path)
+
+    convert_dir_to_note_sequences.convert_file_to_string = convert_or_raise
+    self.addCleanup(setattr, convert_dir_to_note_sequences,
+                    'convert_file_to_string', convert_file_to_string)
+    convert_dir_to_note_sequences.convert_directory(
+        os.path.join(self.root_dir, 'sub_1'), output_file, 1, recursive=True,
+        manifest_file=manifest_file)
+    manifest = convert_dir_to_note_sequences.ConversionManifest(manifest_file)
+    self.assertEquals(1, len(manifest))
+    self.assertIsNone(manifest.lookup(midi_path))
+
+    # The next run retries the file.
+    convert_dir_to_note_sequences.convert_file_to_string = (
+        convert_file_to_string)
+    convert_dir_to_note_sequences.convert_directory(
+        os.path.join(self.root_dir, 'sub_1'), output_file, 1, recursive=True,
+        manifest_file=manifest_file)
+    manifest = convert_dir_to_note_sequences.ConversionManifest(manifest_file)
+    self.assertEquals(2, len(manifest))
+    self.assertEquals(
+        convert_dir_to_note_sequences.ConversionManifest.CONVERTED,
+        manifest.lookup(midi_path)['status'])
+    self.assertFalse(tf.gfile.Exists(manifest_file + '.tmp'))
+
+  def testConvertMidiDirToSequences_ManifestResumesKilledRun(self):
+    root_dir = tempfile.mkdtemp(dir=self.get_temp_dir())
+    filenames = ['example.mid', 'example_complex.mid',
+                 'example_event_order.mid', 'example_is_drum.mid']
+    for filename in filenames:
+      tf.gfile.Copy(
+          os.path.join(tf.resource_loader.get_data_files_path(),
+                       '../testdata', filename),
+          os.path.join(root_dir, filename))
+    manifest_file = os.path.join(self.get_temp_dir(), 'killed_manifest')
+    output_file_1 = os.path.join(self.get_temp_dir(), 'killed_1.tfrecord')
+    output_file_2 = os.path.join(self.get_temp_dir(), 'killed_2.tfrecord')
+
+    # Kill a run, without any cleanup, when it starts converting the third file.
+    pid = os.fork()
+    if pid == 0:
+      convert_file_to_string = (
+          convert_dir_to_note_sequences.convert_file_to_string)
+      num_calls = [0]
+
+      def convert_or_die(*args):
+        num_calls[0] += 1
+        if num_calls[0] == 3:
+          os._exit(1)  # pylint: disable=protected-access
+        return convert_file_to_string(*args)
+
+      convert_dir_to_note_sequences.convert_file_to_string = convert_or_die
+      convert_dir_to_note_sequences._MANIFEST_COMMIT_INTERVAL = 1
+      convert_dir_to_note_sequences.convert_directory(
+          root_dir, output_file_1, 1, manifest_file=manifest_file)
+      os._exit(0)  # pylint: disable=protected-access
+    _, status = os.waitpid(pid, 0)
+    self.assertNotEquals(0, status)
+
+    # Everything the manifest says was converted is in the output.
+    written_filenames = set()
+    try:
+      for sequence in note_sequence_io.note_sequence_record_iterator(
+          output_file_1):
+        written_filenames.add(sequence.filename)
+    except tf.errors.DataLossError:
+      pass
+    manifest = convert_dir_to_note_sequences.ConversionManifest(manifest_file)
+    converted_filenames = set(
+        filename for filename in filenames
+        if manifest.lookup(os.path.join(root_dir, filename)) is not None)
+    self.assertTrue(converted_filenames)
+    self.assertTrue(converted_filenames.issubset(written_filenames))
+
+    # Resuming the run converts the remaining files.
+    convert_dir_to_note_sequences.convert_directory(
+        root_dir, output_file_2, 1, manifest_file=manifest_file)
+    resumed_filenames = set(
+        sequence.filename for sequence in
+        note_sequence_io.note_sequence_record_iterator(output_file_2))
+    self.assertEquals(set(filenames) - converted_filenames, resumed_filenames)
+
+  def testConvertMidiDirToSequences_Processes(self):
+    self.runTest('', recursive=True, num_processes=2)
+    self.runTest('sub_2', recursive=False, num_processes=2)
+
+  def testConvertMidiDirToSequences_Shards(self):
+    self.runTest('', recursive=True, num_shards=3)
+    self.runTest('', recursive=True, num_processes=2, num_shards=2)
+
 
 if __name__ == '__main__':
   tf.test.main()